@@ -37,5 +37,17 @@ from .simulation.simulation import (
     load_config,
     load_parametrisation,
     run_config,
+    run_sweep,
+    simulate_scenario,
+    simulate_scenarios,
     plot_simulation_results
 )
+from .simulation.definitions import DosingMode
+from .simulation.fitting import fit_parameters
+from .simulation.goodness_of_fit import evaluate_goodness_of_fit
+from .simulation.integrator_tuning import tune_integrator
+from .simulation.pk_metrics import compute_pk_metrics
+from .simulation.population import run_population_config
+from .simulation.reverse_dosimetry import run_reverse_dosimetry
+from .simulation.sensitivity import run_sensitivity_analysis
+from .simulation.superposition import simulate_scenarios_linear
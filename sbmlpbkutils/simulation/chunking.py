@@ -0,0 +1,118 @@
+"""Chunked execution of long PBK model simulations.
+
+This module provides the helpers of chunked simulations, in which the
+simulation horizon is split into chunks of time (e.g., years): the chunk
+boundaries, age-dependent parameter tables that update model parameters
+at the start of each chunk, and an on-disk checkpoint of the model state
+and the results of the completed chunks, from which a crashed or
+interrupted run is resumed.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from typing import Dict, Tuple
+import numpy as np
+import pandas as pd
+
+from .definitions import ParameterTable
+
+CHECKPOINT_FILE = "checkpoint.json"
+
+def get_chunk_times(
+    grid: np.ndarray,
+    chunk_duration: float | None = None
+) -> np.ndarray:
+    """Get the boundaries of the chunks of a simulation with the output
+    time points `grid`.
+
+    The chunk boundaries are the multiples of `chunk_duration` (in the same
+    time unit as the grid) from the first up to the last time point of the
+    grid, snapped to the first grid point at or after each multiple, such
+    that each output time point is reported by exactly one chunk. Without
+    `chunk_duration`, the simulation is a single chunk.
+    """
+    (start, end) = (grid[0], grid[-1])
+    boundaries = [[start], [end]]
+    if chunk_duration is not None:
+        if chunk_duration <= 0:
+            raise ValueError("Chunk duration should be positive.")
+        multiples = start + chunk_duration * np.arange(1, int(np.ceil((end - start) / chunk_duration)))
+        boundaries.append(grid[np.searchsorted(grid, multiples, side='left')])
+    return np.unique(np.concatenate(boundaries))
+
+def load_parameter_table(table: ParameterTable) -> pd.DataFrame:
+    """Load a parameter table, sorted by age."""
+    df = pd.read_csv(table.file_path, skipinitialspace=True)
+    if "age" not in df.columns:
+        raise ValueError(f"Column age not found in parameter table {table.file_path}.")
+    return df.sort_values("age", ignore_index=True)
+
+def get_table_parameters(df: pd.DataFrame, age: float) -> Dict[str, float]:
+    """Get the (linearly interpolated) parameter values of a parameter
+    table at the specified age."""
+    ages = df["age"].to_numpy(dtype=float)
+    return {
+        str(column): float(np.interp(age, ages, df[column].to_numpy(dtype=float)))
+        for column in df.columns
+        if column != "age"
+    }
+
+class ChunkCheckpoint:
+    """On-disk checkpoint of a chunked simulation.
+
+    Stores the (serialised) model state after the last completed chunk and
+    the results of all completed chunks in directory `path`. The checkpoint
+    is only resumed when its `key` matches, i.e., when it was created for
+    the same simulation.
+    """
+
+    def __init__(self, path: str, key: str):
+        self.path = path
+        self.key = key
+
+    def load(self) -> Tuple[int, bytes] | None:
+        """Load the number of completed chunks and the model state of the
+        checkpoint, or None when there is no (matching) checkpoint."""
+        try:
+            with open(os.path.join(self.path, CHECKPOINT_FILE), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data["key"] != self.key:
+                return None
+            with open(os.path.join(self.path, data["state"]), "rb") as f:
+                state = f.read()
+        except (OSError, ValueError, KeyError):
+            return None
+        return (int(data["chunks"]), state)
+
+    def save(self, n_chunks: int, results: np.ndarray, state: bytes):
+        """Store the results of chunk `n_chunks - 1` and the model state
+        after it, after which `n_chunks` chunks are completed."""
+        os.makedirs(self.path, exist_ok=True)
+        self._write(self._get_results_file(n_chunks - 1), lambda f: np.save(f, results))
+        state_file = f"state_{n_chunks % 2}.bin"
+        self._write(os.path.join(self.path, state_file), lambda f: f.write(state))
+        data = {"key": self.key, "chunks": n_chunks, "state": state_file}
+        self._write(
+            os.path.join(self.path, CHECKPOINT_FILE),
+            lambda f: f.write(json.dumps(data).encode("utf-8"))
+        )
+
+    def get_results(self, chunk_index: int) -> np.ndarray:
+        """Get the stored results of a completed chunk."""
+        return np.load(self._get_results_file(chunk_index))
+
+    def clear(self):
+        """Remove the checkpoint."""
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def _get_results_file(self, chunk_index: int) -> str:
+        return os.path.join(self.path, f"chunk_{chunk_index:06d}.npy")
+
+    def _write(self, file_path: str, write):
+        """Write a file atomically (through a temporary file)."""
+        (fd, tmp_file) = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_file, file_path)
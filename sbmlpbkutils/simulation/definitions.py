@@ -6,8 +6,8 @@ scenarios.
 """
 
 from enum import Enum
-from dataclasses import dataclass
-from typing import Dict, List
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
 
 from .units import (
     AmountUnit,
@@ -23,6 +23,148 @@ class SeriesType(str, Enum):
     TIMELINE = "timeline"
     CHECKPOINTS = "checkpoints"
 
+class DosingMode(str, Enum):
+    """Enumeration of ways dosing events are applied during simulation.
+
+    EVENTS -- dosing events are added to the model as (triggered) events.
+    SEGMENTED -- doses are applied directly on the model state between
+        piecewise integration segments of an explicit dose timeline.
+    PARAMETERISED -- doses are applied by generic dosing events that are
+        controlled by generated dosing input parameters.
+    """
+    EVENTS = "events"
+    SEGMENTED = "segmented"
+    PARAMETERISED = "parameterised"
+
+class ResultsFormat(str, Enum):
+    """Enumeration of file formats for storing simulation results.
+
+    CSV -- comma separated text files.
+    PARQUET -- Apache Parquet files (requires pyarrow).
+    ARROW -- Apache Arrow IPC (Feather V2) files (requires pyarrow).
+    """
+    CSV = "csv"
+    PARQUET = "parquet"
+    ARROW = "arrow"
+
+class DistributionType(str, Enum):
+    """Enumeration of distribution types of population parameters.
+
+    NORMAL -- normal distribution specified by mean and sd.
+    LOGNORMAL -- lognormal distribution specified by mean and cv.
+    UNIFORM -- uniform distribution specified by lower and upper.
+    LOGUNIFORM -- log-uniform distribution specified by lower and upper.
+    """
+    NORMAL = "normal"
+    LOGNORMAL = "lognormal"
+    UNIFORM = "uniform"
+    LOGUNIFORM = "loguniform"
+
+class SamplingMethod(str, Enum):
+    """Enumeration of sampling methods for drawing population samples.
+
+    RANDOM -- (pseudo) random sampling.
+    LATIN_HYPERCUBE -- Latin hypercube sampling.
+    SOBOL -- scrambled Sobol sequence (quasi-random) sampling.
+    """
+    RANDOM = "random"
+    LATIN_HYPERCUBE = "latin_hypercube"
+    SOBOL = "sobol"
+
+class SensitivityMethod(str, Enum):
+    """Enumeration of global sensitivity analysis methods.
+
+    SOBOL -- variance based (Sobol) indices estimated from a Saltelli design.
+    MORRIS -- elementary effects (Morris) screening.
+    """
+    SOBOL = "sobol"
+    MORRIS = "morris"
+
+class LocalSensitivityMethod(str, Enum):
+    """Enumeration of local sensitivity analysis methods.
+
+    AUTO -- forward sensitivities when available, otherwise finite differences.
+    FORWARD -- forward sensitivities computed by the roadrunner sensitivity solver.
+    FINITE_DIFFERENCE -- central finite differences.
+    """
+    AUTO = "auto"
+    FORWARD = "forward"
+    FINITE_DIFFERENCE = "finite_difference"
+
+class ObjectiveType(str, Enum):
+    """Enumeration of objective functions for parameter estimation.
+
+    LEAST_SQUARES -- weighted sum of squared residuals, in which each
+        reference series is weighted by its number of points and scale.
+    LOG_LIKELIHOOD -- negative log-likelihood assuming normally
+        distributed residuals with a separate error variance per reference
+        series.
+    """
+    LEAST_SQUARES = "least_squares"
+    LOG_LIKELIHOOD = "log_likelihood"
+
+class DoseMetric(str, Enum):
+    """Enumeration of internal dose metrics of a scenario output.
+
+    CMAX -- peak (maximum) value.
+    AUC -- area under the curve (in scenario time unit).
+    STEADY_STATE -- average value over the final dosing interval (or the
+        final value for scenarios without repeated dosing).
+    """
+    CMAX = "cmax"
+    AUC = "auc"
+    STEADY_STATE = "steady_state"
+
+class OutputTimesType(str, Enum):
+    """Enumeration of ways the output time points of a scenario are specified.
+
+    LIST -- explicit list of time points.
+    REFERENCE -- time points of the reference data of the scenario.
+    LOG -- log-spaced grid of time points (plus time zero).
+    """
+    LIST = "list"
+    REFERENCE = "reference"
+    LOG = "log"
+
+class SteadyStateMode(str, Enum):
+    """Enumeration of ways to continue a simulation once a periodic steady
+    state is reached.
+
+    STOP -- stop the simulation and repeat the trajectory of the last
+        dosing cycle at the remaining output time points (amounts that
+        accumulate over cycles are not extrapolated).
+    FAST_FORWARD -- extrapolate the trajectory of the last dosing cycles,
+        with the change per cycle, to the remaining output time points.
+    """
+    STOP = "stop"
+    FAST_FORWARD = "fast_forward"
+
+class ReducerType(str, Enum):
+    """Enumeration of reductions of output series over time windows.
+
+    MAX -- maximum value within the window.
+    MIN -- minimum value within the window.
+    MEAN -- time-weighted mean value over the window.
+    INTEGRAL -- integral (area under the curve) over the window.
+    LAST -- value at the end of the window.
+    """
+    MAX = "max"
+    MIN = "min"
+    MEAN = "mean"
+    INTEGRAL = "integral"
+    LAST = "last"
+
+class ConvolutionMethod(str, Enum):
+    """Enumeration of ways to convolve dose series with impulse responses.
+
+    AUTO -- FFT when all dose times are on the output grid, direct otherwise.
+    FFT -- FFT convolution (requires dose times on the output grid).
+    DIRECT -- direct summation of the (interpolated) shifted responses.
+    """
+    AUTO = "auto"
+    FFT = "fft"
+    DIRECT = "direct"
+
 @dataclass
 class DosingEvent:
     """Specification of a dosing event.
@@ -57,6 +199,17 @@ class InitialState:
     target: str
     amount: float
 
+@dataclass
+class OutputReducer:
+    """Reduction of an output series over consecutive time windows.
+
+    Attributes:
+        type: type of reduction.
+        window: length of the time windows (in scenario time unit).
+    """
+    type: ReducerType
+    window: float
+
 @dataclass
 class Output:
     """Configuration for an output series to be saved or plotted.
@@ -65,10 +218,13 @@ class Output:
         id: unique identifier used in files and plots.
         output: model variable id to extract values from.
         label: optional human-readable label for plots.
+        reducers: reductions of the output over time windows to store
+            instead of the output values at all time points (optional).
     """
     id: str
     output: str
     label: str | None = None
+    reducers: List[OutputReducer] | None = None
 
 @dataclass
 class ReferenceData:
@@ -89,12 +245,105 @@ class ReferenceData:
     time_unit: TimeUnit
     mappings: Dict[str, str]
 
+@dataclass
+class OutputTimes:
+    """Explicit output time points of a scenario.
+
+    Attributes:
+        type: way the output time points are specified.
+        times: time points (in scenario time unit, for type `LIST`).
+        start: first (positive) time point (in scenario time unit, for type
+            `LOG`).
+        n_points: number of log-spaced time points from `start` up to the
+            scenario duration (for type `LOG`).
+    """
+    type: OutputTimesType
+    times: List[float] | None = None
+    start: float | None = None
+    n_points: int | None = None
+
+@dataclass
+class IntegratorSettings:
+    """Settings of the (CVODE) integrator used for simulation.
+
+    Unspecified settings keep the default values of roadrunner.
+
+    Attributes:
+        absolute_tolerance: absolute tolerance.
+        relative_tolerance: relative tolerance.
+        maximum_time_step: maximum time step (in model time unit).
+        stiff: whether to use the stiff (BDF) or non-stiff (Adams) solver.
+        maximum_num_steps: maximum number of steps per output interval.
+    """
+    absolute_tolerance: float | None = None
+    relative_tolerance: float | None = None
+    maximum_time_step: float | None = None
+    stiff: bool | None = None
+    maximum_num_steps: int | None = None
+
+@dataclass
+class SteadyStateSettings:
+    """Settings of the detection of a periodic steady state of scenarios
+    with repeated dosing.
+
+    The periodic steady state is reached when the changes of all state
+    variables over consecutive dosing cycles are equal within tolerance
+    (i.e., when the states repeat, up to a constant accumulation per
+    cycle, e.g., of excreted amounts).
+
+    Attributes:
+        mode: way to continue the simulation once the steady state is
+            reached.
+        relative_tolerance: relative tolerance of the state changes.
+        absolute_tolerance: absolute tolerance of the state changes (in
+            model amount unit).
+    """
+    mode: SteadyStateMode = SteadyStateMode.FAST_FORWARD
+    relative_tolerance: float = 1e-6
+    absolute_tolerance: float = 1e-9
+
+@dataclass
+class ParameterTable:
+    """Table of model parameter values as a function of age, used to update
+    the parameters at the start of each chunk of a chunked simulation.
+
+    The table file (CSV) contains a column `age` and a column per model
+    parameter. The parameter values are linearly interpolated at the age at
+    the start of each chunk (and kept constant beyond the range of ages of
+    the table).
+
+    Attributes:
+        file_path: path to the CSV file with the table.
+        age: model variable holding the age (e.g., `Age`). When not
+            specified, the simulation time (in scenario time unit) is used.
+    """
+    file_path: str
+    age: str | None = None
+
+@dataclass
+class ChunkSettings:
+    """Settings of the chunked execution of (long) simulations.
+
+    Attributes:
+        duration: duration of the chunks (in scenario time unit).
+        parameter_tables: age-dependent parameter tables applied at the
+            start of each chunk (optional).
+    """
+    duration: float
+    parameter_tables: List[ParameterTable] | None = None
+
 @dataclass
 class Scenario:
     """Defines a simulation scenario.
 
     Contains durations, outputs to record, initial states and dosing events
     as well as unit information for time and amount used in the scenario.
+    Outputs are recorded on a uniform grid of `evaluation_resolution` time
+    points per time unit, unless explicit `output_times` are specified.
+    Integrator settings of the scenario override those of the model
+    instance. With `steady_state` settings, repeated dosing simulations
+    detect a periodic steady state to stop early or fast-forward. With
+    `chunks` settings, the simulation is executed in chunks of time.
     """
     id: str
     label: str
@@ -108,7 +357,105 @@ class Scenario:
     time_unit: TimeUnit
     amount_unit: AmountUnit
     molar_mass: float | None = None
+    output_times: OutputTimes | None = None
+    integrator: IntegratorSettings | None = None
+    steady_state: SteadyStateSettings | None = None
+    chunks: ChunkSettings | None = None
+
+@dataclass
+class ScenarioSweep:
+    """Sweep over the cartesian product of values of scenario fields.
+
+    The members of the sweep are copies of the base scenario in which the
+    fields specified by the keys of `matrix` take each combination of the
+    listed values. Fields are specified as dotted paths of attributes,
+    list indices and dictionary keys of the scenario, e.g.,
+    `dosing_events.0.amount` or `parameters.Ka`.
+
+    Attributes:
+        id: sweep id (also the prefix of the ids of the sweep members).
+        label: human-readable label.
+        scenario: base scenario of the sweep members.
+        matrix: values per (dotted path of a) scenario field.
+    """
+    id: str
+    label: str
+    scenario: Scenario
+    matrix: Dict[str, List[Any]]
+
+@dataclass
+class ParameterDistribution:
+    """Distribution of a model parameter in a population.
+
+    Attributes:
+        id: model parameter id.
+        distribution: distribution type.
+        mean: mean (for normal and lognormal distributions).
+        sd: standard deviation (for normal distributions).
+        cv: coefficient of variation (for lognormal distributions).
+        lower: lower bound (for uniform and log-uniform distributions).
+        upper: upper bound (for uniform and log-uniform distributions).
+    """
+    id: str
+    distribution: DistributionType
+    mean: float | None = None
+    sd: float | None = None
+    cv: float | None = None
+    lower: float | None = None
+    upper: float | None = None
+
+@dataclass
+class ParameterCorrelation:
+    """Correlation between two population parameters.
 
+    Correlations are imposed on the normal scores of the parameter samples
+    (Gaussian copula), such that the marginal distributions are retained.
+
+    Attributes:
+        first: id of the first parameter.
+        second: id of the second parameter.
+        value: correlation coefficient (between -1 and 1).
+    """
+    first: str
+    second: str
+    value: float
+
+@dataclass
+class FitParameter:
+    """Model parameter to estimate in a parameter estimation.
+
+    Attributes:
+        id: model parameter id.
+        lower: lower bound of the parameter.
+        upper: upper bound of the parameter.
+        initial: initial value (optional, defaults to the center of the
+            bounds, on log scale if `log_scale`).
+        log_scale: whether to estimate the parameter on log scale.
+    """
+    id: str
+    lower: float
+    upper: float
+    initial: float | None = None
+    log_scale: bool = False
+
+@dataclass
+class Population:
+    """Specification of a population of virtual individuals.
+
+    Attributes:
+        size: number of individuals.
+        parameters: distributions of the varying model parameters.
+        seed: seed of the random number generator (optional).
+        sampling: method used for drawing the parameter samples.
+        correlations: correlations between parameters (optional).
+        percentiles: percentiles of the outputs to compute.
+    """
+    size: int
+    parameters: List[ParameterDistribution]
+    seed: int | None = None
+    sampling: SamplingMethod = SamplingMethod.RANDOM
+    correlations: List[ParameterCorrelation] | None = None
+    percentiles: List[float] = field(default_factory=lambda: [5., 50., 95.])
 
 @dataclass
 class ModelInstance:
@@ -120,12 +467,22 @@ class ModelInstance:
         model_path: path to SBML model file.
         param_file: optional CSV with parameter values to load.
         target_mappings: optional mapping from scenario outputs to model ids.
+        population: optional population of virtual individuals for
+            population simulations.
+        integrator: optional integrator settings for simulations of the
+            instance.
+        linear: whether the model is linear in the state amounts, such
+            that scenarios can be computed by superposition of impulse
+            responses (None to detect linearity numerically).
     """
     id: str
     label: str
     model_path: str
     param_file: str | None = None
     target_mappings: Dict[str, str] | None = None
+    population: Population | None = None
+    integrator: IntegratorSettings | None = None
+    linear: bool | None = None
 
 @dataclass
 class SimulationConfig:
@@ -136,11 +493,34 @@ class SimulationConfig:
         label: human-readable label.
         scenarios: list of scenarios to run.
         model_instances: list of model instances to execute scenarios on.
+        sweeps: list of scenario sweeps to run (optional).
     """
     id: str
     label: str
     scenarios: List[Scenario]
     model_instances: List[ModelInstance]
+    sweeps: List[ScenarioSweep] = field(default_factory=list)
+
+@dataclass
+class ResultsFileOptions:
+    """Options for writing simulation results files.
+
+    Attributes:
+        format: file format of the results files.
+        float32: store results as single precision floats.
+        compression: compression codec for binary formats (e.g., 'zstd',
+            'snappy' or 'gzip' for parquet, 'zstd' or 'lz4' for arrow).
+        stream_window: number of output time points per integration
+            window when streaming results to file (None to write the
+            results at once).
+        pk_metrics: also write a table of the pharmacokinetic metrics of
+            the outputs, accumulated from the results while simulating.
+    """
+    format: ResultsFormat = ResultsFormat.CSV
+    float32: bool = False
+    compression: str | None = None
+    stream_window: int | None = None
+    pk_metrics: bool = False
 
 @dataclass
 class EventSpec:
@@ -150,7 +530,27 @@ class EventSpec:
         target: model variable to be assigned.
         trigger: boolean expression string that triggers the event.
         assignment: expression to assign when triggered.
+        assignments: additional assignments (variable id to expression)
+            of the event (optional).
     """
     target: str
     trigger: str
     assignment: str
+    assignments: Dict[str, str] | None = None
+
+@dataclass
+class DoseAction:
+    """Dose applied directly on the model state at a specific time.
+
+    Attributes:
+        time: time of the dose (in model time unit).
+        target: model variable to dose.
+        amount: dose amount (in model amount unit).
+        adjustment: multiplicative adjustment using specified model variable (optional).
+        reset: if true, the target is emptied (set to zero) instead of dosed.
+    """
+    time: float
+    target: str
+    amount: float
+    adjustment: str | None = None
+    reset: bool = False
@@ -0,0 +1,259 @@
+"""Helpers for applying dosing events to PBK models.
+
+This module provides methods to compute the dose times of dosing events
+and to implement dosing events by means of generated dosing input
+parameters. With dosing inputs, a fixed set of generic events is added
+to the model once, after which any dosing schedule with the same
+structure is applied by only setting parameter values, so that the
+compiled model can be reused for all dosing schedules.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+import numpy as np
+from roadrunner import RoadRunner
+
+from .definitions import (
+    DosingEvent,
+    EventSpec
+)
+
+BOLUS_DOSING_TYPES = ("single_bolus", "repeated_bolus")
+CONTINUOUS_DOSING_TYPES = ("single_continuous", "repeated_continuous")
+
+@dataclass(frozen=True)
+class DosingInputSlot:
+    """Generated dosing input of a model.
+
+    Attributes:
+        id: id prefix of the generated parameters and events of the input.
+        continuous: whether the input applies continuous (or bolus) doses.
+        target: model variable to dose.
+        adjustment: multiplicative adjustment using specified model variable (optional).
+    """
+    id: str
+    continuous: bool
+    target: str
+    adjustment: str | None = None
+
+def get_dose_times(
+    event: DosingEvent,
+    time_unit_multiplier: float,
+    end_time: float
+) -> List[float]:
+    """Get the (start) times of the doses of a dosing event.
+
+    Returns the dose times in model time units. Repeated doses are applied
+    at `time + k * interval` for as long as the dose time is before `until`
+    (or not after `end_time` when `until` is not specified).
+    """
+    if event.type in ("single_bolus", "single_continuous"):
+        return [time_unit_multiplier * event.time]
+    if event.type in ("repeated_bolus", "repeated_continuous"):
+        if event.interval is None:
+            raise ValueError(f"interval is required for {event.type} dosing event")
+        time = time_unit_multiplier * event.time
+        interval = time_unit_multiplier * event.interval
+        until = time_unit_multiplier * event.until if event.until else None
+        n_doses = (int(np.ceil((until - time) / interval))
+            if until is not None else int(np.floor((end_time - time) / interval)) + 1)
+        return [time + k * interval for k in range(max(n_doses, 0))]
+    raise ValueError(f"Unknown dose_type: {event.type}")
+
+def get_dosing_cycle(
+    events: List[DosingEvent],
+    time_unit_multiplier: float,
+    end_time: float
+) -> Tuple[float, float] | None:
+    """Get the start time and period of the dosing cycles of periodic
+    dosing.
+
+    Dosing is periodic when all repeated dosing events repeat up to
+    `end_time` and their intervals divide the largest interval (which is
+    the period of the cycles). The cycles start once all dosing events
+    have started (and single continuous doses have ended). Returns the
+    start time and period in model time units, or None when the dosing is
+    not periodic.
+    """
+    repeated = [event for event in events if event.type in ("repeated_bolus", "repeated_continuous")]
+    if not repeated or any(not event.interval for event in repeated):
+        return None
+    period = time_unit_multiplier * max(event.interval for event in repeated)
+    start = 0.
+    for event in events:
+        time = time_unit_multiplier * event.time
+        if event in repeated:
+            ratio = period / (time_unit_multiplier * event.interval)
+            if not np.isclose(ratio, np.round(ratio)):
+                return None
+            if event.until is not None and time_unit_multiplier * event.until < end_time:
+                return None
+        elif event.type == "single_continuous" and event.duration is not None:
+            time += time_unit_multiplier * event.duration
+        start = max(start, time)
+    return (start, period)
+
+def create_dosing_input_slots(
+    events: List[DosingEvent],
+    target_mappings: Dict[str, str] | None
+) -> List[DosingInputSlot]:
+    """Create the dosing input slots needed to apply the specified events.
+
+    One slot is created per dosing event. Slots are ordered by target,
+    adjustment and type (rather than by event order), such that dosing
+    event lists with the same structure yield the same slots.
+    """
+    signatures = sorted(
+        (
+            _get_mapped_id(event.target, target_mappings),
+            _get_mapped_id(event.adjustment, target_mappings) or "",
+            _is_continuous(event)
+        )
+        for event in events
+    )
+    return [
+        DosingInputSlot(
+            id = f"pbk_dose_{i + 1}",
+            continuous = continuous,
+            target = target,
+            adjustment = adjustment if adjustment else None
+        )
+        for i, (target, adjustment, continuous) in enumerate(signatures)
+    ]
+
+def create_dosing_input_parameters(
+    slots: List[DosingInputSlot]
+) -> Dict[str, float]:
+    """Create the dosing input parameters of the slots.
+
+    Returns the parameter ids with initial values for which the slots are
+    disabled.
+    """
+    parameters = {}
+    for slot in slots:
+        parameters[f"{slot.id}_amount"] = 0.
+        parameters[f"{slot.id}_interval"] = 1.
+        parameters[f"{slot.id}_next"] = 1.
+        parameters[f"{slot.id}_last"] = 0.
+        if slot.continuous:
+            parameters[f"{slot.id}_stop"] = 1.
+            parameters[f"{slot.id}_last_stop"] = 0.
+    return parameters
+
+def create_dosing_input_events(
+    slots: List[DosingInputSlot]
+) -> List[EventSpec]:
+    """Create the (generic) dosing events of the slots.
+
+    A dosing event is triggered when time reaches the next dose time of the
+    slot and, besides applying the dose, advances the next dose time by the
+    dosing interval. Continuous dosing slots have an additional event that
+    empties the target at the end of each dosing period.
+    """
+    event_specs = []
+    for slot in slots:
+        amount = (f"{slot.adjustment} * {slot.id}_amount"
+            if slot.adjustment else f"{slot.id}_amount")
+        event_specs.append(EventSpec(
+            target = slot.target,
+            trigger = f"time >= {slot.id}_next && {slot.id}_next <= {slot.id}_last",
+            assignment = f"{slot.target} + {amount}",
+            assignments = {
+                f"{slot.id}_next": f"{slot.id}_next + {slot.id}_interval"
+            }
+        ))
+        if slot.continuous:
+            event_specs.append(EventSpec(
+                target = slot.target,
+                trigger = f"time >= {slot.id}_stop && {slot.id}_stop <= {slot.id}_last_stop",
+                assignment = "0",
+                assignments = {
+                    f"{slot.id}_stop": f"{slot.id}_stop + {slot.id}_interval"
+                }
+            ))
+    return event_specs
+
+def set_dosing_inputs(
+    rr_model: RoadRunner,
+    slots: List[DosingInputSlot],
+    events: List[DosingEvent],
+    time_unit_multiplier: float,
+    amount_unit_multiplier: float,
+    target_mappings: Dict[str, str] | None,
+    end_time: float
+):
+    """Set the dosing input parameters of a model for the specified events.
+
+    Doses at or before time zero are applied directly on the model state,
+    as events that are triggered at the start of a simulation do not fire.
+    Slots that are not used by any of the events are disabled.
+    """
+    available = list(slots)
+    for event in events:
+        target = _get_mapped_id(event.target, target_mappings)
+        adjustment = _get_mapped_id(event.adjustment, target_mappings)
+        continuous = _is_continuous(event)
+        slot = next(
+            (s for s in available
+                if s.target == target and s.adjustment == adjustment and s.continuous == continuous),
+            None
+        )
+        if slot is None:
+            raise ValueError(f"No dosing input available for dosing event on target {target}.")
+        available.remove(slot)
+
+        amount = amount_unit_multiplier * event.amount
+        dose_times = get_dose_times(event, time_unit_multiplier, end_time)
+        interval = (time_unit_multiplier * event.interval
+            if event.interval and len(dose_times) > 1 else 1.)
+        duration = time_unit_multiplier * event.duration if continuous and event.duration else 0.
+        if continuous and event.duration is None:
+            raise ValueError(f"duration is required for {event.type} dosing event")
+
+        # Apply doses at or before time zero directly
+        initial_doses = [t for t in dose_times if t <= 0]
+        for _ in initial_doses:
+            value = rr_model[adjustment] * amount if adjustment else amount
+            rr_model[target] = rr_model[target] + value
+        remaining = dose_times[len(initial_doses):]
+
+        rr_model[f"{slot.id}_amount"] = amount
+        rr_model[f"{slot.id}_interval"] = interval
+        if remaining:
+            rr_model[f"{slot.id}_next"] = remaining[0]
+            rr_model[f"{slot.id}_last"] = dose_times[-1] + interval / 2
+        else:
+            rr_model[f"{slot.id}_next"] = 1.
+            rr_model[f"{slot.id}_last"] = 0.
+        if continuous:
+            stop_times = [t + duration for t in dose_times if t + duration > 0]
+            if stop_times:
+                rr_model[f"{slot.id}_stop"] = stop_times[0]
+                rr_model[f"{slot.id}_last_stop"] = stop_times[-1] + interval / 2
+            else:
+                rr_model[f"{slot.id}_stop"] = 1.
+                rr_model[f"{slot.id}_last_stop"] = 0.
+
+    # Disable unused slots
+    for slot in available:
+        rr_model[f"{slot.id}_amount"] = 0.
+        rr_model[f"{slot.id}_next"] = 1.
+        rr_model[f"{slot.id}_last"] = 0.
+        if slot.continuous:
+            rr_model[f"{slot.id}_stop"] = 1.
+            rr_model[f"{slot.id}_last_stop"] = 0.
+
+def _get_mapped_id(
+    variable: str | None,
+    target_mappings: Dict[str, str] | None
+) -> str | None:
+    if variable is not None and target_mappings is not None and variable in target_mappings.keys():
+        return target_mappings[variable]
+    return variable
+
+def _is_continuous(event: DosingEvent) -> bool:
+    if event.type in CONTINUOUS_DOSING_TYPES:
+        return True
+    if event.type in BOLUS_DOSING_TYPES:
+        return False
+    raise ValueError(f"Unknown dose_type: {event.type}")
@@ -0,0 +1,359 @@
+"""Estimation of model parameters from reference data.
+
+This module provides methods to calibrate parameters of a model instance
+to the reference data of the scenarios of a simulation configuration. The
+objective (weighted least squares or negative log-likelihood) is computed
+over all reference series, by simulating all scenarios in parallel on a
+pool of worker processes that is kept alive during the optimisation, such
+that each worker compiles the model only once. Scenarios are simulated
+with only the reference times as output times. Finite difference gradients
+are computed by evaluating all parameter perturbations in a single
+parallel batch.
+"""
+
+from dataclasses import dataclass, replace
+from logging import Logger
+from typing import Dict, List, Tuple
+import numpy as np
+from scipy.optimize import least_squares, minimize
+
+from .definitions import (
+    DosingMode,
+    FitParameter,
+    ModelInstance,
+    ObjectiveType,
+    OutputTimes,
+    OutputTimesType,
+    Scenario,
+    SimulationConfig
+)
+from .model_cache import get_default_model_cache
+from .parallel import TaskPool
+from .result_store import ResultStore
+from .simulation import create_scenario_model, simulate_scenario_model
+
+_FD_RELATIVE_STEP = 1e-3
+_MIN_VARIANCE = 1e-300
+
+@dataclass
+class ReferenceSeries:
+    """Reference values of a scenario output.
+
+    Attributes:
+        scenario_index: index of the scenario in the configuration.
+        output_index: index of the output in the scenario outputs.
+        label: label of the series (scenario, output and reference series).
+        times: time points (in scenario time unit).
+        values: reference values.
+    """
+    scenario_index: int
+    output_index: int
+    label: str
+    times: np.ndarray
+    values: np.ndarray
+
+@dataclass
+class FitResult:
+    """Result of a parameter estimation.
+
+    Attributes:
+        parameters: estimated parameter values.
+        objective: objective value at the estimated parameter values.
+        success: whether the optimiser reported convergence.
+        message: message of the optimiser.
+        n_evaluations: number of evaluated parameter combinations.
+    """
+    parameters: Dict[str, float]
+    objective: float
+    success: bool
+    message: str
+    n_evaluations: int
+
+def get_reference_series(
+    scenarios: List[Scenario],
+    store: ResultStore | None = None
+) -> List[ReferenceSeries]:
+    """Load the reference series of all outputs of the scenarios.
+
+    Reference times are aligned to the scenario time units. Missing
+    reference values are left out. Reference data files are read from
+    `store` (a new result store if not specified).
+    """
+    if store is None:
+        store = ResultStore()
+    series = []
+    for scenario_index, scenario in enumerate(scenarios):
+        for item in scenario.reference_data or []:
+            for output_index, output in enumerate(scenario.outputs):
+                if output.id not in item.mappings.keys():
+                    continue
+                (times, values) = store.get_reference_series(scenario, item, output.id)
+                valid = ~np.isnan(values)
+                series.append(ReferenceSeries(
+                    scenario_index = scenario_index,
+                    output_index = output_index,
+                    label = f"{scenario.id}/{output.id}/{item.id}",
+                    times = times[valid],
+                    values = values[valid]
+                ))
+    return series
+
+def fit_parameters(
+    config: SimulationConfig,
+    instance: ModelInstance,
+    parameters: List[FitParameter],
+    logger: Logger,
+    objective: ObjectiveType = ObjectiveType.LEAST_SQUARES,
+    n_workers: int | None = 1,
+    model_cache_dir: str | None = None,
+    dosing_mode: DosingMode = DosingMode.EVENTS,
+    max_evaluations: int = 1000
+) -> FitResult:
+    """Estimate parameters of a model instance from the reference data of
+    the scenarios of a configuration.
+
+    With objective `LEAST_SQUARES`, the weighted sum of squared residuals is
+    minimised using a trust region reflective least squares algorithm, where
+    the residuals of each reference series are scaled by the maximum
+    absolute reference value and the square root of the number of points.
+    With objective `LOG_LIKELIHOOD`, the negative log-likelihood of normally
+    distributed residuals with a separate (profiled) error variance per
+    reference series is minimised using L-BFGS-B. Scenarios are simulated in
+    parallel on `n_workers` worker processes (use None for all available
+    cores), which are kept alive during the optimisation. At most
+    `max_evaluations` optimiser iterations (function evaluations) are used.
+    """
+    if not parameters:
+        raise ValueError("At least one parameter is required for parameter estimation.")
+    series = get_reference_series(config.scenarios)
+    if not series:
+        raise ValueError(f"No reference data found in simulation config {config.id}.")
+
+    log_scale = np.array([param.log_scale for param in parameters])
+    lower = _transform(np.array([param.lower for param in parameters], dtype=float), log_scale)
+    upper = _transform(np.array([param.upper for param in parameters], dtype=float), log_scale)
+    x0 = np.array([
+        _transform(np.array([param.initial]), log_scale[[i]])[0]
+            if param.initial is not None else (lower[i] + upper[i]) / 2
+        for i, param in enumerate(parameters)
+    ])
+
+    logger.info(
+        "Fitting %s parameters of instance %s to %s reference series",
+        len(parameters),
+        instance.id,
+        len(series)
+    )
+    with TaskPool(n_workers) as pool:
+        evaluator = _ObjectiveEvaluator(
+            config.scenarios,
+            instance,
+            [param.id for param in parameters],
+            log_scale,
+            upper,
+            series,
+            pool,
+            logger,
+            model_cache_dir,
+            dosing_mode
+        )
+        if objective == ObjectiveType.LOG_LIKELIHOOD:
+            result = minimize(
+                evaluator.get_negative_log_likelihood,
+                x0,
+                jac = evaluator.get_negative_log_likelihood_gradient,
+                method = "L-BFGS-B",
+                bounds = list(zip(lower, upper)),
+                options = {"maxfun": max_evaluations}
+            )
+            value = float(result.fun)
+        else:
+            result = least_squares(
+                evaluator.get_residuals,
+                x0,
+                jac = evaluator.get_residuals_jacobian,
+                bounds = (lower, upper),
+                method = "trf",
+                max_nfev = max_evaluations
+            )
+            value = float(np.sum(result.fun ** 2))
+
+    estimates = _inverse_transform(result.x, log_scale)
+    logger.info("Fitted parameters: %s (objective %s)", dict(zip(evaluator.parameter_ids, estimates)), value)
+    return FitResult(
+        parameters = dict(zip(evaluator.parameter_ids, estimates.tolist())),
+        objective = value,
+        success = bool(result.success),
+        message = str(result.message),
+        n_evaluations = evaluator.n_evaluations
+    )
+
+class _ObjectiveEvaluator:
+    """Evaluates model predictions, residuals and objectives (and their
+    finite difference derivatives) for (transformed) parameter vectors."""
+
+    def __init__(
+        self,
+        scenarios: List[Scenario],
+        instance: ModelInstance,
+        parameter_ids: List[str],
+        log_scale: np.ndarray,
+        upper: np.ndarray,
+        series: List[ReferenceSeries],
+        pool: TaskPool,
+        logger: Logger,
+        model_cache_dir: str | None,
+        dosing_mode: DosingMode
+    ):
+        self.instance = instance
+        self.parameter_ids = parameter_ids
+        self.log_scale = log_scale
+        self.upper = upper
+        self.series = series
+        self.pool = pool
+        self.logger = logger
+        self.model_cache_dir = model_cache_dir
+        self.dosing_mode = dosing_mode
+        self.n_evaluations = 0
+        self._cache: Dict[bytes, List[np.ndarray]] = {}
+        self._scenario_indices = sorted({item.scenario_index for item in series})
+        # Only report the simulation results at the reference times
+        self.scenarios = list(scenarios)
+        for index in self._scenario_indices:
+            self.scenarios[index] = replace(
+                scenarios[index],
+                output_times = OutputTimes(
+                    OutputTimesType.LIST,
+                    times = np.unique(np.concatenate([
+                        item.times for item in series if item.scenario_index == index
+                    ])).tolist()
+                )
+            )
+        self._weights = [
+            1. / (max(np.max(np.abs(item.values)), 1e-300) * np.sqrt(len(item.values)))
+            for item in series
+        ]
+
+    def get_residuals(self, x: np.ndarray) -> np.ndarray:
+        """Get the weighted residuals of all reference series."""
+        return self._to_residuals(self._predict([x])[0])
+
+    def get_residuals_jacobian(self, x: np.ndarray) -> np.ndarray:
+        """Get the finite difference Jacobian of the weighted residuals."""
+        (points, steps) = self._get_perturbations(x)
+        predictions = self._predict([x] + points)
+        base = self._to_residuals(predictions[0])
+        return np.column_stack([
+            (self._to_residuals(prediction) - base) / step
+            for prediction, step in zip(predictions[1:], steps)
+        ])
+
+    def get_negative_log_likelihood(self, x: np.ndarray) -> float:
+        """Get the negative log-likelihood (up to a constant)."""
+        return self._to_negative_log_likelihood(self._predict([x])[0])
+
+    def get_negative_log_likelihood_gradient(self, x: np.ndarray) -> np.ndarray:
+        """Get the finite difference gradient of the negative log-likelihood."""
+        (points, steps) = self._get_perturbations(x)
+        predictions = self._predict([x] + points)
+        base = self._to_negative_log_likelihood(predictions[0])
+        return np.array([
+            (self._to_negative_log_likelihood(prediction) - base) / step
+            for prediction, step in zip(predictions[1:], steps)
+        ])
+
+    def _to_residuals(self, prediction: List[np.ndarray]) -> np.ndarray:
+        return np.concatenate([
+            weight * (values - item.values)
+            for item, values, weight in zip(self.series, prediction, self._weights)
+        ])
+
+    def _to_negative_log_likelihood(self, prediction: List[np.ndarray]) -> float:
+        return float(sum(
+            len(item.values) / 2 * np.log(max(np.mean((values - item.values) ** 2), _MIN_VARIANCE))
+            for item, values in zip(self.series, prediction)
+        ))
+
+    def _get_perturbations(self, x: np.ndarray) -> Tuple[List[np.ndarray], List[float]]:
+        points = []
+        steps = []
+        for j in range(len(x)):
+            step = _FD_RELATIVE_STEP * max(1., abs(x[j]))
+            if x[j] + step > self.upper[j]:
+                step = -step
+            point = x.copy()
+            point[j] += step
+            points.append(point)
+            steps.append(step)
+        return (points, steps)
+
+    def _predict(self, points: List[np.ndarray]) -> List[List[np.ndarray]]:
+        """Get the model predictions at the reference times of all series
+        for the specified (transformed) parameter vectors."""
+        missing = [x for x in points if x.tobytes() not in self._cache]
+        if missing:
+            tasks = []
+            for x in missing:
+                parameters = dict(zip(
+                    self.parameter_ids,
+                    _inverse_transform(x, self.log_scale).tolist()
+                ))
+                for scenario_index in self._scenario_indices:
+                    requests = [
+                        (i, item.output_index, item.times)
+                        for i, item in enumerate(self.series)
+                        if item.scenario_index == scenario_index
+                    ]
+                    tasks.append((
+                        self.instance,
+                        self.scenarios[scenario_index],
+                        parameters,
+                        requests,
+                        self.model_cache_dir,
+                        self.dosing_mode
+                    ))
+            results = self.pool.run(_simulate_reference_times, tasks, self.logger)
+            n_scenarios = len(self._scenario_indices)
+            # Only keep the predictions of the requested points
+            requested = {x.tobytes() for x in points}
+            self._cache = {key: value for key, value in self._cache.items() if key in requested}
+            for k, x in enumerate(missing):
+                prediction: List[np.ndarray] = [np.empty(0)] * len(self.series)
+                for result in results[k * n_scenarios:(k + 1) * n_scenarios]:
+                    for (i, values) in result:
+                        prediction[i] = values
+                self._cache[x.tobytes()] = prediction
+            self.n_evaluations += len(missing)
+        return [self._cache[x.tobytes()] for x in points]
+
+def _simulate_reference_times(
+    instance: ModelInstance,
+    scenario: Scenario,
+    parameters: Dict[str, float],
+    requests: List[Tuple[int, int, np.ndarray]],
+    model_cache_dir: str | None,
+    dosing_mode: DosingMode,
+    logger: Logger
+) -> List[Tuple[int, np.ndarray]]:
+    """Simulate a scenario and get the output values at the reference times
+    of the requested series."""
+    scenario_model = create_scenario_model(
+        instance,
+        scenario,
+        None,
+        get_default_model_cache(model_cache_dir),
+        dosing_mode,
+        parameters
+    )
+    results = simulate_scenario_model(scenario_model)
+    logger.debug("- Simulated scenario %s with parameters %s", scenario.id, parameters)
+    return [
+        (i, np.interp(times, results[:, 0], results[:, 1 + output_index]))
+        for (i, output_index, times) in requests
+    ]
+
+def _transform(values: np.ndarray, log_scale: np.ndarray) -> np.ndarray:
+    return np.where(log_scale, np.log(np.where(log_scale, values, 1.)), values)
+
+def _inverse_transform(values: np.ndarray, log_scale: np.ndarray) -> np.ndarray:
+    return np.where(log_scale, np.exp(np.where(log_scale, values, 0.)), values)
@@ -0,0 +1,176 @@
+"""Goodness-of-fit of simulation results against reference data.
+
+This module provides methods to compare the simulation results of model
+instances with the reference data of scenarios and to compute summary
+goodness-of-fit metrics (RMSE, MAPE, geometric mean fold error, fraction
+within 2-fold and R²) per scenario, output, instance and reference series.
+All computations are vectorised and do not depend on matplotlib, such that
+they can be used headless (e.g., in validation suites).
+"""
+
+from typing import List
+import numpy as np
+import pandas as pd
+
+from .definitions import (
+    ModelInstance,
+    Output,
+    ReferenceData,
+    Scenario,
+    SimulationConfig
+)
+from .result_store import ResultStore
+
+DIFFERENCES_COLUMNS = [
+    "scenario",
+    "output",
+    "reference",
+    "reference_label",
+    "reference_series",
+    "time",
+    "instance",
+    "instance_label",
+    "model_value",
+    "ref_value",
+    "residual",
+    "abs_diff",
+    "rel_diff"
+]
+
+GOODNESS_OF_FIT_KEYS = [
+    "scenario",
+    "output",
+    "instance",
+    "reference",
+    "reference_series"
+]
+
+def get_differences(
+    scenario: Scenario,
+    output: Output,
+    item: ReferenceData,
+    instance: ModelInstance,
+    store: ResultStore
+) -> pd.DataFrame:
+    """Get the differences between the results of a model instance and a
+    reference series of a scenario output at the reference time points.
+
+    Model results are linearly interpolated to the reference times (aligned
+    to the scenario time unit). Relative differences are NaN for zero
+    reference values.
+    """
+    (ref_times, ref_values) = store.get_reference_series(scenario, item, output.id)
+    (times, values) = store.get_output_series(scenario, instance, output)
+    model_values = np.interp(ref_times, times, values)
+    residuals = model_values - ref_values
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rel_diff = np.where(ref_values != 0, residuals / ref_values, np.nan)
+    return pd.DataFrame({
+        "scenario": scenario.id,
+        "output": output.id,
+        "reference": item.id,
+        "reference_label": item.label,
+        "reference_series": item.mappings[output.id],
+        "time": ref_times,
+        "instance": instance.id,
+        "instance_label": instance.label,
+        "model_value": model_values,
+        "ref_value": ref_values,
+        "residual": residuals,
+        "abs_diff": np.abs(residuals),
+        "rel_diff": rel_diff
+    }, columns=DIFFERENCES_COLUMNS)
+
+def get_scenario_differences(
+    instances: List[ModelInstance],
+    scenario: Scenario,
+    store: ResultStore
+) -> pd.DataFrame:
+    """Get the differences between the results of the model instances and
+    all reference series of a scenario (see `get_differences`)."""
+    frames = [
+        get_differences(scenario, output, item, instance, store)
+        for output in scenario.outputs
+        for item in scenario.reference_data or []
+        if output.id in item.mappings.keys()
+        for instance in instances
+    ]
+    if not frames:
+        return pd.DataFrame(columns=DIFFERENCES_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+def compute_goodness_of_fit(differences: pd.DataFrame) -> pd.DataFrame:
+    """Compute goodness-of-fit metrics from a table of differences.
+
+    Computes, per scenario, output, instance and reference series, the
+    number of reference points (`n`), the root mean squared error (`rmse`),
+    the mean absolute percentage error (`mape`, excluding zero reference
+    values), the geometric mean fold error (`gmfe`, i.e., 10 to the power
+    of the mean absolute log10 ratio of model and reference values), the
+    fraction of points within 2-fold of the reference values
+    (`fraction_2fold`) and the coefficient of determination (`r2`). Fold
+    errors are computed over the points with positive model and reference
+    values. Points with missing reference values are left out.
+    """
+    df = differences[~differences["ref_value"].isna()]
+    model = df["model_value"].to_numpy(dtype=float)
+    ref = df["ref_value"].to_numpy(dtype=float)
+    residual = df["residual"].to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        positive = (model > 0) & (ref > 0)
+        log_fold = np.where(positive, np.abs(np.log10(model / ref)), np.nan)
+        ape = np.where(ref != 0, np.abs(residual / ref), np.nan)
+    metrics = df[GOODNESS_OF_FIT_KEYS].assign(
+        squared_error = residual ** 2,
+        ape = ape,
+        log_fold = log_fold,
+        within_2fold = np.where(positive, log_fold <= np.log10(2.), np.nan),
+        ref_value = ref
+    )
+    groups = metrics.groupby(GOODNESS_OF_FIT_KEYS, sort=False)
+    metrics["total_squares"] = (ref - groups["ref_value"].transform("mean").to_numpy()) ** 2
+    summary = metrics.groupby(GOODNESS_OF_FIT_KEYS, sort=False).agg(
+        n = ("squared_error", "size"),
+        mse = ("squared_error", "mean"),
+        sse = ("squared_error", "sum"),
+        sst = ("total_squares", "sum"),
+        mape = ("ape", "mean"),
+        mean_log_fold = ("log_fold", "mean"),
+        fraction_2fold = ("within_2fold", "mean")
+    ).reset_index()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r2 = np.where(summary["sst"] > 0, 1 - summary["sse"] / summary["sst"], np.nan)
+    return pd.DataFrame({
+        **{key: summary[key] for key in GOODNESS_OF_FIT_KEYS},
+        "n": summary["n"],
+        "rmse": np.sqrt(summary["mse"]),
+        "mape": 100 * summary["mape"],
+        "gmfe": 10 ** summary["mean_log_fold"],
+        "fraction_2fold": summary["fraction_2fold"],
+        "r2": r2
+    })
+
+def evaluate_goodness_of_fit(
+    config: SimulationConfig,
+    out_path: str,
+    store: ResultStore | None = None
+) -> pd.DataFrame:
+    """Compute goodness-of-fit metrics of the results of all model
+    instances against the reference data of all scenarios of a
+    configuration.
+
+    Reads the results files from `out_path` (or from `store` if specified)
+    and returns a single table with the metrics (see
+    `compute_goodness_of_fit`) per scenario, output, instance and reference
+    series.
+    """
+    if store is None:
+        store = ResultStore(out_path)
+    frames = [
+        get_scenario_differences(config.model_instances, scenario, store)
+        for scenario in config.scenarios
+        if scenario.reference_data
+    ]
+    differences = (pd.concat(frames, ignore_index=True) if frames
+        else pd.DataFrame(columns=DIFFERENCES_COLUMNS))
+    return compute_goodness_of_fit(differences)
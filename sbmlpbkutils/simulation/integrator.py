@@ -0,0 +1,44 @@
+"""Integrator settings of PBK model simulations.
+
+This module provides methods to combine the integrator settings of model
+instances and scenarios and to apply them on roadrunner models.
+"""
+
+from dataclasses import asdict, fields
+from roadrunner import RoadRunner
+
+from .definitions import IntegratorSettings
+
+def merge_integrator_settings(
+    *settings: IntegratorSettings | None
+) -> IntegratorSettings | None:
+    """Merge integrator settings, where the specified (not None) values of
+    later settings override those of earlier settings."""
+    merged = None
+    for item in settings:
+        if item is None:
+            continue
+        if merged is None:
+            merged = IntegratorSettings(**asdict(item))
+            continue
+        for f in fields(IntegratorSettings):
+            value = getattr(item, f.name)
+            if value is not None:
+                setattr(merged, f.name, value)
+    return merged
+
+def apply_integrator_settings(
+    rr_model: RoadRunner,
+    settings: IntegratorSettings | None
+):
+    """Apply the specified integrator settings on a roadrunner model.
+
+    Unspecified settings are left unchanged.
+    """
+    if settings is None:
+        return
+    integrator = rr_model.getIntegrator()
+    for f in fields(IntegratorSettings):
+        value = getattr(settings, f.name)
+        if value is not None:
+            integrator.setValue(f.name, value)
@@ -0,0 +1,250 @@
+"""Tuning of integrator settings of PBK model simulations.
+
+This module provides methods to benchmark candidate integrator settings
+of a scenario for a model instance against a tight reference solution,
+and to select the fastest settings for which the errors of all outputs
+are within a specified error budget. The benchmark can also be run from
+the command line (see `main`).
+"""
+
+import argparse
+from dataclasses import asdict, dataclass
+from itertools import product
+import logging
+from logging import Logger
+import time
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+import pandas as pd
+import yaml
+
+from .definitions import (
+    DosingMode,
+    IntegratorSettings,
+    ModelInstance,
+    Scenario
+)
+from .integrator import merge_integrator_settings
+from .model_cache import ModelCache, get_default_model_cache
+from .simulation import create_scenario_model, load_config, simulate_scenario_model
+
+REFERENCE_INTEGRATOR_SETTINGS = IntegratorSettings(
+    absolute_tolerance = 1e-14,
+    relative_tolerance = 1e-10,
+    maximum_num_steps = 100000
+)
+
+@dataclass
+class IntegratorTuningResult:
+    """Result of an integrator tuning benchmark.
+
+    Attributes:
+        settings: fastest integrator settings within the error budget
+            (None if no candidate is within the error budget).
+        benchmark: table with the candidate settings, their runtimes
+            (seconds), the errors of the outputs and whether the candidate
+            is within the error budget.
+    """
+    settings: IntegratorSettings | None
+    benchmark: pd.DataFrame
+
+def create_integrator_candidates(
+    relative_tolerances: Sequence[float] = (1e-4, 1e-6, 1e-8),
+    absolute_tolerances: Sequence[float] = (1e-8, 1e-10, 1e-12),
+    stiff: Sequence[bool] = (True, False)
+) -> List[IntegratorSettings]:
+    """Create a grid of candidate integrator settings."""
+    return [
+        IntegratorSettings(
+            absolute_tolerance = atol,
+            relative_tolerance = rtol,
+            stiff = is_stiff
+        )
+        for (rtol, atol, is_stiff) in product(relative_tolerances, absolute_tolerances, stiff)
+    ]
+
+def tune_integrator(
+    instance: ModelInstance,
+    scenario: Scenario,
+    logger: Logger,
+    max_errors: float | Dict[str, float] = 1e-3,
+    candidates: List[IntegratorSettings] | None = None,
+    reference: IntegratorSettings = REFERENCE_INTEGRATOR_SETTINGS,
+    n_repeats: int = 3,
+    model_cache: ModelCache | None = None,
+    dosing_mode: DosingMode = DosingMode.EVENTS
+) -> IntegratorTuningResult:
+    """Benchmark candidate integrator settings of a scenario for a model
+    instance and select the fastest settings within an error budget.
+
+    The candidates (by default, a grid of tolerances for the stiff and
+    non-stiff solvers, see `create_integrator_candidates`) are applied on
+    top of the integrator settings of the instance and scenario. The error
+    of an output is the maximum absolute difference with the reference
+    solution (simulated using the `reference` settings), relative to the
+    maximum absolute value of the reference solution. The error budget is
+    specified as the maximum error of all outputs, or per output id (where
+    outputs that are not specified are not constrained). The runtime of a
+    candidate is the fastest of `n_repeats` simulations. Candidates for
+    which the simulation fails are reported with infinite errors.
+    """
+    if model_cache is None:
+        model_cache = get_default_model_cache()
+    if candidates is None:
+        candidates = create_integrator_candidates()
+    output_ids = [output.id for output in scenario.outputs]
+    if isinstance(max_errors, dict):
+        unknown = [key for key in max_errors.keys() if key not in output_ids]
+        if unknown:
+            raise ValueError(f"Outputs {unknown} not found in scenario {scenario.id}.")
+        budget = np.array([max_errors.get(output_id, np.inf) for output_id in output_ids])
+    else:
+        budget = np.full(len(output_ids), max_errors)
+    base = merge_integrator_settings(instance.integrator, scenario.integrator)
+
+    logger.info(
+        "Tuning integrator settings of scenario %s for instance %s (%s candidates)",
+        scenario.id,
+        instance.id,
+        len(candidates)
+    )
+    (_, reference_results) = _benchmark(
+        instance,
+        scenario,
+        merge_integrator_settings(base, reference),
+        1,
+        model_cache,
+        dosing_mode
+    )
+    scale = np.max(np.abs(reference_results[:, 1:]), axis=0)
+    scale[scale == 0] = 1.
+
+    records = []
+    candidate_settings = [merge_integrator_settings(base, candidate) for candidate in candidates]
+    for settings in candidate_settings:
+        try:
+            (runtime, results) = _benchmark(
+                instance,
+                scenario,
+                settings,
+                n_repeats,
+                model_cache,
+                dosing_mode
+            )
+            errors = np.max(np.abs(results[:, 1:] - reference_results[:, 1:]), axis=0) / scale
+        except RuntimeError as error:
+            logger.warning("- Simulation failed for integrator settings %s: %s", settings, error)
+            (runtime, errors) = (np.nan, np.full(len(output_ids), np.inf))
+        logger.debug("- Integrator settings %s: runtime %s, errors %s", settings, runtime, errors)
+        records.append({
+            **asdict(settings),
+            "runtime": runtime,
+            **{f"error_{output_id}": value for output_id, value in zip(output_ids, errors)},
+            "within_budget": bool(np.all(errors <= budget))
+        })
+    benchmark = pd.DataFrame.from_records(records)
+
+    selected = None
+    feasible = benchmark[benchmark["within_budget"]]
+    if not feasible.empty:
+        selected = candidate_settings[int(feasible["runtime"].idxmin())]
+        logger.info("- Selected integrator settings: %s", selected)
+    else:
+        logger.warning("- No integrator settings found within the error budget")
+    return IntegratorTuningResult(settings=selected, benchmark=benchmark)
+
+def get_integrator_settings_yaml(settings: IntegratorSettings) -> str:
+    """Get the YAML of the `integrator` section of a model instance or
+    scenario with the specified integrator settings."""
+    values = {key: value for (key, value) in asdict(settings).items() if value is not None}
+    return yaml.safe_dump({"integrator": values}, sort_keys=False)
+
+def main(args: Sequence[str] | None = None) -> int:
+    """Run an integrator tuning benchmark from the command line.
+
+    Tunes the integrator settings of a scenario for a model instance of a
+    YAML simulation configuration and prints the `integrator` section with
+    the selected settings, which can be added to the model instance (or
+    scenario) in the configuration. Returns exit code 1 when no candidate
+    is within the error budget.
+    """
+    parser = argparse.ArgumentParser(
+        prog = "sbmlpbk-tune-integrator",
+        description = "Select the fastest integrator settings within an error budget."
+    )
+    parser.add_argument("config", help="YAML simulation configuration file")
+    parser.add_argument("--scenario", required=True, help="id of the scenario")
+    parser.add_argument("--instance", required=True, help="id of the model instance")
+    parser.add_argument("--max-error", type=float, default=1e-3,
+        help="maximum relative error of all outputs (default: %(default)s)")
+    parser.add_argument("--output-max-error", nargs=2, action="append", default=[],
+        metavar=("OUTPUT", "MAX_ERROR"),
+        help="maximum relative error of an output (overrides --max-error, can be repeated)")
+    parser.add_argument("--relative-tolerances", type=float, nargs="+", default=[1e-4, 1e-6, 1e-8],
+        help="candidate relative tolerances")
+    parser.add_argument("--absolute-tolerances", type=float, nargs="+", default=[1e-8, 1e-10, 1e-12],
+        help="candidate absolute tolerances")
+    parser.add_argument("--repeats", type=int, default=3,
+        help="number of simulations per candidate (default: %(default)s)")
+    parser.add_argument("--dosing-mode", choices=[mode.name for mode in DosingMode],
+        default=DosingMode.EVENTS.name, help="dosing mode (default: %(default)s)")
+    parser.add_argument("--benchmark-file", help="CSV file to write the benchmark table to")
+    parsed = parser.parse_args(args)
+
+    logger = logging.getLogger("sbmlpbkutils.integrator_tuning")
+    if not logger.handlers:
+        logger.addHandler(logging.StreamHandler())
+        logger.setLevel(logging.INFO)
+    config = load_config(parsed.config)
+    instance = next((item for item in config.model_instances if item.id == parsed.instance), None)
+    if instance is None:
+        parser.error(f"model instance {parsed.instance} not found in {parsed.config}")
+    scenario = next((item for item in config.scenarios if item.id == parsed.scenario), None)
+    if scenario is None:
+        parser.error(f"scenario {parsed.scenario} not found in {parsed.config}")
+    max_errors: float | Dict[str, float] = parsed.max_error
+    if parsed.output_max_error:
+        max_errors = {output.id: parsed.max_error for output in scenario.outputs}
+        max_errors.update({output_id: float(value) for (output_id, value) in parsed.output_max_error})
+
+    result = tune_integrator(
+        instance,
+        scenario,
+        logger,
+        max_errors,
+        create_integrator_candidates(parsed.relative_tolerances, parsed.absolute_tolerances),
+        n_repeats = parsed.repeats,
+        dosing_mode = DosingMode[parsed.dosing_mode]
+    )
+    if parsed.benchmark_file is not None:
+        result.benchmark.to_csv(parsed.benchmark_file, index=False)
+    if result.settings is None:
+        return 1
+    print(get_integrator_settings_yaml(result.settings), end="")
+    return 0
+
+def _benchmark(
+    instance: ModelInstance,
+    scenario: Scenario,
+    settings: IntegratorSettings | None,
+    n_repeats: int,
+    model_cache: ModelCache,
+    dosing_mode: DosingMode
+) -> Tuple[float, np.ndarray]:
+    """Simulate a scenario `n_repeats` times with the specified integrator
+    settings and return the fastest runtime and the results."""
+    runtimes = []
+    results = np.empty(0)
+    for _ in range(max(n_repeats, 1)):
+        scenario_model = create_scenario_model(
+            instance,
+            scenario,
+            None,
+            model_cache,
+            dosing_mode,
+            integrator = settings
+        )
+        start = time.perf_counter()
+        results = simulate_scenario_model(scenario_model)
+        runtimes.append(time.perf_counter() - start)
+    return (min(runtimes), results)
@@ -0,0 +1,273 @@
+"""Caches of loaded and compiled SBML models.
+
+This module provides an in-process cache of parsed SBML documents and
+compiled roadrunner models, so that a model file that is simulated for
+multiple scenarios is parsed and JIT-compiled only once per process. The
+in-process cache can be backed by an on-disk cache of serialized roadrunner
+model states, which allows to skip compilation across processes and
+sessions.
+"""
+
+from collections import OrderedDict
+import glob
+import hashlib
+import json
+import os
+import tempfile
+from typing import Dict, List, Tuple
+import libsbml as ls
+import roadrunner
+
+from .definitions import EventSpec
+
+MODEL_CACHE_DIR_ENV = "SBMLPBKUTILS_MODEL_CACHE_DIR"
+
+def get_file_hash(path: str) -> str:
+    """Compute the SHA-256 hash of the content of the specified file."""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def get_modifications_key(
+    event_specs: List[EventSpec] | None,
+    parameters: Dict[str, float] | None = None
+) -> str:
+    """Create a key string representing the specified model modifications
+    (added events and parameters)."""
+    if not event_specs and not parameters:
+        return ""
+    return json.dumps([
+        [
+            [ev.target, ev.trigger, ev.assignment, ev.assignments]
+            for ev in event_specs or []
+        ],
+        parameters or {}
+    ], sort_keys=True)
+
+class ModelStateCache:
+    """On-disk cache of serialized compiled roadrunner models.
+
+    Entries are stored as roadrunner saved states in `cache_dir`. Entry
+    keys combine the SBML content hash, the libroadrunner version and the
+    modifications (events and parameters) applied to the model. When the
+    total size of the cached states exceeds `max_size` (bytes), the least
+    recently used entries are removed. Entries created by other libroadrunner versions
+    are considered stale and are removed on eviction.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_size: int = 1024 ** 3
+    ):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.version = roadrunner.__version__
+
+    def get_key(self, model_hash: str, modifications_key: str) -> str:
+        """Create the cache key for a model (content hash) and its
+        modifications."""
+        return hashlib.sha256(
+            f"{model_hash}|{self.version}|{modifications_key}".encode("utf-8")
+        ).hexdigest()
+
+    def load(self, key: str) -> roadrunner.RoadRunner | None:
+        """Load the model stored under the specified key (if available)."""
+        file_path = self._get_file_path(key)
+        try:
+            with open(file_path, "rb") as f:
+                state = f.read()
+            os.utime(file_path)
+        except OSError:
+            return None
+        rr_model = roadrunner.RoadRunner()
+        rr_model.loadStateS(state)
+        return rr_model
+
+    def save(self, key: str, rr_model: roadrunner.RoadRunner):
+        """Store the state of the model under the specified key."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        state = rr_model.saveStateS()
+        (fd, tmp_file) = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(state)
+        os.replace(tmp_file, self._get_file_path(key))
+        self.evict()
+
+    def evict(self):
+        """Remove stale entries and least recently used entries exceeding
+        the maximum cache size."""
+        entries = []
+        for file_path in glob.glob(os.path.join(self.cache_dir, "*.rrstate")):
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            if not os.path.basename(file_path).startswith(f"{self.version}-"):
+                self._remove(file_path)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, file_path))
+        total_size = sum(size for (_, size, _) in entries)
+        for (_, size, file_path) in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            self._remove(file_path)
+            total_size -= size
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        for file_path in glob.glob(os.path.join(self.cache_dir, "*.rrstate")):
+            self._remove(file_path)
+
+    def _get_file_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{self.version}-{key}.rrstate")
+
+    @staticmethod
+    def _remove(file_path: str):
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+
+class ModelCache:
+    """Least-recently-used cache of compiled roadrunner models.
+
+    Models are keyed by absolute model path, content hash and model
+    modifications (added events and parameters), so that a model file that
+    is modified on disk is reloaded. The cached compiled models are never handed out directly:
+    each call to `get_rr_model` returns a fresh copy of the compiled model
+    with its original values. If a `state_cache` is specified, compiled
+    models are loaded from, and saved to, this on-disk cache.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 16,
+        state_cache: ModelStateCache | None = None
+    ):
+        if max_size < 1:
+            raise ValueError("Model cache size should be at least 1.")
+        self.max_size = max_size
+        self.state_cache = state_cache
+        self.hits = 0
+        self.misses = 0
+        self._documents: OrderedDict[Tuple[str, str], ls.SBMLDocument] = OrderedDict()
+        self._models: OrderedDict[Tuple[str, str, str], roadrunner.RoadRunner] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+    def get_sbml_model(self, model_path: str) -> ls.Model:
+        """Get the (parsed) SBML model of the specified model file.
+
+        The returned SBML model is shared and should be treated as read-only.
+        """
+        key = (os.path.abspath(model_path), get_file_hash(model_path))
+        document = self._documents.get(key)
+        if document is None:
+            document = ls.readSBML(model_path)
+            self._documents[key] = document
+            while len(self._documents) > self.max_size:
+                self._documents.popitem(last=False)
+        else:
+            self._documents.move_to_end(key)
+        return document.getModel()
+
+    def get_rr_model(
+        self,
+        model_path: str,
+        event_specs: List[EventSpec] | None = None,
+        parameters: Dict[str, float] | None = None
+    ) -> roadrunner.RoadRunner:
+        """Get a fresh copy of the compiled roadrunner model.
+
+        Loads and compiles the model if it is not available in the cache.
+        When `event_specs` and/or `parameters` (ids and initial values) are
+        specified, the returned model includes these events and parameters.
+        """
+        model_hash = get_file_hash(model_path)
+        modifications_key = get_modifications_key(event_specs, parameters)
+        key = (os.path.abspath(model_path), model_hash, modifications_key)
+        rr_model = self._models.get(key)
+        if rr_model is None:
+            self.misses += 1
+            rr_model = self._load(model_path, model_hash, event_specs, parameters)
+            self._models[key] = rr_model
+            while len(self._models) > self.max_size:
+                self._models.popitem(last=False)
+        else:
+            self.hits += 1
+            self._models.move_to_end(key)
+        return roadrunner.RoadRunner(rr_model)
+
+    def clear(self):
+        """Remove all models from the cache."""
+        self._documents.clear()
+        self._models.clear()
+
+    def _load(
+        self,
+        model_path: str,
+        model_hash: str,
+        event_specs: List[EventSpec] | None,
+        parameters: Dict[str, float] | None
+    ) -> roadrunner.RoadRunner:
+        """Load a model from the state cache or compile it."""
+        # Tellurium (which extends the roadrunner models) imports matplotlib,
+        # so it is only imported once models are loaded
+        import tellurium as te
+
+        state_key = None
+        if self.state_cache is not None:
+            state_key = self.state_cache.get_key(
+                model_hash,
+                get_modifications_key(event_specs, parameters)
+            )
+            rr_model = self.state_cache.load(state_key)
+            if rr_model is not None:
+                return rr_model
+
+        if event_specs or parameters:
+            rr_model = self._get_base_model(model_path, model_hash)
+            for param, value in (parameters or {}).items():
+                rr_model.addParameter(param, value, False)
+            event_count = 0
+            for ev in event_specs or []:
+                event_count += 1
+                eid = f"ev_{event_count}"
+                rr_model.addEvent(eid, False, ev.trigger, False)
+                rr_model.addEventAssignment(eid, ev.target, ev.assignment, False)
+                for variable, assignment in (ev.assignments or {}).items():
+                    rr_model.addEventAssignment(eid, variable, assignment, False)
+            rr_model.regenerateModel(True, True)
+        else:
+            rr_model = te.loadSBMLModel(model_path)
+
+        if self.state_cache is not None and state_key is not None:
+            self.state_cache.save(state_key, rr_model)
+        return rr_model
+
+    def _get_base_model(self, model_path: str, model_hash: str) -> roadrunner.RoadRunner:
+        """Get a fresh copy of the model without modifications, without
+        counting it as a cache hit or miss and without adding it to (or
+        moving it in) the least-recently-used order of the cache."""
+        key = (os.path.abspath(model_path), model_hash, get_modifications_key(None, None))
+        rr_model = self._models.get(key)
+        if rr_model is None:
+            return self._load(model_path, model_hash, None, None)
+        return roadrunner.RoadRunner(rr_model)
+
+_default_model_caches: Dict[str | None, ModelCache] = {}
+
+def get_default_model_cache(cache_dir: str | None = None) -> ModelCache:
+    """Get the process-wide model cache used by default for simulations.
+
+    If `cache_dir` is specified (or otherwise, if the environment variable
+    `SBMLPBKUTILS_MODEL_CACHE_DIR` is set), the returned model cache is
+    backed by an on-disk model state cache in this directory.
+    """
+    if cache_dir is None:
+        cache_dir = os.environ.get(MODEL_CACHE_DIR_ENV) or None
+    if cache_dir not in _default_model_caches:
+        state_cache = ModelStateCache(cache_dir) if cache_dir is not None else None
+        _default_model_caches[cache_dir] = ModelCache(state_cache=state_cache)
+    return _default_model_caches[cache_dir]
@@ -0,0 +1,75 @@
+"""Explicit output time points of PBK model simulation scenarios.
+
+This module provides methods to resolve the output times of scenarios
+that specify explicit output times (a list of time points, the time points
+of the reference data, or a log-spaced grid), such that the integrator
+only reports the results at these time points instead of on a dense
+uniform grid. The time points of reference data files are read once per
+process (and again only when a file changes).
+"""
+
+from functools import lru_cache
+import os
+import numpy as np
+
+from .definitions import (
+    OutputTimesType,
+    Scenario
+)
+from .results_io import read_results
+from .units import get_time_unit_alignment_factor
+
+def get_output_times(scenario: Scenario) -> np.ndarray | None:
+    """Get the explicit output times of a scenario.
+
+    Returns the sorted, unique output times (in scenario time unit) within
+    the scenario duration, or None when the scenario does not specify
+    explicit output times.
+    """
+    output_times = scenario.output_times
+    if output_times is None:
+        return None
+    if output_times.type == OutputTimesType.LIST:
+        if not output_times.times:
+            raise ValueError(f"times are required for output times of type {output_times.type.name}")
+        times = np.asarray(output_times.times, dtype=float)
+    elif output_times.type == OutputTimesType.REFERENCE:
+        if not scenario.reference_data:
+            raise ValueError(f"No reference data found for output times of scenario {scenario.id}.")
+        times = np.concatenate([
+            get_reference_times(item.file_path)
+                / get_time_unit_alignment_factor(item.time_unit, scenario.time_unit)
+            for item in scenario.reference_data
+        ])
+    elif output_times.type == OutputTimesType.LOG:
+        if output_times.start is None or not output_times.n_points:
+            raise ValueError(f"start and n_points are required for output times of type {output_times.type.name}")
+        if not 0 < output_times.start < scenario.duration:
+            raise ValueError("start of log-spaced output times should be within the scenario duration.")
+        times = np.concatenate((
+            [0.],
+            np.geomspace(output_times.start, scenario.duration, output_times.n_points)
+        ))
+    else:
+        raise ValueError(f"Unknown output times type: {output_times.type}")
+    times = np.unique(times[~np.isnan(times)])
+    times = times[(times >= 0) & (times <= scenario.duration)]
+    if len(times) == 0:
+        raise ValueError(f"No output times within the duration of scenario {scenario.id}.")
+    return times
+
+def get_reference_times(file_path: str) -> np.ndarray:
+    """Get the time points (in the time unit of the file) of a reference
+    data file.
+
+    The time points are cached per file path, size and modification time,
+    so the file is only read again when it changes.
+    """
+    stat = os.stat(file_path)
+    return _read_reference_times(os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+
+@lru_cache(maxsize=256)
+def _read_reference_times(file_path: str, size: int, mtime: int) -> np.ndarray:
+    times = read_results(file_path)['time'].to_numpy(dtype=float)
+    times.flags.writeable = False
+    return times
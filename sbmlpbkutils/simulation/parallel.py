@@ -0,0 +1,139 @@
+"""Helpers for running simulation tasks in parallel.
+
+This module provides a small process pool wrapper for running independent
+simulation tasks on multiple cores. Log messages emitted by a task are
+buffered in the worker and replayed on the caller's logger in task order,
+so that the log output of parallel runs does not interleave and is
+identical to that of sequential runs.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import logging
+from logging import Logger
+import os
+from typing import Any, Callable, List, Sequence, Tuple
+
+class _BufferedLogHandler(logging.Handler):
+    """Log handler that stores (level, message) tuples of handled records."""
+
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.records: List[Tuple[int, str]] = []
+
+    def emit(self, record: logging.LogRecord):
+        self.records.append((record.levelno, record.getMessage()))
+
+def resolve_worker_count(n_workers: int | None) -> int:
+    """Resolve the number of worker processes to use.
+
+    Returns the number of available cores when `n_workers` is None or
+    smaller than one.
+    """
+    if n_workers is None or n_workers < 1:
+        return os.cpu_count() or 1
+    return n_workers
+
+class TaskPool:
+    """Pool of worker processes for running batches of tasks.
+
+    The worker processes are kept alive between batches (until the pool is
+    closed), so that per-process caches, such as the compiled models of the
+    default model cache, are reused by subsequent batches. With a single
+    worker, tasks are run sequentially in the current process. Use the pool
+    as a context manager to close it after use.
+    """
+
+    def __init__(self, n_workers: int | None):
+        self.n_workers = resolve_worker_count(n_workers)
+        self._executor: ProcessPoolExecutor | None = None
+
+    def __enter__(self) -> "TaskPool":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def run(
+        self,
+        fn: Callable[..., Any],
+        tasks: Sequence[tuple],
+        logger: Logger,
+        on_result: Callable[[Any], None] | None = None
+    ) -> List[Any]:
+        """Run `fn(*args, logger)` for all argument tuples in `tasks` (see
+        `run_tasks`)."""
+        results = []
+        def _collect(result: Any):
+            if on_result is not None:
+                on_result(result)
+            else:
+                results.append(result)
+
+        if self.n_workers == 1:
+            for args in tasks:
+                _collect(fn(*args, logger))
+            return results
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.n_workers)
+        futures = [
+            self._executor.submit(_run_buffered, fn, args)
+            for args in tasks
+        ]
+        for i, future in enumerate(futures):
+            (result, records, error) = future.result()
+            for level, message in records:
+                logger.log(level, message)
+            if error is not None:
+                for pending in futures[i:]:
+                    pending.cancel()
+                raise error
+            futures[i] = None
+            _collect(result)
+        return results
+
+    def close(self):
+        """Shut down the worker processes of the pool."""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+def run_tasks(
+    fn: Callable[..., Any],
+    tasks: Sequence[tuple],
+    n_workers: int | None,
+    logger: Logger,
+    on_result: Callable[[Any], None] | None = None
+) -> List[Any]:
+    """Run `fn(*args, logger)` for all argument tuples in `tasks`.
+
+    Tasks are run in a process pool with `n_workers` workers (all available
+    cores if None). With a single worker, tasks are run sequentially in the
+    current process. Results are returned in the order of `tasks`. When
+    `on_result` is specified, results are instead passed to this callback
+    (in the order of `tasks`) as soon as they are available and are not
+    kept, in which case an empty list is returned. Any exception raised by
+    a task is re-raised after the log messages of the preceding tasks and
+    of the failing task have been replayed.
+    """
+    n_workers = min(resolve_worker_count(n_workers), max(len(tasks), 1))
+    with TaskPool(n_workers) as pool:
+        return pool.run(fn, tasks, logger, on_result)
+
+def _run_buffered(
+    fn: Callable[..., Any],
+    args: tuple
+) -> Tuple[Any, List[Tuple[int, str]], BaseException | None]:
+    """Worker entry point: run a task with a buffering task logger."""
+    task_logger = logging.getLogger(f"{__name__}.task.{os.getpid()}")
+    task_logger.setLevel(logging.DEBUG)
+    task_logger.propagate = False
+    handler = _BufferedLogHandler()
+    task_logger.addHandler(handler)
+    try:
+        result = fn(*args, task_logger)
+        return (result, handler.records, None)
+    except Exception as error:  # pylint: disable=broad-exception-caught
+        return (None, handler.records, error)
+    finally:
+        task_logger.removeHandler(handler)
@@ -0,0 +1,318 @@
+"""Pharmacokinetic metrics of simulation results.
+
+This module provides vectorised methods to compute pharmacokinetic metrics
+(AUC over time windows, Cmax/Tmax, Cmin, terminal half-life and
+accumulation ratio) from simulation result arrays with the time points
+along the second-to-last axis and the outputs along the last axis, e.g.,
+(time points, outputs) for a single run or (individuals, time points,
+outputs) for stacked population batches. The metrics can also be
+accumulated over consecutive chunks of time points, such that the
+trajectories of streaming runs do not need to be stored.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+PK_METRICS = ["auc", "cmax", "tmax", "cmin", "half_life"]
+
+def compute_auc(
+    times: np.ndarray,
+    values: np.ndarray,
+    start: float | None = None,
+    end: float | None = None
+) -> np.ndarray:
+    """Compute the area under the curve (trapezoidal rule) of the outputs
+    over the time window from `start` to `end` (by default, the full time
+    range). The values at the window boundaries are linearly interpolated.
+    """
+    return _window_auc(
+        np.asarray(times, dtype=float),
+        np.asarray(values),
+        -np.inf if start is None else start,
+        np.inf if end is None else end
+    )
+
+def compute_cmax(
+    times: np.ndarray,
+    values: np.ndarray,
+    start: float | None = None,
+    end: float | None = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Compute the peak values (Cmax) of the outputs and the (first) time
+    points at which they are reached (Tmax), over the time points within
+    the time window from `start` to `end` (by default, all time points).
+    """
+    (times, values) = _select_window(times, values, start, end)
+    index = np.argmax(values, axis=-2)
+    return (np.max(values, axis=-2), times[index])
+
+def compute_cmin(
+    times: np.ndarray,
+    values: np.ndarray,
+    start: float | None = None,
+    end: float | None = None
+) -> np.ndarray:
+    """Compute the minimum values (Cmin) of the outputs over the time
+    points within the time window from `start` to `end` (by default, all
+    time points)."""
+    (_, values) = _select_window(times, values, start, end)
+    return np.min(values, axis=-2)
+
+def compute_terminal_half_life(
+    times: np.ndarray,
+    values: np.ndarray,
+    n_points: int = 3
+) -> np.ndarray:
+    """Compute the terminal half-lives of the outputs from a log-linear
+    regression over the final `n_points` time points.
+
+    The half-life is NaN when the final values are not all positive or
+    when they are not decreasing.
+    """
+    times = np.asarray(times, dtype=float)[-n_points:]
+    values = np.asarray(values)[..., -n_points:, :]
+    if len(times) < 2:
+        return np.full(values.shape[:-2] + values.shape[-1:], np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_values = np.where(values > 0, np.log(values), np.nan)
+        centered = (times - times.mean())[:, np.newaxis]
+        slopes = np.sum(
+            centered * (log_values - log_values.mean(axis=-2, keepdims=True)),
+            axis=-2
+        ) / np.sum(centered ** 2)
+        return np.where(slopes < 0, -np.log(2.) / slopes, np.nan)
+
+def compute_accumulation_ratio(
+    times: np.ndarray,
+    values: np.ndarray,
+    interval: float,
+    start: float = 0.
+) -> np.ndarray:
+    """Compute the accumulation ratios of the outputs of repeated dosing,
+    i.e., the AUC over the final dosing `interval` divided by the AUC over
+    the first dosing interval (starting at `start`).
+
+    The ratio is NaN when the AUC over the first interval is zero.
+    """
+    times = np.asarray(times, dtype=float)
+    first = compute_auc(times, values, start, start + interval)
+    last = compute_auc(times, values, times[-1] - interval, times[-1])
+    return _ratio(last, first)
+
+@dataclass
+class PkMetrics:
+    """Pharmacokinetic metrics of the outputs of one or more runs.
+
+    All metric arrays have the shape of the leading (e.g., individuals)
+    axes of the result arrays, followed by the outputs.
+
+    Attributes:
+        output_ids: ids of the outputs.
+        auc: areas under the curve over the full time range.
+        cmax: peak values.
+        tmax: (first) time points of the peak values.
+        cmin: minimum values.
+        half_life: terminal half-lives.
+        window_aucs: areas under the curve per (start, end) time window.
+        accumulation_ratio: accumulation ratios (None if no dosing
+            interval is specified).
+    """
+    output_ids: List[str]
+    auc: np.ndarray
+    cmax: np.ndarray
+    tmax: np.ndarray
+    cmin: np.ndarray
+    half_life: np.ndarray
+    window_aucs: Dict[Tuple[float, float], np.ndarray] = field(default_factory=dict)
+    accumulation_ratio: np.ndarray | None = None
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Convert the metrics to a table with a row per run and output.
+
+        For multiple runs, the `index` column holds the (flat) index of the
+        run in the leading axes of the result arrays.
+        """
+        shape = self.auc.shape
+        n_runs = int(np.prod(shape[:-1]))
+        columns = {}
+        if len(shape) > 1:
+            columns["index"] = np.repeat(np.arange(n_runs), len(self.output_ids))
+        columns["output"] = np.tile(self.output_ids, n_runs)
+        for metric in PK_METRICS:
+            columns[metric] = getattr(self, metric).ravel()
+        for (start, end), auc in self.window_aucs.items():
+            columns[f"auc_{start:g}_{end:g}"] = auc.ravel()
+        if self.accumulation_ratio is not None:
+            columns["accumulation_ratio"] = self.accumulation_ratio.ravel()
+        return pd.DataFrame(columns)
+
+class PkMetricsAccumulator:
+    """Accumulator of pharmacokinetic metrics over consecutive chunks of
+    time points.
+
+    Each call of `update` integrates the chunk (joined to the final time
+    point of the previous chunk) into the AUCs and updates the peak and
+    minimum values and the final time points for the terminal half-life,
+    so only the current metrics are kept in memory. The accumulation ratio
+    (for repeated dosing with the specified `interval`, starting at
+    `dose_start`) requires the `end_time` of the run to be known upfront.
+    """
+
+    def __init__(
+        self,
+        output_ids: Sequence[str],
+        windows: Sequence[Tuple[float, float]] | None = None,
+        interval: float | None = None,
+        dose_start: float = 0.,
+        end_time: float | None = None,
+        n_terminal_points: int = 3
+    ):
+        if interval is not None and end_time is None:
+            raise ValueError("The end time is required to compute accumulation ratios.")
+        self.output_ids = list(output_ids)
+        self.windows = [(float(start), float(end)) for (start, end) in windows or []]
+        self.n_terminal_points = n_terminal_points
+        self._accumulation_windows = [] if interval is None else [
+            (dose_start, dose_start + interval),
+            (end_time - interval, end_time)
+        ]
+        self._times = np.empty(0)
+        self._values = None
+        self._auc = None
+        self._window_aucs = {}
+        self._cmax = None
+        self._tmax = None
+        self._cmin = None
+
+    def update(self, times: np.ndarray, values: np.ndarray):
+        """Add a chunk of (increasing) time points and the corresponding
+        output values."""
+        times = np.asarray(times, dtype=float)
+        values = np.asarray(values)
+        if values.shape[-2] != len(times):
+            raise ValueError("The number of time points of times and values should be equal.")
+        if len(times) == 0:
+            return
+        if self._values is None:
+            self._values = values[..., :0, :]
+            self._auc = np.zeros(values.shape[:-2] + values.shape[-1:])
+            self._window_aucs = {
+                window: np.zeros_like(self._auc)
+                for window in self.windows + self._accumulation_windows
+            }
+            self._cmax = np.full_like(self._auc, -np.inf)
+            self._tmax = np.full_like(self._auc, np.nan)
+            self._cmin = np.full_like(self._auc, np.inf)
+
+        # Join the chunk to the final time point of the previous chunk
+        segment_times = np.concatenate((self._times[-1:], times))
+        segment_values = np.concatenate((self._values[..., -1:, :], values), axis=-2)
+        self._auc += _window_auc(segment_times, segment_values, -np.inf, np.inf)
+        for (start, end), auc in self._window_aucs.items():
+            auc += _window_auc(segment_times, segment_values, start, end)
+
+        (cmax, tmax) = compute_cmax(times, values)
+        is_peak = cmax > self._cmax
+        self._cmax = np.where(is_peak, cmax, self._cmax)
+        self._tmax = np.where(is_peak, tmax, self._tmax)
+        self._cmin = np.minimum(self._cmin, compute_cmin(times, values))
+
+        n = max(self.n_terminal_points, 1)
+        self._times = segment_times[-n:]
+        self._values = segment_values[..., -n:, :]
+
+    def result(self) -> PkMetrics:
+        """Get the metrics of the time points added so far."""
+        if self._values is None:
+            raise ValueError("No time points added to the accumulator.")
+        accumulation_ratio = None
+        if self._accumulation_windows:
+            (first, last) = self._accumulation_windows
+            accumulation_ratio = _ratio(self._window_aucs[last], self._window_aucs[first])
+        return PkMetrics(
+            output_ids = self.output_ids,
+            auc = self._auc.copy(),
+            cmax = self._cmax.copy(),
+            tmax = self._tmax.copy(),
+            cmin = self._cmin.copy(),
+            half_life = compute_terminal_half_life(
+                self._times,
+                self._values,
+                self.n_terminal_points
+            ),
+            window_aucs = {window: self._window_aucs[window].copy() for window in self.windows},
+            accumulation_ratio = accumulation_ratio
+        )
+
+def compute_pk_metrics(
+    times: np.ndarray,
+    values: np.ndarray,
+    output_ids: Sequence[str],
+    windows: Sequence[Tuple[float, float]] | None = None,
+    interval: float | None = None,
+    dose_start: float = 0.,
+    n_terminal_points: int = 3
+) -> PkMetrics:
+    """Compute the pharmacokinetic metrics of the outputs of one run
+    (values with shape time points x outputs) or of stacked runs (e.g.,
+    individuals x time points x outputs).
+
+    Computes the AUC over the full time range and over the specified
+    (start, end) time `windows`, Cmax/Tmax, Cmin, the terminal half-life
+    (over the final `n_terminal_points` time points) and, when a dosing
+    `interval` is specified, the accumulation ratio of repeated dosing
+    starting at `dose_start` (see `compute_accumulation_ratio`).
+    """
+    times = np.asarray(times, dtype=float)
+    accumulator = PkMetricsAccumulator(
+        output_ids,
+        windows = windows,
+        interval = interval,
+        dose_start = dose_start,
+        end_time = times[-1] if len(times) else None,
+        n_terminal_points = n_terminal_points
+    )
+    accumulator.update(times, values)
+    return accumulator.result()
+
+def _window_auc(
+    times: np.ndarray,
+    values: np.ndarray,
+    start: float,
+    end: float
+) -> np.ndarray:
+    """Integrate the linear interpolation of the values over the parts of
+    the segments between consecutive time points within the window."""
+    (t0, t1) = (times[:-1], times[1:])
+    lower = np.clip(t0, start, end)
+    upper = np.clip(t1, start, end)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dt = t1 - t0
+        w_lower = np.where(dt > 0, (lower - t0) / dt, 0.)[:, np.newaxis]
+        w_upper = np.where(dt > 0, (upper - t0) / dt, 0.)[:, np.newaxis]
+    (v0, v1) = (values[..., :-1, :], values[..., 1:, :])
+    v_lower = v0 + (v1 - v0) * w_lower
+    v_upper = v0 + (v1 - v0) * w_upper
+    return np.sum((upper - lower)[:, np.newaxis] * (v_lower + v_upper) / 2, axis=-2)
+
+def _select_window(
+    times: np.ndarray,
+    values: np.ndarray,
+    start: float | None,
+    end: float | None
+) -> Tuple[np.ndarray, np.ndarray]:
+    times = np.asarray(times, dtype=float)
+    values = np.asarray(values)
+    if start is None and end is None:
+        return (times, values)
+    mask = ((times >= (-np.inf if start is None else start))
+        & (times <= (np.inf if end is None else end)))
+    if not np.any(mask):
+        raise ValueError(f"No time points within the window from {start} to {end}.")
+    return (times[mask], values[..., mask, :])
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator != 0, numerator / denominator, np.nan)
@@ -0,0 +1,284 @@
+"""Monte Carlo population simulations.
+
+This module provides methods to draw parameter samples for populations of
+virtual individuals and to simulate scenarios for all individuals of a
+population. Individuals are simulated in batches, using one compiled model
+per worker process. The simulation results are streamed into an on-disk
+array store (numpy `.npy` file) and percentiles of the outputs are computed
+from this store in blocks of time points, such that the trajectories of
+all individuals are never held in memory at once.
+"""
+
+from logging import Logger
+import os
+from typing import Dict, List, Tuple
+import numpy as np
+import pandas as pd
+from scipy.stats import norm, qmc
+
+from .definitions import (
+    DistributionType,
+    DosingMode,
+    ModelInstance,
+    ParameterDistribution,
+    Population,
+    SamplingMethod,
+    Scenario,
+    SimulationConfig
+)
+from .model_cache import get_default_model_cache
+from .parallel import resolve_worker_count, run_tasks
+from .simulation import create_scenario_model, simulate_scenario_model
+
+_QUANTILE_EPSILON = 1e-12
+
+def get_population_file_names(
+    scenario_id: str,
+    instance_id: str
+) -> Tuple[str, str, str]:
+    """Get the names of the samples, results store and percentiles files
+    of a population simulation of a scenario-instance pair."""
+    prefix = f"{scenario_id}_{instance_id}_population"
+    return (
+        f"{prefix}_samples.csv",
+        f"{prefix}.npy",
+        f"{prefix}_percentiles.csv"
+    )
+
+def sample_population(population: Population) -> pd.DataFrame:
+    """Draw the parameter samples of the individuals of a population.
+
+    Returns a table with one row per individual and one column per
+    parameter. Samples are drawn using the sampling method of the
+    population and are reproducible when the population has a seed.
+    """
+    n_params = len(population.parameters)
+    if population.size < 1 or n_params == 0:
+        raise ValueError("Population should have a positive size and at least one parameter.")
+    rng = np.random.default_rng(population.seed)
+    if population.sampling == SamplingMethod.LATIN_HYPERCUBE:
+        samples = qmc.LatinHypercube(n_params, rng=rng).random(population.size)
+    elif population.sampling == SamplingMethod.SOBOL:
+        samples = qmc.Sobol(n_params, scramble=True, rng=rng).random(population.size)
+    else:
+        samples = rng.random((population.size, n_params))
+    samples = np.clip(samples, _QUANTILE_EPSILON, 1. - _QUANTILE_EPSILON)
+
+    if population.correlations:
+        samples = _correlate_samples(samples, population)
+
+    return pd.DataFrame({
+        param.id: get_distribution_quantiles(param, samples[:, i])
+        for i, param in enumerate(population.parameters)
+    })
+
+def get_distribution_quantiles(
+    param: ParameterDistribution,
+    probabilities: np.ndarray
+) -> np.ndarray:
+    """Get the quantiles of the distribution of a parameter for the
+    specified probabilities."""
+    if param.distribution == DistributionType.NORMAL:
+        _check_fields(param, "mean", "sd")
+        return param.mean + param.sd * norm.ppf(probabilities)
+    if param.distribution == DistributionType.LOGNORMAL:
+        _check_fields(param, "mean", "cv")
+        sigma = np.sqrt(np.log1p(param.cv ** 2))
+        mu = np.log(param.mean) - sigma ** 2 / 2
+        return np.exp(mu + sigma * norm.ppf(probabilities))
+    if param.distribution == DistributionType.UNIFORM:
+        _check_fields(param, "lower", "upper")
+        return param.lower + probabilities * (param.upper - param.lower)
+    if param.distribution == DistributionType.LOGUNIFORM:
+        _check_fields(param, "lower", "upper")
+        (log_lower, log_upper) = (np.log(param.lower), np.log(param.upper))
+        return np.exp(log_lower + probabilities * (log_upper - log_lower))
+    raise ValueError(f"Unknown distribution type: {param.distribution}")
+
+def compute_population_percentiles(
+    store: np.ndarray,
+    percentiles: List[float],
+    max_block_size: int = 64 * 1024 ** 2
+) -> np.ndarray:
+    """Compute percentiles over the individuals of a population results store.
+
+    The store has shape (individuals, time points, outputs). Percentiles
+    are computed in blocks of time points of at most `max_block_size`
+    bytes, such that (memory mapped) stores that do not fit in memory can
+    be processed. Returns an array of shape (percentiles, time points,
+    outputs).
+    """
+    (n_individuals, n_times, n_outputs) = store.shape
+    block_size = max(1, max_block_size // max(1, n_individuals * n_outputs * store.itemsize))
+    result = np.empty((len(percentiles), n_times, n_outputs))
+    for start in range(0, n_times, block_size):
+        end = min(start + block_size, n_times)
+        block = np.asarray(store[:, start:end, :], dtype=np.float64)
+        result[:, start:end, :] = np.percentile(block, percentiles, axis=0)
+    return result
+
+def run_population(
+    instance: ModelInstance,
+    scenario: Scenario,
+    out_path: str,
+    logger: Logger,
+    n_workers: int | None = 1,
+    model_cache_dir: str | None = None,
+    dosing_mode: DosingMode = DosingMode.EVENTS,
+    batch_size: int | None = None
+) -> pd.DataFrame:
+    """Simulate a scenario for all individuals of the population of a
+    model instance.
+
+    Draws the parameter samples of the population and simulates the
+    individuals in batches of `batch_size` individuals, in a process pool
+    when `n_workers` is larger than one (use None for all available cores).
+    The sampled parameters override the values of the parameter file and
+    scenario. Writes the parameter samples (CSV), the outputs of all
+    individuals as a single precision array store with shape (individuals,
+    time points, outputs) and the output percentiles (CSV) into `out_path`
+    (see `get_population_file_names`). Returns the percentiles table.
+    """
+    population = instance.population
+    if population is None:
+        raise ValueError(f"Model instance {instance.id} has no population.")
+    (samples_file, store_file, percentiles_file) = [
+        os.path.join(out_path, file_name)
+        for file_name in get_population_file_names(scenario.id, instance.id)
+    ]
+    os.makedirs(out_path, exist_ok=True)
+
+    # Draw and write parameter samples
+    samples = sample_population(population)
+    samples.to_csv(samples_file, index=False)
+
+    # Create batches of individuals
+    if batch_size is None:
+        batch_size = -(-population.size // (4 * resolve_worker_count(n_workers)))
+    batch_size = max(1, batch_size)
+    records = samples.to_dict(orient="records")
+    tasks = [
+        (
+            instance,
+            scenario,
+            start,
+            records[start:start + batch_size],
+            model_cache_dir,
+            dosing_mode
+        )
+        for start in range(0, population.size, batch_size)
+    ]
+
+    # Simulate individuals and stream the results into the store
+    store: Dict[str, np.ndarray] = {}
+    def _store_batch(result: Tuple[int, np.ndarray, np.ndarray]):
+        (start, times, values) = result
+        if "values" not in store:
+            store["times"] = times
+            store["values"] = np.lib.format.open_memmap(
+                store_file,
+                mode="w+",
+                dtype=np.float32,
+                shape=(population.size,) + values.shape[1:]
+            )
+        store["values"][start:start + values.shape[0]] = values
+    logger.info(
+        "Running population scenario %s for instance %s (%s individuals)",
+        scenario.id,
+        instance.id,
+        population.size
+    )
+    run_tasks(_run_population_batch, tasks, n_workers, logger, _store_batch)
+    store["values"].flush()
+
+    # Compute and write percentiles
+    percentiles = compute_population_percentiles(store["values"], population.percentiles)
+    df = pd.DataFrame({"time": store["times"]})
+    for i, output in enumerate(scenario.outputs):
+        for j, percentile in enumerate(population.percentiles):
+            df[f"{output.id}_p{percentile:g}"] = percentiles[j, :, i]
+    df.to_csv(percentiles_file, index=False)
+    del store["values"]
+    return df
+
+def run_population_config(
+    config: SimulationConfig,
+    out_path: str,
+    logger: Logger,
+    n_workers: int | None = 1,
+    model_cache_dir: str | None = None,
+    dosing_mode: DosingMode = DosingMode.EVENTS
+):
+    """Run population simulations of all scenarios in a configuration for
+    all model instances that have a population (see `run_population`)."""
+    for scenario in config.scenarios:
+        for instance in config.model_instances:
+            if instance.population is not None:
+                run_population(
+                    instance,
+                    scenario,
+                    out_path,
+                    logger,
+                    n_workers,
+                    model_cache_dir,
+                    dosing_mode
+                )
+
+def _run_population_batch(
+    instance: ModelInstance,
+    scenario: Scenario,
+    start: int,
+    samples: List[Dict[str, float]],
+    model_cache_dir: str | None,
+    dosing_mode: DosingMode,
+    logger: Logger
+) -> Tuple[int, np.ndarray, np.ndarray]:
+    """Simulate a batch of individuals of a population."""
+    logger.info("- Simulating individuals %s to %s", start + 1, start + len(samples))
+    model_cache = get_default_model_cache(model_cache_dir)
+    times = None
+    values = None
+    for i, parameters in enumerate(samples):
+        scenario_model = create_scenario_model(
+            instance,
+            scenario,
+            None,
+            model_cache,
+            dosing_mode,
+            parameters
+        )
+        results = simulate_scenario_model(scenario_model)
+        if values is None:
+            times = results[:, 0].copy()
+            values = np.empty((len(samples),) + results[:, 1:].shape, dtype=np.float32)
+        values[i] = results[:, 1:]
+    return (start, times, values)
+
+def _correlate_samples(
+    samples: np.ndarray,
+    population: Population
+) -> np.ndarray:
+    """Impose the parameter correlations of a population on uniform samples
+    using a Gaussian copula."""
+    ids = [param.id for param in population.parameters]
+    correlation = np.eye(len(ids))
+    for item in population.correlations or []:
+        if item.first not in ids or item.second not in ids:
+            raise ValueError(
+                f"Correlation between unknown parameters {item.first} and {item.second}."
+            )
+        (i, j) = (ids.index(item.first), ids.index(item.second))
+        correlation[i, j] = correlation[j, i] = item.value
+    try:
+        cholesky = np.linalg.cholesky(correlation)
+    except np.linalg.LinAlgError as error:
+        raise ValueError("Parameter correlation matrix is not positive definite.") from error
+    samples = norm.cdf(norm.ppf(samples) @ cholesky.T)
+    return np.clip(samples, _QUANTILE_EPSILON, 1. - _QUANTILE_EPSILON)
+
+def _check_fields(param: ParameterDistribution, *fields: str):
+    missing = [f for f in fields if getattr(param, f) is None]
+    if missing:
+        raise ValueError(
+            f"Missing {', '.join(missing)} for {param.distribution.value} distribution of parameter {param.id}."
+        )
@@ -0,0 +1,166 @@
+"""Reduction of simulation outputs over time windows.
+
+This module provides the incremental reduction of output series over
+consecutive time windows (e.g., daily peak and daily mean concentrations),
+which is applied on the simulation results chunk by chunk, such that only
+the reduced outputs need to be stored rather than the output values at all
+time points.
+"""
+
+from typing import Dict, List, Tuple
+import numpy as np
+
+from .definitions import (
+    Output,
+    OutputReducer,
+    ReducerType
+)
+
+_DECIMALS = 9
+
+def get_reducer_column(output: Output, reducer: OutputReducer) -> str:
+    """Get the column name of the reduced output in the results."""
+    return f"{output.id}_{reducer.type.value}"
+
+def has_reducers(outputs: List[Output]) -> bool:
+    """Check whether any of the outputs specifies reducers."""
+    return any(output.reducers for output in outputs)
+
+class OutputReduction:
+    """Incremental reduction of output series over time windows.
+
+    Takes consecutive chunks of simulation results (time and outputs, with
+    the column names `columns`) through `update` and returns the rows of
+    the reduced results of all time windows that are completed by the
+    chunk. The reduced results have a row per window end time of any of
+    the reducers: reduced outputs report their value at the end times of
+    their windows (and NaN otherwise), and outputs without reducers report
+    their value at the row time. Windows start at the first time point and
+    the final (partial) windows end at the last time point, which is
+    reported by `finish`. Reductions are computed from the linear
+    interpolation of the results between the time points, and only the
+    time points of the current windows are kept in memory.
+    """
+
+    def __init__(self, outputs: List[Output], columns: List[str]):
+        if len(columns) != len(outputs) + 1:
+            raise ValueError("The results should have a time column and a column per output.")
+        self.columns = [columns[0]]
+        self._reducers: List[Tuple[int, int, OutputReducer]] = []
+        self._outputs: List[Tuple[int, int]] = []
+        for j, output in enumerate(outputs):
+            if not output.reducers:
+                self._outputs.append((len(self.columns), j))
+                self.columns.append(columns[j + 1])
+                continue
+            for reducer in output.reducers:
+                if reducer.window <= 0:
+                    raise ValueError(f"Reducer window of output {output.id} should be positive.")
+                column = get_reducer_column(output, reducer)
+                if column in self.columns:
+                    raise ValueError(f"Duplicate {reducer.type.value} reducer for output {output.id}.")
+                self._reducers.append((len(self.columns), j, reducer))
+                self.columns.append(column)
+        self._windows = sorted({reducer.window for (_, _, reducer) in self._reducers})
+        self._window_starts: Dict[float, float] = {}
+        self._values = None
+
+    def update(self, results: np.ndarray) -> np.ndarray:
+        """Add a chunk of results (time points x columns) and get the rows
+        of the reduced results of the completed windows."""
+        results = np.asarray(results, dtype=float)
+        if len(results) == 0:
+            return np.empty((0, len(self.columns)))
+        if self._values is None:
+            self._window_starts = {window: results[0, 0] for window in self._windows}
+            self._values = results[:0]
+        self._values = np.concatenate((self._values, results))
+        return self._reduce(final=False)
+
+    def finish(self) -> np.ndarray:
+        """Get the rows of the reduced results of the final (partial)
+        windows, which end at the last time point."""
+        if self._values is None:
+            return np.empty((0, len(self.columns)))
+        return self._reduce(final=True)
+
+    def reduce(self, results: np.ndarray) -> np.ndarray:
+        """Get the reduced results of complete simulation results."""
+        return np.concatenate((self.update(results), self.finish()))
+
+    def _reduce(self, final: bool) -> np.ndarray:
+        last_time = self._values[-1, 0]
+
+        # Get the end times of the completed windows
+        row_windows: Dict[float, List[float]] = {}
+        for window in self._windows:
+            start = self._window_starts[window]
+            n_windows = int(np.floor(np.round((last_time - start) / window, _DECIMALS)))
+            ends = list(start + window * np.arange(1, n_windows + 1))
+            if final and np.round(last_time - (ends[-1] if ends else start), _DECIMALS) > 0:
+                ends.append(last_time)
+            for end in ends:
+                row_windows.setdefault(np.round(end, _DECIMALS), []).append(window)
+        if not row_windows:
+            return np.empty((0, len(self.columns)))
+
+        # Reduce the windows
+        times = self._values[:, 0]
+        row_times = np.array(sorted(row_windows.keys()))
+        rows = np.full((len(row_times), len(self.columns)), np.nan)
+        rows[:, 0] = row_times
+        for (k, j) in self._outputs:
+            rows[:, k] = np.interp(row_times, times, self._values[:, 1 + j])
+        for i, row_time in enumerate(row_times):
+            for window in row_windows[row_time]:
+                start = self._window_starts[window]
+                lower = max(np.searchsorted(times, start, side='right') - 1, 0)
+                upper = np.searchsorted(times, row_time, side='left') + 1
+                values = self._values[lower:upper]
+                for (k, j, reducer) in self._reducers:
+                    if reducer.window == window:
+                        rows[i, k] = _reduce_window(
+                            values[:, 0],
+                            values[:, 1 + j],
+                            start,
+                            row_time,
+                            reducer.type
+                        )
+                self._window_starts[window] = row_time
+
+        # Drop the time points before the current windows
+        if self._windows:
+            first = np.searchsorted(times, min(self._window_starts.values()), side='right') - 1
+            self._values = self._values[max(first, 0):]
+        else:
+            self._values = self._values[-1:]
+        return rows
+
+def _reduce_window(
+    times: np.ndarray,
+    values: np.ndarray,
+    start: float,
+    end: float,
+    reducer_type: ReducerType
+) -> float:
+    """Reduce the linear interpolation of an output series over the time
+    window from `start` to `end`."""
+    inner = (times > start) & (times < end)
+    window_times = np.concatenate(([start], times[inner], [end]))
+    window_values = np.concatenate((
+        [np.interp(start, times, values)],
+        values[inner],
+        [np.interp(end, times, values)]
+    ))
+    if reducer_type == ReducerType.MAX:
+        return np.max(window_values)
+    if reducer_type == ReducerType.MIN:
+        return np.min(window_values)
+    if reducer_type == ReducerType.LAST:
+        return window_values[-1]
+    integral = np.trapezoid(window_values, window_times)
+    if reducer_type == ReducerType.INTEGRAL:
+        return integral
+    if reducer_type == ReducerType.MEAN:
+        return integral / (end - start) if end > start else window_values[-1]
+    raise ValueError(f"Unknown reducer type: {reducer_type}")
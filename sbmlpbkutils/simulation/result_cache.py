@@ -0,0 +1,192 @@
+"""Content-addressed cache of simulation results.
+
+This module provides an on-disk cache of simulation results files. Cache
+entries are keyed by a hash of everything that determines the results of
+a scenario-instance run: the SBML model content, the parametrisation file
+content, the (normalised) scenario definition (and the content of its
+parameter tables), the target mappings and the library version.
+Identical scenario-instance runs, also from different simulation
+configurations, are therefore simulated only once, while changes of the
+model, parametrisation or scenario are never served stale results.
+"""
+
+from dataclasses import asdict
+from datetime import datetime, timezone
+from enum import Enum
+import glob
+import hashlib
+from importlib.metadata import PackageNotFoundError, version
+import json
+import os
+import shutil
+import tempfile
+from typing import Any
+
+from .definitions import (
+    DosingMode,
+    ModelInstance,
+    ResultsFileOptions,
+    Scenario
+)
+from .model_cache import get_file_hash
+from .output_times import get_output_times
+
+RESULT_CACHE_MANIFEST = "manifest.jsonl"
+
+def get_library_version() -> str:
+    """Get the version of the installed sbmlpbkutils package."""
+    try:
+        return version("sbmlpbkutils")
+    except PackageNotFoundError:
+        return "unknown"
+
+def normalise_scenario(scenario: Scenario) -> dict:
+    """Get a normalised representation of the simulation relevant parts of
+    a scenario definition.
+
+    Identifiers, labels and reference data do not affect simulation results
+    and are therefore left out. Explicit output times are represented by
+    the resolved output time points (e.g., of the reference data). Output
+    reducers are kept, as they determine the contents of the results file.
+    """
+    data = asdict(scenario)
+    for key in ("id", "label", "reference_data"):
+        data.pop(key, None)
+    output_times = get_output_times(scenario)
+    data["output_times"] = output_times.tolist() if output_times is not None else None
+    data["outputs"] = [
+        {"id": output["id"], "output": output["output"], "reducers": output["reducers"]}
+        for output in data["outputs"]
+    ]
+    return data
+
+def get_run_key(
+    instance: ModelInstance,
+    scenario: Scenario,
+    dosing_mode: DosingMode = DosingMode.EVENTS,
+    results_options: ResultsFileOptions | None = None
+) -> str:
+    """Compute a key (hash) of everything that determines the results of a
+    scenario-instance run."""
+    key_data = {
+        "model": get_file_hash(instance.model_path),
+        "param_file": (get_file_hash(instance.param_file)
+            if instance.param_file is not None else None),
+        "scenario": normalise_scenario(scenario),
+        "parameter_tables": [
+            get_file_hash(table.file_path)
+            for table in (scenario.chunks.parameter_tables or [] if scenario.chunks else [])
+        ],
+        "target_mappings": instance.target_mappings,
+        "integrator": (asdict(instance.integrator)
+            if instance.integrator is not None else None),
+        "dosing_mode": dosing_mode,
+        "results_options": (asdict(results_options)
+            if results_options is not None else None),
+        "version": get_library_version()
+    }
+    serialised = json.dumps(key_data, sort_keys=True, default=_to_json)
+    return hashlib.sha256(serialised.encode("utf-8")).hexdigest()
+
+class ResultCache:
+    """On-disk, content-addressed cache of simulation results files.
+
+    Cached results files are stored in `cache_dir`. When the total size of
+    the cached files exceeds `max_size` (bytes), the least recently used
+    entries are removed. All cache lookups are recorded as hits or misses
+    in a manifest file (JSON lines) in the cache directory.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_size: int = 10 * 1024 ** 3
+    ):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.manifest_file = os.path.join(cache_dir, RESULT_CACHE_MANIFEST)
+
+    def get_key(
+        self,
+        instance: ModelInstance,
+        scenario: Scenario,
+        dosing_mode: DosingMode = DosingMode.EVENTS,
+        results_options: ResultsFileOptions | None = None
+    ) -> str:
+        """Compute the cache key of a scenario-instance run."""
+        return get_run_key(instance, scenario, dosing_mode, results_options)
+
+    def fetch(
+        self,
+        key: str,
+        out_file: str,
+        label: str = ""
+    ) -> bool:
+        """Copy the cached results of the specified key to `out_file`.
+
+        Returns whether the results were available in the cache.
+        """
+        cache_file = self._get_file_path(key, out_file)
+        hit = os.path.exists(cache_file)
+        if hit:
+            os.makedirs(os.path.dirname(out_file) or ".", exist_ok=True)
+            shutil.copyfile(cache_file, out_file)
+            os.utime(cache_file)
+        self._record(key, label, out_file, "hit" if hit else "miss")
+        return hit
+
+    def store(self, key: str, out_file: str):
+        """Store the results file `out_file` under the specified key."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        (fd, tmp_file) = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        os.close(fd)
+        shutil.copyfile(out_file, tmp_file)
+        os.replace(tmp_file, self._get_file_path(key, out_file))
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries exceeding the maximum cache size."""
+        entries = []
+        for file_path in glob.glob(os.path.join(self.cache_dir, "*.result*")):
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, file_path))
+        total_size = sum(size for (_, size, _) in entries)
+        for (_, size, file_path) in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+            total_size -= size
+
+    def read_manifest(self) -> list[dict]:
+        """Read the recorded cache lookups from the manifest."""
+        if not os.path.exists(self.manifest_file):
+            return []
+        with open(self.manifest_file, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def _get_file_path(self, key: str, out_file: str) -> str:
+        extension = os.path.splitext(out_file)[1]
+        return os.path.join(self.cache_dir, f"{key}.result{extension}")
+
+    def _record(self, key: str, label: str, out_file: str, status: str):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        record = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "key": key,
+            "run": label,
+            "out_file": out_file,
+            "status": status
+        }
+        with open(self.manifest_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
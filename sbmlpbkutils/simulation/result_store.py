@@ -0,0 +1,121 @@
+"""Load-once store of simulation results and reference data.
+
+This module provides a store that loads each simulation results file and
+reference data file only once, and that keeps the (unit aligned) time
+points and output series as numpy arrays, such that plotting and
+comparison functions do not repeatedly parse the same files.
+"""
+
+from typing import Dict, Tuple
+import numpy as np
+import pandas as pd
+
+from .definitions import (
+    ModelInstance,
+    Output,
+    ReferenceData,
+    Scenario
+)
+from .reducers import get_reducer_column
+from .results_io import find_results_file, read_results
+from .units import get_time_unit_alignment_factor
+
+class ResultStore:
+    """Store of simulation results and reference data files.
+
+    Results files of scenario-instance pairs are looked up in `out_path`
+    (which may be omitted when the store is only used for reference data).
+    Each file is read on first use and kept in memory, together with the
+    time points of reference data aligned to the scenario time units.
+    """
+
+    def __init__(self, out_path: str | None = None):
+        self.out_path = out_path
+        self._results: Dict[Tuple[str, str], pd.DataFrame] = {}
+        self._references: Dict[str, pd.DataFrame] = {}
+        self._series: Dict[Tuple, np.ndarray] = {}
+
+    def get_results(self, scenario_id: str, instance_id: str) -> pd.DataFrame:
+        """Get the results of a scenario-instance pair."""
+        key = (scenario_id, instance_id)
+        if key not in self._results:
+            if self.out_path is None:
+                raise ValueError("No results path specified for the result store.")
+            self._results[key] = read_results(
+                find_results_file(self.out_path, scenario_id, instance_id)
+            )
+        return self._results[key]
+
+    def get_reference(self, file_path: str) -> pd.DataFrame:
+        """Get the contents of a reference data file."""
+        if file_path not in self._references:
+            self._references[file_path] = read_results(file_path)
+        return self._references[file_path]
+
+    def get_output_series(
+        self,
+        scenario: Scenario,
+        instance: ModelInstance,
+        output: Output
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the time points and values of an output of the results of a
+        scenario-instance pair.
+
+        For outputs with reducers, gets the window end times and values of
+        the first reducer of the output.
+        """
+        if output.reducers:
+            column = get_reducer_column(output, output.reducers[0])
+            df = self.get_results(scenario.id, instance.id)
+            mask = df[column].notna()
+            times = self._get_column(
+                ("results", scenario.id, instance.id, "time", column),
+                lambda: df["time"][mask]
+            )
+            values = self._get_column(
+                ("results", scenario.id, instance.id, column),
+                lambda: df[column][mask]
+            )
+            return (times, values)
+        output_id = (instance.target_mappings.get(output.id, output.id)
+            if instance.target_mappings is not None else output.id)
+        times = self._get_column(
+            ("results", scenario.id, instance.id, "time"),
+            lambda: self.get_results(scenario.id, instance.id)["time"]
+        )
+        values = self._get_column(
+            ("results", scenario.id, instance.id, output_id),
+            lambda: self.get_results(scenario.id, instance.id)[output_id]
+        )
+        return (times, values)
+
+    def get_reference_series(
+        self,
+        scenario: Scenario,
+        item: ReferenceData,
+        output_id: str
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the time points (aligned to the scenario time unit) and values
+        of the reference series of a scenario output."""
+        time_unit_multiplier = get_time_unit_alignment_factor(item.time_unit, scenario.time_unit)
+        times = self._get_column(
+            ("reference", item.file_path, "time", time_unit_multiplier),
+            lambda: self.get_reference(item.file_path)["time"] / time_unit_multiplier
+        )
+        series_id = item.mappings[output_id]
+        values = self._get_column(
+            ("reference", item.file_path, series_id),
+            lambda: self.get_reference(item.file_path)[series_id]
+        )
+        return (times, values)
+
+    def clear(self):
+        """Remove all loaded files from the store."""
+        self._results.clear()
+        self._references.clear()
+        self._series.clear()
+
+    def _get_column(self, key: Tuple, get_series) -> np.ndarray:
+        if key not in self._series:
+            self._series[key] = get_series().to_numpy(dtype=float)
+        return self._series[key]
@@ -0,0 +1,235 @@
+"""Reading and writing of simulation results files.
+
+This module provides methods to write simulation results as CSV, Parquet
+or Arrow IPC files and to read them back, detecting the file format
+automatically. Results can also be streamed to file in blocks of time
+points. Parquet and Arrow IPC files require the optional `pyarrow`
+dependency.
+"""
+
+import os
+import tempfile
+from typing import List
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pa = None
+
+from .definitions import (
+    ResultsFileOptions,
+    ResultsFormat
+)
+
+_RESULTS_FILE_EXTENSIONS = {
+    ResultsFormat.CSV: ".csv",
+    ResultsFormat.PARQUET: ".parquet",
+    ResultsFormat.ARROW: ".arrow",
+}
+
+_PARQUET_MAGIC = b"PAR1"
+_ARROW_MAGIC = b"ARROW1"
+
+def get_results_file_name(
+    scenario_id: str,
+    instance_id: str,
+    results_format: ResultsFormat = ResultsFormat.CSV
+) -> str:
+    """Get the name of the results file of a scenario-instance pair."""
+    return f"{scenario_id}_{instance_id}{_RESULTS_FILE_EXTENSIONS[results_format]}"
+
+def get_pk_metrics_file_name(out_file: str) -> str:
+    """Get the name of the pharmacokinetic metrics table (CSV) that is
+    written alongside the results file `out_file`."""
+    return f"{os.path.splitext(out_file)[0]}_pk_metrics.csv"
+
+def find_results_file(
+    out_path: str,
+    scenario_id: str,
+    instance_id: str
+) -> str:
+    """Find the results file of a scenario-instance pair in `out_path`.
+
+    Looks for results files of all supported formats and returns the most
+    recently written one. Raises a FileNotFoundError when no results file
+    is found.
+    """
+    candidates = [
+        os.path.join(out_path, get_results_file_name(scenario_id, instance_id, results_format))
+        for results_format in ResultsFormat
+    ]
+    existing = [file_path for file_path in candidates if os.path.exists(file_path)]
+    if not existing:
+        raise FileNotFoundError(
+            f"No results file found for scenario {scenario_id} and instance {instance_id} in {out_path}."
+        )
+    return max(existing, key=os.path.getmtime)
+
+def get_results_format(file_path: str) -> ResultsFormat:
+    """Detect the format of a results file from its content.
+
+    Parquet and Arrow IPC files are recognised by their magic bytes, which
+    take precedence over the file extension. Other files are CSV files.
+    """
+    with open(file_path, "rb") as f:
+        header = f.read(len(_ARROW_MAGIC))
+    if header.startswith(_PARQUET_MAGIC):
+        return ResultsFormat.PARQUET
+    if header.startswith(_ARROW_MAGIC):
+        return ResultsFormat.ARROW
+    return ResultsFormat.CSV
+
+def check_results_file_name(file_path: str, results_format: ResultsFormat):
+    """Check that the extension of a results file does not conflict with
+    its format: files with the extension of a results format should be
+    written in that format (other extensions are allowed for any format)."""
+    extension = os.path.splitext(file_path)[1].lower()
+    for other_format, format_extension in _RESULTS_FILE_EXTENSIONS.items():
+        if extension == format_extension and other_format != results_format:
+            raise ValueError(
+                f"Results file {file_path} has the extension of {other_format.value} files, "
+                f"but is written in {results_format.value} format."
+            )
+
+def check_results_file_options(options: ResultsFileOptions):
+    """Check that results files can be written with the specified file
+    options (compression is only supported for binary formats, which
+    require pyarrow)."""
+    if options.format == ResultsFormat.CSV and options.compression is not None:
+        raise ValueError("Compression is not supported for CSV results files.")
+    if options.format != ResultsFormat.CSV and pa is None:
+        raise ImportError(f"Writing {options.format.value} results files requires pyarrow.")
+
+def write_results(
+    df: pd.DataFrame,
+    out_file: str,
+    options: ResultsFileOptions | None = None
+):
+    """Write a results table to file using the specified file options."""
+    if options is None:
+        options = ResultsFileOptions()
+    check_results_file_options(options)
+    if options.float32:
+        df = df.astype("float32", copy=False)
+    if options.format == ResultsFormat.PARQUET:
+        df.to_parquet(out_file, index=False, compression=options.compression)
+    elif options.format == ResultsFormat.ARROW:
+        df.to_feather(out_file, compression=options.compression or "uncompressed")
+    else:
+        df.to_csv(out_file, index=False)
+
+class ResultsWriter:
+    """Writer that appends blocks of simulation results to a results file.
+
+    The results are written to a temporary file in the directory of
+    `out_file`, which replaces `out_file` when the writer is closed, so an
+    interrupted run never leaves an incomplete results file. CSV files are
+    written in the same format as by `write_results`. Parquet files get a
+    row group and Arrow IPC files a record batch per block. The
+    `integer_columns` (e.g., a member index) are written as 64-bit integers
+    rather than as floats. Use the writer as a context manager to close it
+    (or to remove the temporary file when an error occurs).
+    """
+
+    def __init__(
+        self,
+        out_file: str,
+        columns: List[str],
+        options: ResultsFileOptions | None = None,
+        integer_columns: List[str] | None = None
+    ):
+        if options is None:
+            options = ResultsFileOptions()
+        check_results_file_options(options)
+        self.out_file = out_file
+        self.columns = list(columns)
+        self.options = options
+        self._integer_columns = set(integer_columns or [])
+        self._dtype = np.float32 if options.float32 else np.float64
+        os.makedirs(os.path.dirname(out_file) or ".", exist_ok=True)
+        (fd, self._tmp_file) = tempfile.mkstemp(dir=os.path.dirname(out_file) or ".", suffix=".tmp")
+        self._file = os.fdopen(fd, "w" if options.format == ResultsFormat.CSV else "wb")
+        self._writer = None
+        self._header = True
+        if options.format != ResultsFormat.CSV:
+            dtype = pa.float32() if options.float32 else pa.float64()
+            self._schema = pa.schema([
+                (column, pa.int64() if column in self._integer_columns else dtype)
+                for column in self.columns
+            ])
+            if options.format == ResultsFormat.PARQUET:
+                self._writer = pa.parquet.ParquetWriter(
+                    self._file,
+                    self._schema,
+                    compression = options.compression or "none"
+                )
+            else:
+                self._writer = pa.ipc.new_file(
+                    self._file,
+                    self._schema,
+                    options = pa.ipc.IpcWriteOptions(compression=options.compression)
+                )
+
+    def write(self, values: np.ndarray):
+        """Append a block of results (time points x columns)."""
+        values = np.asarray(values)
+        if len(values) == 0:
+            return
+        arrays = [
+            values[:, i].astype(np.int64 if column in self._integer_columns else self._dtype)
+            for (i, column) in enumerate(self.columns)
+        ]
+        if self._writer is None:
+            df = pd.DataFrame(dict(enumerate(arrays)), copy=False)
+            df.columns = self.columns
+            df.to_csv(self._file, header=self._header, index=False)
+            self._header = False
+            return
+        batch = pa.record_batch(
+            [pa.array(array) for array in arrays],
+            schema = self._schema
+        )
+        if self.options.format == ResultsFormat.PARQUET:
+            self._writer.write_batch(batch, row_group_size=max(len(values), 1))
+        else:
+            self._writer.write_batch(batch)
+
+    def close(self):
+        """Finish the results file and move it to `out_file`."""
+        if self._file.closed:
+            return
+        if self._writer is not None:
+            self._writer.close()
+        elif self._header:
+            pd.DataFrame(columns=self.columns).to_csv(self._file, index=False)
+        self._file.close()
+        os.replace(self._tmp_file, self.out_file)
+
+    def abort(self):
+        """Discard the results written so far."""
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self._tmp_file):
+            os.remove(self._tmp_file)
+
+    def __enter__(self) -> "ResultsWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+def read_results(file_path: str) -> pd.DataFrame:
+    """Read a results table from a CSV, Parquet or Arrow IPC file."""
+    results_format = get_results_format(file_path)
+    if results_format == ResultsFormat.PARQUET:
+        return pd.read_parquet(file_path)
+    if results_format == ResultsFormat.ARROW:
+        return pd.read_feather(file_path)
+    return pd.read_csv(file_path, skipinitialspace=True)
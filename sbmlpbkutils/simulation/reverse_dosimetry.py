@@ -0,0 +1,255 @@
+"""Reverse dosimetry for PBK model simulation scenarios.
+
+This module provides methods to find the external doses that yield
+specified internal dose metrics (e.g., peak blood concentrations) for a
+scenario. The dosing events of the scenario define the dosing pattern
+(types, routes and timing) and the external doses are found as factors
+of the dosing amounts of the scenario. When the model is linear in the
+dose, the doses follow directly from a single simulation. Otherwise,
+the doses of all targets are found simultaneously by root finding, where
+each iteration evaluates the current estimates of all unresolved targets
+in one parallel batch.
+"""
+
+from dataclasses import replace
+from logging import Logger
+from typing import Sequence
+import numpy as np
+import pandas as pd
+
+from .definitions import (
+    DoseMetric,
+    DosingMode,
+    ModelInstance,
+    Scenario
+)
+from .model_cache import get_default_model_cache
+from .parallel import TaskPool
+from .pk_metrics import compute_auc, compute_cmax
+from .simulation import create_scenario_model, simulate_scenario_model
+
+_LINEARITY_FACTORS = (1., 0.1, 10.)
+_LINEARITY_TOLERANCE = 1e-4
+_INITIAL_GRID_EXPONENTS = np.arange(-3, 4)
+_MAX_GRID_EXPONENT = 12
+
+def compute_dose_metric(
+    times: np.ndarray,
+    values: np.ndarray,
+    metric: DoseMetric,
+    interval: float | None = None
+) -> float:
+    """Compute an internal dose metric of an output time series.
+
+    For the `STEADY_STATE` metric, the average over the final `interval`
+    is computed (or the final value if no interval is specified).
+    """
+    values = np.asarray(values)[:, np.newaxis]
+    if metric == DoseMetric.CMAX:
+        return float(compute_cmax(times, values)[0][0])
+    if metric == DoseMetric.AUC:
+        return float(compute_auc(times, values)[0])
+    if metric == DoseMetric.STEADY_STATE:
+        if not interval:
+            return float(values[-1, 0])
+        start = max(times[-1] - interval, times[0])
+        return float(compute_auc(times, values, start)[0] / (times[-1] - start))
+    raise ValueError(f"Unknown dose metric: {metric}")
+
+def get_dosing_interval(scenario: Scenario) -> float | None:
+    """Get the (largest) dosing interval of the repeated dosing events of a
+    scenario (in scenario time unit)."""
+    intervals = [
+        event.interval
+        for event in scenario.dosing_events or []
+        if event.type.startswith("repeated") and event.interval
+    ]
+    return max(intervals) if intervals else None
+
+def scale_dosing_events(scenario: Scenario, factor: float) -> Scenario:
+    """Create a copy of a scenario with the amounts of all dosing events
+    multiplied by the specified factor."""
+    return replace(
+        scenario,
+        dosing_events = [
+            replace(event, amount=event.amount * factor)
+            for event in scenario.dosing_events or []
+        ]
+    )
+
+def run_reverse_dosimetry(
+    instance: ModelInstance,
+    scenario: Scenario,
+    output_id: str,
+    metric: DoseMetric,
+    targets: Sequence[float],
+    logger: Logger,
+    n_workers: int | None = 1,
+    model_cache_dir: str | None = None,
+    dosing_mode: DosingMode = DosingMode.PARAMETERISED,
+    assume_linear: bool | None = None,
+    rtol: float = 1e-6,
+    max_iterations: int = 50
+) -> pd.DataFrame:
+    """Find the external doses that yield the target values of an internal
+    dose metric of a scenario output.
+
+    The doses are found as factors of the amounts of the dosing events of
+    the scenario (initial states are not scaled). Unless `assume_linear`
+    is specified, linearity of the metric in the dose is checked by
+    simulating the scenario with dose factors 0.1, 1 and 10. For linear
+    models, the dose factors are obtained by dividing the targets by the
+    metric of the scenario. Otherwise, the metric is tabulated for a range
+    of dose factors and the dose factors of all targets are solved
+    simultaneously by (Illinois) regula falsi on log scale until the
+    metric matches the target within relative tolerance `rtol`. All
+    simulations of an iteration are evaluated in one batch on `n_workers`
+    worker processes (use None for all available cores), which keep their
+    compiled models. By default, the `PARAMETERISED` dosing mode is used,
+    so that all dose amounts share the same compiled model. Returns a
+    table with the targets, dose factors, doses of the dosing events (in
+    scenario amount unit) and whether the solution converged.
+    """
+    output_ids = [output.id for output in scenario.outputs]
+    if output_id not in output_ids:
+        raise ValueError(f"Output {output_id} not found in scenario {scenario.id}.")
+    if not scenario.dosing_events:
+        raise ValueError(f"Scenario {scenario.id} has no dosing events.")
+    targets = np.asarray(targets, dtype=float)
+    interval = get_dosing_interval(scenario)
+
+    logger.info(
+        "Running reverse dosimetry of %s of output %s for scenario %s and instance %s (%s targets)",
+        metric.value,
+        output_id,
+        scenario.id,
+        instance.id,
+        len(targets)
+    )
+    with TaskPool(n_workers) as pool:
+        def evaluate(factors: np.ndarray) -> np.ndarray:
+            n_batches = min(len(factors), pool.n_workers)
+            tasks = [
+                (
+                    instance,
+                    scenario,
+                    output_ids.index(output_id),
+                    metric,
+                    interval,
+                    batch,
+                    model_cache_dir,
+                    dosing_mode
+                )
+                for batch in np.array_split(np.asarray(factors, dtype=float), n_batches)
+            ]
+            return np.concatenate(pool.run(_evaluate_dose_factors, tasks, logger))
+
+        values = evaluate(np.array(_LINEARITY_FACTORS))
+        if values[0] <= 0:
+            raise ValueError(f"Output {output_id} of scenario {scenario.id} is not affected by the dosing events.")
+        if assume_linear is None:
+            expected = np.array(_LINEARITY_FACTORS) * values[0]
+            assume_linear = bool(np.allclose(values, expected, rtol=_LINEARITY_TOLERANCE, atol=0))
+        if assume_linear:
+            logger.info("- Using dose linearity")
+            factors = np.where(targets > 0, targets / values[0], np.nan)
+            converged = targets > 0
+        else:
+            logger.info("- Using root finding")
+            (factors, converged) = _solve_dose_factors(evaluate, targets, rtol, max_iterations)
+
+    result = pd.DataFrame({
+        "target": targets,
+        "dose_factor": factors
+    })
+    for i, event in enumerate(scenario.dosing_events):
+        result[f"dose_{i + 1}"] = factors * event.amount
+    result["converged"] = converged
+    return result
+
+def _solve_dose_factors(
+    evaluate,
+    targets: np.ndarray,
+    rtol: float,
+    max_iterations: int
+):
+    """Solve the dose factors of all targets by vectorised Illinois regula
+    falsi on log-log scale."""
+    factors = np.full(len(targets), np.nan)
+    converged = np.zeros(len(targets), dtype=bool)
+    valid = targets > 0
+    log_targets = np.log(np.where(valid, targets, 1.))
+
+    # Tabulate the metric over a grid of dose factors covering the targets
+    exponents = list(_INITIAL_GRID_EXPONENTS)
+    grid = list(evaluate(10. ** np.array(exponents, dtype=float)))
+    while min(grid) > np.min(targets[valid], initial=np.inf) and exponents[0] > -_MAX_GRID_EXPONENT:
+        exponents.insert(0, exponents[0] - 3)
+        grid.insert(0, evaluate(np.array([10. ** exponents[0]]))[0])
+    while max(grid) < np.max(targets[valid], initial=-np.inf) and exponents[-1] < _MAX_GRID_EXPONENT:
+        exponents.append(exponents[-1] + 3)
+        grid.append(evaluate(np.array([10. ** exponents[-1]]))[0])
+    grid = np.array(grid)
+    if np.any(grid <= 0) or np.any(np.diff(grid) <= 0):
+        raise ValueError("Dose metric is not strictly increasing with the dose.")
+    x = np.array(exponents, dtype=float) * np.log(10.)
+    y = np.log(grid)
+
+    # Initial brackets
+    index = np.searchsorted(y, log_targets)
+    valid &= (index > 0) & (index < len(y)) | np.isin(log_targets, y)
+    index = np.clip(index, 1, len(y) - 1)
+    (a, b) = (x[index - 1], x[index])
+    (fa, fb) = (y[index - 1] - log_targets, y[index] - log_targets)
+
+    tolerance = np.log1p(rtol)
+    active = valid.copy()
+    for _ in range(max_iterations):
+        # Converged at bracket ends
+        for end, f_end in ((a, fa), (b, fb)):
+            done = active & (np.abs(f_end) <= tolerance)
+            factors[done] = np.exp(end[done])
+            converged[done] = True
+            active &= ~done
+        if not np.any(active):
+            break
+        c = b[active] - fb[active] * (b[active] - a[active]) / (fb[active] - fa[active])
+        fc = np.log(evaluate(np.exp(c))) - log_targets[active]
+        (a_act, fa_act, b_act, fb_act) = (a[active], fa[active], b[active], fb[active])
+        switch = fc * fb_act < 0
+        a_act = np.where(switch, b_act, a_act)
+        fa_act = np.where(switch, fb_act, fa_act / 2)
+        (a[active], fa[active]) = (a_act, fa_act)
+        (b[active], fb[active]) = (c, fc)
+
+    # Best estimates for targets that did not converge
+    remaining = active & valid
+    factors[remaining] = np.exp(b[remaining])
+    return (factors, converged)
+
+def _evaluate_dose_factors(
+    instance: ModelInstance,
+    scenario: Scenario,
+    output_index: int,
+    metric: DoseMetric,
+    interval: float | None,
+    factors: np.ndarray,
+    model_cache_dir: str | None,
+    dosing_mode: DosingMode,
+    logger: Logger
+) -> np.ndarray:
+    """Compute the dose metric of a scenario output for a batch of dose factors."""
+    model_cache = get_default_model_cache(model_cache_dir)
+    values = np.empty(len(factors))
+    for i, factor in enumerate(factors):
+        scenario_model = create_scenario_model(
+            instance,
+            scale_dosing_events(scenario, float(factor)),
+            None,
+            model_cache,
+            dosing_mode
+        )
+        results = simulate_scenario_model(scenario_model)
+        values[i] = compute_dose_metric(results[:, 0], results[:, 1 + output_index], metric, interval)
+    logger.debug("- Evaluated %s dose factors", len(factors))
+    return values
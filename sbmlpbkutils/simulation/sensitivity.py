@@ -0,0 +1,521 @@
+"""Sensitivity analysis of PBK model simulation scenarios.
+
+This module provides methods for global sensitivity analysis of the peak
+value (Cmax) and area under the curve (AUC) of the outputs of a scenario
+with respect to model parameters. Variance based (Sobol) first-order and
+total-order indices are estimated from a Saltelli design and elementary
+effects are computed from Morris trajectories. The designs are evaluated
+in batches, in parallel using a process pool of which each worker keeps
+its compiled models. Local sensitivities of the outputs over time are
+computed using the forward sensitivity solver of roadrunner when possible,
+or otherwise by central finite differences.
+"""
+
+from dataclasses import dataclass
+import logging
+from logging import Logger
+from typing import Dict, List, Tuple
+import numpy as np
+import pandas as pd
+from scipy.stats import qmc
+
+from .definitions import (
+    DistributionType,
+    DosingMode,
+    LocalSensitivityMethod,
+    ModelInstance,
+    ParameterDistribution,
+    Scenario,
+    SensitivityMethod
+)
+from .model_cache import ModelCache, get_default_model_cache
+from .parallel import resolve_worker_count, run_tasks
+from .pk_metrics import compute_auc, compute_cmax
+from .population import get_distribution_quantiles
+from .simulation import (
+    ScenarioModel,
+    create_scenario_model,
+    simulate_scenario_model
+)
+
+SENSITIVITY_METRICS = ("cmax", "auc")
+
+_UNBOUNDED_DISTRIBUTION_TYPES = (DistributionType.NORMAL, DistributionType.LOGNORMAL)
+_UNBOUNDED_PROBABILITY_LIMIT = 1e-3
+
+@dataclass
+class LocalSensitivities:
+    """Time-resolved local sensitivities of the outputs of a scenario.
+
+    Attributes:
+        times: time points (in scenario time unit).
+        parameters: ids of the parameters.
+        outputs: ids of the scenario outputs.
+        values: sensitivity coefficients with shape (time points,
+            parameters, outputs).
+        method: method used for computing the sensitivities.
+        normalised: whether the coefficients are normalised, i.e.,
+            (p / y) * dy/dp, or absolute, i.e., dy/dp (in scenario amount
+            unit per parameter unit).
+    """
+    times: np.ndarray
+    parameters: List[str]
+    outputs: List[str]
+    values: np.ndarray
+    method: LocalSensitivityMethod
+    normalised: bool
+
+def create_saltelli_design(
+    n_params: int,
+    n_samples: int,
+    seed: int | None = None
+) -> np.ndarray:
+    """Create a Saltelli design in the unit hypercube.
+
+    Base samples A and B are drawn from a scrambled Sobol sequence. The
+    design consists of the blocks A, B and AB_1, ..., AB_d (A with column i
+    taken from B) and has `n_samples * (n_params + 2)` rows.
+    """
+    base = qmc.Sobol(2 * n_params, scramble=True, rng=np.random.default_rng(seed)).random(n_samples)
+    a = base[:, :n_params]
+    b = base[:, n_params:]
+    blocks = [a, b]
+    for i in range(n_params):
+        ab = a.copy()
+        ab[:, i] = b[:, i]
+        blocks.append(ab)
+    return np.vstack(blocks)
+
+def compute_sobol_indices(
+    values: np.ndarray,
+    n_params: int,
+    n_resamples: int = 100,
+    seed: int | None = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Estimate first-order and total-order Sobol indices from the model
+    evaluations of a Saltelli design.
+
+    The `values` have shape (design rows, quantities of interest). First-
+    order indices are estimated using the estimator of Saltelli et al.
+    (2010) and total-order indices using the estimator of Jansen (1999).
+    Returns the first-order indices, total-order indices and the half
+    widths of their 95% bootstrap confidence intervals, each with shape
+    (parameters, quantities of interest).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, np.newaxis]
+    n_samples = values.shape[0] // (n_params + 2)
+    blocks = values.reshape(n_params + 2, n_samples, -1)
+    (first, total) = _sobol_estimates(blocks)
+
+    rng = np.random.default_rng(seed)
+    resamples = rng.integers(0, n_samples, size=(n_resamples, n_samples))
+    first_boot = np.empty((n_resamples,) + first.shape)
+    total_boot = np.empty((n_resamples,) + total.shape)
+    for k in range(n_resamples):
+        (first_boot[k], total_boot[k]) = _sobol_estimates(blocks[:, resamples[k], :])
+    return (
+        first,
+        total,
+        1.96 * np.nanstd(first_boot, axis=0, ddof=1),
+        1.96 * np.nanstd(total_boot, axis=0, ddof=1)
+    )
+
+def create_morris_design(
+    n_params: int,
+    n_trajectories: int,
+    num_levels: int = 4,
+    seed: int | None = None
+) -> np.ndarray:
+    """Create a Morris (one-at-a-time) design in the unit hypercube.
+
+    Each trajectory starts at a random point of the `num_levels` grid and
+    changes the parameters one at a time, in random order, by a step of
+    `num_levels / (2 * (num_levels - 1))`. The design has
+    `n_trajectories * (n_params + 1)` rows.
+    """
+    rng = np.random.default_rng(seed)
+    delta = num_levels / (2 * (num_levels - 1))
+    design = np.empty((n_trajectories, n_params + 1, n_params))
+    for t in range(n_trajectories):
+        point = rng.integers(0, num_levels, size=n_params) / (num_levels - 1)
+        design[t, 0] = point
+        for k, i in enumerate(rng.permutation(n_params)):
+            point = point.copy()
+            point[i] += delta if point[i] + delta <= 1 else -delta
+            design[t, k + 1] = point
+    return design.reshape(-1, n_params)
+
+def compute_morris_indices(
+    values: np.ndarray,
+    design: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Compute elementary effects statistics from the model evaluations
+    of a Morris design.
+
+    The `values` have shape (design rows, quantities of interest). Returns
+    the mean (mu), mean of the absolute values (mu_star) and standard
+    deviation (sigma) of the elementary effects, each with shape
+    (parameters, quantities of interest).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, np.newaxis]
+    n_params = design.shape[1]
+    n_trajectories = design.shape[0] // (n_params + 1)
+    steps = np.diff(design.reshape(n_trajectories, n_params + 1, n_params), axis=1)
+    differences = np.diff(values.reshape(n_trajectories, n_params + 1, -1), axis=1)
+    effects = np.empty((n_trajectories, n_params, values.shape[1]))
+    for t in range(n_trajectories):
+        # Each step of a trajectory changes a single parameter
+        changed = np.argmax(np.abs(steps[t]), axis=1)
+        effects[t, changed] = differences[t] / steps[t, np.arange(n_params), changed][:, np.newaxis]
+    return (
+        effects.mean(axis=0),
+        np.abs(effects).mean(axis=0),
+        effects.std(axis=0, ddof=1) if n_trajectories > 1 else np.zeros(effects.shape[1:])
+    )
+
+def to_parameter_values(
+    design: np.ndarray,
+    parameters: List[ParameterDistribution]
+) -> np.ndarray:
+    """Map a design in the unit hypercube to parameter values.
+
+    Design values are mapped to the quantiles of the parameter
+    distributions. For unbounded (normal and lognormal) distributions, the
+    probabilities are limited to the range [0.001, 0.999].
+    """
+    values = np.empty(design.shape)
+    for i, param in enumerate(parameters):
+        probabilities = design[:, i]
+        if param.distribution in _UNBOUNDED_DISTRIBUTION_TYPES:
+            probabilities = np.clip(
+                probabilities,
+                _UNBOUNDED_PROBABILITY_LIMIT,
+                1. - _UNBOUNDED_PROBABILITY_LIMIT
+            )
+        values[:, i] = get_distribution_quantiles(param, probabilities)
+    return values
+
+def run_sensitivity_analysis(
+    instance: ModelInstance,
+    scenario: Scenario,
+    parameters: List[ParameterDistribution],
+    logger: Logger,
+    method: SensitivityMethod = SensitivityMethod.SOBOL,
+    n_samples: int = 1024,
+    seed: int | None = None,
+    n_workers: int | None = 1,
+    model_cache_dir: str | None = None,
+    dosing_mode: DosingMode = DosingMode.EVENTS,
+    batch_size: int | None = None,
+    num_levels: int = 4
+) -> pd.DataFrame:
+    """Run a global sensitivity analysis of the Cmax and AUC of the
+    scenario outputs with respect to the specified parameters.
+
+    The parameter ranges are specified as parameter distributions (e.g.,
+    uniform distributions with lower and upper bounds). With method
+    `SOBOL`, a Saltelli design with `n_samples` base samples (preferably a
+    power of two) is evaluated and first-order (S1) and total-order (ST)
+    indices with 95% confidence interval half widths are computed. With
+    method `MORRIS`, `n_samples` Morris trajectories on a `num_levels`
+    grid are evaluated and the elementary effects statistics mu, mu_star
+    and sigma are computed. The design is evaluated in batches of
+    `batch_size` model runs, in a process pool when `n_workers` is larger
+    than one (use None for all available cores). Returns a table with the
+    indices per output, metric and parameter.
+    """
+    n_params = len(parameters)
+    if n_params == 0:
+        raise ValueError("At least one parameter is required for sensitivity analysis.")
+    if method == SensitivityMethod.MORRIS:
+        design = create_morris_design(n_params, n_samples, num_levels, seed)
+    else:
+        design = create_saltelli_design(n_params, n_samples, seed)
+
+    logger.info(
+        "Running %s sensitivity analysis of scenario %s for instance %s (%s model runs)",
+        method.value,
+        scenario.id,
+        instance.id,
+        design.shape[0]
+    )
+    values = evaluate_design(
+        instance,
+        scenario,
+        [param.id for param in parameters],
+        to_parameter_values(design, parameters),
+        logger,
+        n_workers,
+        model_cache_dir,
+        dosing_mode,
+        batch_size
+    )
+
+    if method == SensitivityMethod.MORRIS:
+        indices = dict(zip(("mu", "mu_star", "sigma"), compute_morris_indices(values, design)))
+    else:
+        indices = dict(zip(
+            ("S1", "ST", "S1_conf", "ST_conf"),
+            compute_sobol_indices(values, n_params, seed=seed)
+        ))
+
+    records = []
+    for k, (output, metric) in enumerate(_get_quantities(scenario)):
+        for i, param in enumerate(parameters):
+            record = {"output": output, "metric": metric, "parameter": param.id}
+            record.update({name: index[i, k] for name, index in indices.items()})
+            records.append(record)
+    return pd.DataFrame.from_records(records)
+
+def evaluate_design(
+    instance: ModelInstance,
+    scenario: Scenario,
+    parameter_ids: List[str],
+    parameter_values: np.ndarray,
+    logger: Logger,
+    n_workers: int | None = 1,
+    model_cache_dir: str | None = None,
+    dosing_mode: DosingMode = DosingMode.EVENTS,
+    batch_size: int | None = None
+) -> np.ndarray:
+    """Evaluate the Cmax and AUC of the scenario outputs for all parameter
+    value combinations (rows) of a design.
+
+    Returns an array with shape (design rows, outputs x metrics), with the
+    metrics of each output in the order of `SENSITIVITY_METRICS`.
+    """
+    n_runs = parameter_values.shape[0]
+    if batch_size is None:
+        batch_size = -(-n_runs // (4 * resolve_worker_count(n_workers)))
+    batch_size = max(1, batch_size)
+    tasks = [
+        (
+            instance,
+            scenario,
+            parameter_ids,
+            parameter_values[start:start + batch_size],
+            model_cache_dir,
+            dosing_mode
+        )
+        for start in range(0, n_runs, batch_size)
+    ]
+    return np.vstack(run_tasks(_evaluate_batch, tasks, n_workers, logger))
+
+def compute_local_sensitivities(
+    instance: ModelInstance,
+    scenario: Scenario,
+    parameters: List[str],
+    method: LocalSensitivityMethod = LocalSensitivityMethod.AUTO,
+    normalise: bool = True,
+    relative_step: float = 1e-3,
+    model_cache: ModelCache | None = None,
+    dosing_mode: DosingMode = DosingMode.EVENTS,
+    logger: Logger | None = None,
+    n_workers: int | None = 1,
+    model_cache_dir: str | None = None
+) -> LocalSensitivities:
+    """Compute the local sensitivities of the outputs of a scenario with
+    respect to the specified parameters at all evaluation time points.
+
+    With method `FORWARD`, the sensitivities are computed in a single
+    integration pass using the forward sensitivity solver of roadrunner.
+    This is only available for scenarios of which the outputs are species
+    and the parameters are global parameters that are not defined by rules,
+    and for which the model has no events (i.e., all doses are specified as
+    initial states). With method `FINITE_DIFFERENCE`, the sensitivities are
+    computed using central differences with a step of `relative_step`
+    times the parameter value, requiring two simulations per parameter.
+    These are run as one batch, in parallel on `n_workers` worker processes
+    (use None for all available cores), using the process-wide model cache
+    of `model_cache_dir` in each worker. Method `AUTO` uses forward
+    sensitivities when available and finite differences otherwise.
+    """
+    if not parameters:
+        raise ValueError("At least one parameter is required.")
+    if logger is None:
+        logger = logging.getLogger(__name__)
+    if model_cache is None:
+        model_cache = get_default_model_cache(model_cache_dir)
+    scenario_model = create_scenario_model(instance, scenario, None, model_cache, dosing_mode)
+    nominal = np.array([scenario_model.rr_model[param] for param in parameters])
+    forward_available = _is_forward_available(scenario_model, parameters)
+    if method == LocalSensitivityMethod.FORWARD and not forward_available:
+        raise ValueError(
+            f"Forward sensitivities are not available for scenario {scenario.id} and instance {instance.id}."
+        )
+    if method == LocalSensitivityMethod.AUTO:
+        method = (LocalSensitivityMethod.FORWARD if forward_available
+            else LocalSensitivityMethod.FINITE_DIFFERENCE)
+
+    # Simulate the nominal run (restoring the initial state for the forward solver)
+    state = scenario_model.rr_model.saveStateS()
+    results = np.array(simulate_scenario_model(scenario_model))
+    scenario_model.rr_model.loadStateS(state)
+    if method == LocalSensitivityMethod.FORWARD:
+        derivatives = _compute_forward_sensitivities(scenario_model, parameters)
+    else:
+        steps = np.where(nominal != 0, relative_step * np.abs(nominal), relative_step)
+        perturbations = [
+            {param: float(nominal[j] + sign * steps[j])}
+            for j, param in enumerate(parameters)
+            for sign in (1, -1)
+        ]
+        batch_size = -(-len(perturbations) // min(resolve_worker_count(n_workers), len(perturbations)))
+        tasks = [
+            (
+                instance,
+                scenario,
+                perturbations[start:start + batch_size],
+                model_cache_dir,
+                dosing_mode
+            )
+            for start in range(0, len(perturbations), batch_size)
+        ]
+        perturbed = np.concatenate(run_tasks(_simulate_perturbations, tasks, n_workers, logger))
+        (upper, lower) = (perturbed[0::2, :, 1:], perturbed[1::2, :, 1:])
+        derivatives = np.moveaxis(
+            (upper - lower) / (2 * steps[:, np.newaxis, np.newaxis]),
+            0,
+            1
+        )
+
+    if normalise:
+        outputs = results[:, np.newaxis, 1:]
+        scaled = derivatives * nominal[np.newaxis, :, np.newaxis]
+        derivatives = np.divide(
+            scaled,
+            outputs,
+            out=np.zeros_like(derivatives),
+            where=outputs != 0
+        )
+    return LocalSensitivities(
+        times = results[:, 0],
+        parameters = list(parameters),
+        outputs = [output.id for output in scenario.outputs],
+        values = derivatives,
+        method = method,
+        normalised = normalise
+    )
+
+def _is_forward_available(
+    scenario_model: ScenarioModel,
+    parameters: List[str]
+) -> bool:
+    """Check whether forward sensitivities can be computed for a scenario model."""
+    rr_model = scenario_model.rr_model
+    species = set(rr_model.getFloatingSpeciesIds())
+    independent = set(_get_independent_parameters(scenario_model))
+    return (
+        scenario_model.dose_timeline is None
+        and scenario_model.output_times is None
+        and rr_model.model.getNumEvents() == 0
+        and all(output in species for output in scenario_model.selections[1:])
+        and all(param in independent for param in parameters)
+    )
+
+def _get_independent_parameters(scenario_model: ScenarioModel) -> List[str]:
+    """Get the ids of the global parameters that are not defined by rules."""
+    rr_model = scenario_model.rr_model
+    ruled = set(rr_model.getAssignmentRuleIds()) | set(rr_model.getRateRuleIds())
+    return [param for param in rr_model.getGlobalParameterIds() if param not in ruled]
+
+def _compute_forward_sensitivities(
+    scenario_model: ScenarioModel,
+    parameters: List[str]
+) -> np.ndarray:
+    """Compute the (absolute) sensitivities of the outputs of a scenario
+    model using the roadrunner forward sensitivity solver."""
+    rr_model = scenario_model.rr_model
+    outputs = scenario_model.selections[1:]
+    # The solver is synchronised with the parameter values set on the
+    # model. Sensitivities are requested for all independent parameters,
+    # as the solver does not reliably order the results of subsets.
+    independent = _get_independent_parameters(scenario_model)
+    rr_model.getSensitivitySolver().syncWithModel(rr_model.model)
+    (_, values, _, species) = rr_model.timeSeriesSensitivities(
+        0,
+        scenario_model.duration,
+        scenario_model.evaluation_steps,
+        params=independent,
+        species=list(dict.fromkeys(outputs))
+    )
+    rows = [independent.index(param) for param in parameters]
+    columns = [list(species).index(output) for output in outputs]
+    return values[:, rows][:, :, columns] / scenario_model.amount_unit_multiplier
+
+def _evaluate_batch(
+    instance: ModelInstance,
+    scenario: Scenario,
+    parameter_ids: List[str],
+    parameter_values: np.ndarray,
+    model_cache_dir: str | None,
+    dosing_mode: DosingMode,
+    logger: Logger
+) -> np.ndarray:
+    """Evaluate a batch of runs of a design."""
+    model_cache = get_default_model_cache(model_cache_dir)
+    metrics = np.empty((parameter_values.shape[0], len(scenario.outputs) * len(SENSITIVITY_METRICS)))
+    for i, values in enumerate(parameter_values):
+        scenario_model = create_scenario_model(
+            instance,
+            scenario,
+            None,
+            model_cache,
+            dosing_mode,
+            dict(zip(parameter_ids, values.tolist()))
+        )
+        results = simulate_scenario_model(scenario_model)
+        metrics[i] = _compute_metrics(results[:, 0], results[:, 1:])
+    logger.debug("- Evaluated %s model runs", parameter_values.shape[0])
+    return metrics
+
+def _simulate_perturbations(
+    instance: ModelInstance,
+    scenario: Scenario,
+    perturbations: List[Dict[str, float]],
+    model_cache_dir: str | None,
+    dosing_mode: DosingMode,
+    logger: Logger
+) -> np.ndarray:
+    """Simulate a batch of perturbed parameter values of a scenario and get
+    the results with shape (perturbations, time points, time and outputs)."""
+    model_cache = get_default_model_cache(model_cache_dir)
+    results = np.stack([
+        simulate_scenario_model(create_scenario_model(
+            instance,
+            scenario,
+            None,
+            model_cache,
+            dosing_mode,
+            parameters
+        ))
+        for parameters in perturbations
+    ])
+    logger.debug("- Simulated %s parameter perturbations", len(perturbations))
+    return results
+
+def _compute_metrics(times: np.ndarray, outputs: np.ndarray) -> np.ndarray:
+    """Compute the Cmax and AUC of each of the outputs."""
+    return np.column_stack([
+        compute_cmax(times, outputs)[0],
+        compute_auc(times, outputs)
+    ]).ravel()
+
+def _get_quantities(scenario: Scenario) -> List[Tuple[str, str]]:
+    return [
+        (output.id, metric)
+        for output in scenario.outputs
+        for metric in SENSITIVITY_METRICS
+    ]
+
+def _sobol_estimates(blocks: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    (f_a, f_b, f_ab) = (blocks[0], blocks[1], blocks[2:])
+    variance = np.var(np.concatenate([f_a, f_b]), axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        first = np.mean(f_b * (f_ab - f_a), axis=1) / variance
+        total = 0.5 * np.mean((f_a - f_ab) ** 2, axis=1) / variance
+    return (first, total)
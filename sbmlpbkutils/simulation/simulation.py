@@ -5,118 +5,577 @@ scenarios, plot results and compare model outputs against
 reference series.
 """
 
+import copy
+from dataclasses import dataclass, field
 from logging import Logger
 import os
-from typing import Dict, List
-import libsbml as ls
-import matplotlib.pyplot as plt
+from typing import Any, Dict, Iterator, List, Tuple
 import numpy as np
 import pandas as pd
-import tellurium as te
+from roadrunner import RoadRunner
 import yaml
 
 from .units import (
     AmountUnit,
     TimeUnit,
-    get_time_unit_alignment_factor,
     get_model_time_unit_alignment_factor,
     get_amount_unit_alignment_factor
 )
 
 from .definitions import (
     SeriesType,
+    ChunkSettings,
+    DistributionType,
+    DosingMode,
     DosingEvent,
+    DoseAction,
     InitialState,
+    IntegratorSettings,
     Output,
+    OutputReducer,
+    OutputTimes,
+    OutputTimesType,
+    ParameterCorrelation,
+    ParameterTable,
+    ParameterDistribution,
+    Population,
+    ReducerType,
     ReferenceData,
+    SamplingMethod,
     Scenario,
+    ScenarioSweep,
+    SteadyStateMode,
+    SteadyStateSettings,
     ModelInstance,
     SimulationConfig,
-    EventSpec
+    EventSpec,
+    ResultsFileOptions,
+    ResultsFormat
 )
 
+from .chunking import (
+    ChunkCheckpoint,
+    get_chunk_times,
+    get_table_parameters,
+    load_parameter_table
+)
+from .dosing import (
+    create_dosing_input_events,
+    create_dosing_input_parameters,
+    create_dosing_input_slots,
+    get_dose_times,
+    get_dosing_cycle,
+    set_dosing_inputs
+)
+from .goodness_of_fit import get_differences
+from .integrator import apply_integrator_settings, merge_integrator_settings
+from .model_cache import ModelCache, get_default_model_cache
+from .output_times import get_output_times
+from .parallel import resolve_worker_count, run_tasks
+from .pk_metrics import PkMetricsAccumulator
+from .reducers import OutputReduction, has_reducers
+from .result_cache import ResultCache, get_run_key
+from .result_store import ResultStore
+from .results_io import (
+    ResultsWriter,
+    check_results_file_name,
+    get_pk_metrics_file_name,
+    get_results_file_name,
+    write_results
+)
+from .sweeps import (
+    get_field,
+    get_sweep_members,
+    get_sweep_scenario,
+    get_sweep_size,
+    set_field
+)
+
+# Output time points per integration window of scenarios with output
+# reducers (unless a stream window is specified)
+REDUCTION_WINDOW = 10000
+
+@dataclass
+class ScenarioModel:
+    """Compiled model instance that is set up for simulation of a scenario.
+
+    Attributes:
+        rr_model: roadrunner model with initial states, parameters and
+            dosing events of the scenario applied.
+        selections: simulation output selections (time and outputs).
+        time_unit_multiplier: alignment factor of model to scenario time.
+        amount_unit_multiplier: alignment factor of model to scenario amounts.
+        duration: simulation duration (in model time unit).
+        evaluation_steps: number of evaluation time points.
+        dose_timeline: dose timeline for segmented dosing (optional).
+        output_times: explicit output time points (in model time unit,
+            optional).
+        integration_times: time points the integrator passes through when
+            simulating explicit output times (in model time unit, optional).
+        dosing_cycle: start time and period of the dosing cycles (in model
+            time unit) for periodic steady-state detection (optional).
+        steady_state: periodic steady-state detection settings (optional).
+        chunk_duration: duration of the chunks (in model time unit) for
+            chunked simulation (optional).
+        parameter_tables: parameter tables (with their contents) applied at
+            the start of each chunk (optional).
+    """
+    rr_model: RoadRunner
+    selections: List[str]
+    time_unit_multiplier: float
+    amount_unit_multiplier: float
+    duration: float
+    evaluation_steps: int
+    dose_timeline: List[DoseAction] | None = None
+    output_times: np.ndarray | None = None
+    integration_times: np.ndarray | None = None
+    dosing_cycle: Tuple[float, float] | None = None
+    steady_state: SteadyStateSettings | None = None
+    chunk_duration: float | None = None
+    parameter_tables: List[Tuple[ParameterTable, pd.DataFrame]] | None = None
+
+@dataclass
+class SimulationResult:
+    """Results of a simulation of a scenario for a model instance.
+
+    Wraps the simulation result buffer without copying. The conversion to
+    a pandas data frame is done on first use (and shares the buffer).
+
+    Attributes:
+        values: simulation results with the time points in the first column
+            and the outputs in the other columns (in scenario units).
+        columns: column names (time and model output selections).
+        output_ids: ids of the scenario outputs.
+    """
+    values: np.ndarray
+    columns: List[str]
+    output_ids: List[str]
+    _df: pd.DataFrame | None = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def times(self) -> np.ndarray:
+        """Time points (in scenario time unit)."""
+        return self.values[:, 0]
+
+    @property
+    def outputs(self) -> np.ndarray:
+        """Output values (time points x outputs, in scenario amount unit)."""
+        return self.values[:, 1:]
+
+    def get_output(self, output_id: str) -> np.ndarray:
+        """Get the values of the scenario output with the specified id."""
+        if output_id not in self.output_ids:
+            raise ValueError(f"Output {output_id} not found in simulation results.")
+        return self.values[:, 1 + self.output_ids.index(output_id)]
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Get the results as a pandas data frame (with the columns of the
+        results files)."""
+        if self._df is None:
+            self._df = pd.DataFrame(self.values, columns=self.columns, copy=False)
+        return self._df
+
+@dataclass
+class BatchSimulationResult:
+    """Results of simulations of multiple scenarios for a model instance.
+
+    Attributes:
+        scenario_ids: ids of the scenarios.
+        output_ids: ids of the scenario outputs.
+        times: time points (in scenario time unit), shared by all scenarios.
+        values: output values (scenarios x time points x outputs, in
+            scenario amount units).
+    """
+    scenario_ids: List[str]
+    output_ids: List[str]
+    times: np.ndarray
+    values: np.ndarray
+
+    def get_values(self, scenario_id: str) -> np.ndarray:
+        """Get the output values (time points x outputs) of a scenario."""
+        if scenario_id not in self.scenario_ids:
+            raise ValueError(f"Scenario {scenario_id} not found in simulation results.")
+        return self.values[self.scenario_ids.index(scenario_id)]
+
 def load_config(path: str) -> SimulationConfig:
     """Load a YAML simulation configuration and return a SimulationConfig.
 
     The YAML should contain `model_instances` and `scenarios` sections that map
-    onto the dataclasses defined in this module.
+    onto the dataclasses defined in this module. The optional `sweeps`
+    section specifies scenario sweeps (see `ScenarioSweep`), each with a
+    base `scenario` (without id and label) and a `matrix` of values per
+    scenario field.
     """
     with open(path, "r", encoding="utf-8") as f:
         data = yaml.safe_load(f)
 
-    model_instances = [
-        ModelInstance(**mi)
-        for mi in data["model_instances"]
-    ]
-
-    scenarios = []
-    for s in data["scenarios"]:
-        dosing_events = ([DosingEvent(**e) for e in s["dosing_events"]]
-            if "dosing_events" in s.keys() else None)
-        initial_states = ([InitialState(**e) for e in s["initial_states"]]
-            if "initial_states" in s.keys() else None)
-        outputs = [Output(**c) for c in s["outputs"]]
-        reference_data = []
-        if 'reference_data' in s.keys():
-            for r in s['reference_data']:
-                reference_series = ReferenceData(
-                    id = r['id'],
-                    label = r['label'],
-                    file_path = r['file_path'],
-                    series_type = SeriesType[r['series_type']],
-                    time_unit = TimeUnit[r['time_unit']],
-                    mappings = r['mappings']
-                )
-                reference_data.append(reference_series)
-
-        scenarios.append(
-            Scenario(
-                id=s['id'],
-                label=s['label'],
-                duration=s['duration'],
-                evaluation_resolution=s['evaluation_resolution'],
-                initial_states=initial_states,
-                parameters=s['parameters'] if 'parameters' in s.keys() else None,
-                dosing_events=dosing_events,
-                outputs=outputs,
-                reference_data=reference_data,
-                time_unit=TimeUnit[s['time_unit']],
-                amount_unit=AmountUnit[s['amount_unit']],
-                molar_mass=s['molar_mass'] if 'molar_mass' in s.keys() else None
+    model_instances = []
+    for mi in data["model_instances"]:
+        population = None
+        if "population" in mi.keys():
+            p = mi["population"]
+            population = Population(
+                size = p["size"],
+                parameters = [
+                    ParameterDistribution(**{
+                        **d,
+                        "distribution": DistributionType[d["distribution"]]
+                    })
+                    for d in p["parameters"]
+                ],
+                seed = p["seed"] if "seed" in p.keys() else None,
+                sampling = (SamplingMethod[p["sampling"]]
+                    if "sampling" in p.keys() else SamplingMethod.RANDOM),
+                correlations = ([ParameterCorrelation(**c) for c in p["correlations"]]
+                    if "correlations" in p.keys() else None),
+                percentiles = (p["percentiles"]
+                    if "percentiles" in p.keys() else [5., 50., 95.])
             )
-        )
+        integrator = (IntegratorSettings(**mi["integrator"])
+            if "integrator" in mi.keys() else None)
+        model_instances.append(ModelInstance(**{
+            **mi,
+            "population": population,
+            "integrator": integrator
+        }))
+
+    scenarios = [_parse_scenario(s) for s in data["scenarios"]]
+    sweeps = []
+    for sw in data.get("sweeps", []):
+        s = {**sw["scenario"], "id": sw["id"], "label": sw["label"]}
+        sweeps.append(ScenarioSweep(
+            id = sw["id"],
+            label = sw["label"],
+            scenario = _parse_scenario(s),
+            matrix = _parse_sweep_matrix(s, sw["matrix"])
+        ))
 
     return SimulationConfig(
         id=data['id'],
         label=data['label'],
         model_instances=model_instances,
-        scenarios=scenarios
+        scenarios=scenarios,
+        sweeps=sweeps
+    )
+
+def _parse_sweep_matrix(s: dict, matrix: dict) -> Dict[str, List[Any]]:
+    """Parse the values of the swept fields of a sweep of a YAML simulation
+    configuration (e.g., enumeration names or dosing events), by parsing
+    the base scenario `s` with each of the values."""
+    parsed = {}
+    for path, values in matrix.items():
+        parsed[path] = []
+        for value in values:
+            member = copy.deepcopy(s)
+            try:
+                set_field(member, path, value)
+                parsed[path].append(get_field(_parse_scenario(member), path))
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"Invalid value {value} of field {path} of sweep {s['id']}.") from e
+    return parsed
+
+def _parse_scenario(s: dict) -> Scenario:
+    """Parse a scenario of a YAML simulation configuration."""
+    dosing_events = ([DosingEvent(**e) for e in s["dosing_events"]]
+        if "dosing_events" in s.keys() else None)
+    initial_states = ([InitialState(**e) for e in s["initial_states"]]
+        if "initial_states" in s.keys() else None)
+    outputs = [
+        Output(**{
+            **c,
+            "reducers": ([
+                OutputReducer(type=ReducerType[r["type"]], window=r["window"])
+                for r in c["reducers"]
+            ] if "reducers" in c.keys() else None)
+        })
+        for c in s["outputs"]
+    ]
+    reference_data = []
+    if 'reference_data' in s.keys():
+        for r in s['reference_data']:
+            reference_series = ReferenceData(
+                id = r['id'],
+                label = r['label'],
+                file_path = r['file_path'],
+                series_type = SeriesType[r['series_type']],
+                time_unit = TimeUnit[r['time_unit']],
+                mappings = r['mappings']
+            )
+            reference_data.append(reference_series)
+    output_times = None
+    if 'output_times' in s.keys():
+        o = s['output_times']
+        output_times = OutputTimes(**{**o, "type": OutputTimesType[o["type"]]})
+    integrator = (IntegratorSettings(**s['integrator'])
+        if 'integrator' in s.keys() else None)
+    steady_state = None
+    if 'steady_state' in s.keys():
+        d = s['steady_state'] or {}
+        steady_state = SteadyStateSettings(**{
+            **d,
+            "mode": SteadyStateMode[d["mode"]] if "mode" in d.keys() else SteadyStateMode.FAST_FORWARD
+        })
+
+    chunks = None
+    if 'chunks' in s.keys():
+        c = s['chunks']
+        chunks = ChunkSettings(
+            duration = c['duration'],
+            parameter_tables = ([ParameterTable(**t) for t in c['parameter_tables']]
+                if 'parameter_tables' in c.keys() else None)
+        )
+
+    return Scenario(
+        id=s['id'],
+        label=s['label'],
+        duration=s['duration'],
+        evaluation_resolution=s['evaluation_resolution'],
+        initial_states=initial_states,
+        parameters=s['parameters'] if 'parameters' in s.keys() else None,
+        dosing_events=dosing_events,
+        outputs=outputs,
+        reference_data=reference_data,
+        time_unit=TimeUnit[s['time_unit']],
+        amount_unit=AmountUnit[s['amount_unit']],
+        molar_mass=s['molar_mass'] if 'molar_mass' in s.keys() else None,
+        output_times=output_times,
+        integrator=integrator,
+        steady_state=steady_state,
+        chunks=chunks
     )
 
 def run_config(
     config: SimulationConfig,
     out_path: str,
     force_recompute: bool,
-    logger: Logger
+    logger: Logger,
+    n_workers: int | None = 1,
+    model_cache_dir: str | None = None,
+    dosing_mode: DosingMode = DosingMode.EVENTS,
+    results_options: ResultsFileOptions | None = None,
+    result_cache_dir: str | None = None,
+    checkpoint_dir: str | None = None
 ):
     """Run all scenarios in a configuration for all model instances.
 
-    For each scenario-instance pair a CSV output file named
-    `{scenario.id}_{instance.id}.csv` is written into `out_path`.
+    For each scenario-instance pair a results file named
+    `{scenario.id}_{instance.id}.csv` is written into `out_path` (or with
+    extension `.parquet` or `.arrow` for the file format specified in
+    `results_options`). The
+    scenario-instance pairs are independent and are run in a process pool
+    when `n_workers` is larger than one (use None for all available cores).
+    The log messages of each run are written in scenario-instance order.
+    Compiled models are stored in an on-disk model state cache when
+    `model_cache_dir` is specified. The `dosing_mode` specifies how dosing
+    events are applied (see `run_scenario`). When `result_cache_dir` is
+    specified, results are taken from (and stored in) a content-addressed
+    result cache in this directory (see `run_scenario`). When
+    `checkpoint_dir` is specified, chunked scenarios store checkpoints in
+    the subdirectory `{scenario.id}_{instance.id}` of this directory, from
+    which interrupted runs are resumed (see `run_scenario`).
+
+    The sweeps of the configuration are run after the scenarios, with a
+    single results file per sweep-instance pair (see `run_sweep`) and a
+    table of the sweep members `{sweep.id}_members.csv`. With the `EVENTS`
+    dosing mode, the sweeps are run with the `SEGMENTED` dosing mode, so
+    that all members of a sweep share one compiled model.
     """
+    tasks = []
     for scenario in config.scenarios:
         for instance in config.model_instances:
-            # Simulation output csv file
-            logger.info("Running scenario %s for instance %s", scenario.id, instance.id)
-            out_file = os.path.join(out_path, f"{scenario.id}_{instance.id}.csv")
-            run_scenario(
+            # Simulation output file
+            out_file = os.path.join(
+                out_path,
+                get_results_file_name(
+                    scenario.id,
+                    instance.id,
+                    results_options.format if results_options else ResultsFormat.CSV
+                )
+            )
+            tasks.append((
                 instance,
                 scenario,
                 out_file,
                 force_recompute,
-                logger
+                model_cache_dir,
+                dosing_mode,
+                results_options,
+                result_cache_dir,
+                (os.path.join(checkpoint_dir, f"{scenario.id}_{instance.id}")
+                    if checkpoint_dir is not None else None)
+            ))
+    run_tasks(_run_config_task, tasks, n_workers, logger)
+
+    for sweep in config.sweeps:
+        os.makedirs(out_path, exist_ok=True)
+        get_sweep_members(sweep).to_csv(os.path.join(out_path, f"{sweep.id}_members.csv"), index=False)
+        for instance in config.model_instances:
+            out_file = os.path.join(
+                out_path,
+                get_results_file_name(
+                    sweep.id,
+                    instance.id,
+                    results_options.format if results_options else ResultsFormat.CSV
+                )
+            )
+            run_sweep(
+                instance,
+                sweep,
+                out_file,
+                force_recompute,
+                logger,
+                n_workers,
+                model_cache_dir,
+                DosingMode.SEGMENTED if dosing_mode == DosingMode.EVENTS else dosing_mode,
+                results_options
             )
 
+def _run_config_task(
+    instance: ModelInstance,
+    scenario: Scenario,
+    out_file: str,
+    force_recompute: bool,
+    model_cache_dir: str | None,
+    dosing_mode: DosingMode,
+    results_options: ResultsFileOptions | None,
+    result_cache_dir: str | None,
+    checkpoint_dir: str | None,
+    logger: Logger
+):
+    """Run a single scenario-instance pair of a configuration."""
+    logger.info("Running scenario %s for instance %s", scenario.id, instance.id)
+    run_scenario(
+        instance,
+        scenario,
+        out_file,
+        force_recompute,
+        logger,
+        get_default_model_cache(model_cache_dir),
+        dosing_mode,
+        results_options,
+        ResultCache(result_cache_dir) if result_cache_dir is not None else None,
+        checkpoint_dir
+    )
+
+def run_sweep(
+    instance: ModelInstance,
+    sweep: ScenarioSweep,
+    out_file: str,
+    force_recompute: bool,
+    logger: Logger,
+    n_workers: int | None = 1,
+    model_cache_dir: str | None = None,
+    dosing_mode: DosingMode = DosingMode.SEGMENTED,
+    results_options: ResultsFileOptions | None = None,
+    batch_size: int | None = None
+):
+    """Run all members of a scenario sweep for a model instance and write
+    the results into a single results file.
+
+    The members are created from the sweep in batches of `batch_size`
+    members, which are simulated in a process pool when `n_workers` is
+    larger than one (use None for all available cores), with one compiled
+    model per worker process (dosing modes `SEGMENTED` and, for members
+    with the same dosing event structure, `PARAMETERISED`). The results of
+    each batch are appended to the results file as soon as they are
+    available, with the member index in column `index` followed by the
+    columns of the results files of scenarios (see `run_scenario`). As for
+    `run_scenario`, the outputs of members with reducers are reduced
+    window by window while integrating. When PK metrics are requested in
+    `results_options`, the metrics of all members are written to a
+    single table (see `get_pk_metrics_file_name`), with the member index
+    in column `index`. The simulation is skipped when `out_file` (and the
+    PK metrics table) already exists (unless `force_recompute` is set).
+    """
+    check_results_file_name(
+        out_file,
+        results_options.format if results_options is not None else ResultsFormat.CSV
+    )
+    pk_metrics_file = (get_pk_metrics_file_name(out_file)
+        if results_options is not None and results_options.pk_metrics else None)
+    if os.path.exists(out_file) and not force_recompute and (
+        pk_metrics_file is None or os.path.exists(pk_metrics_file)
+    ):
+        logger.info("Skipping sweep %s: results already available", sweep.id)
+        return
+
+    size = get_sweep_size(sweep)
+    if batch_size is None:
+        batch_size = -(-size // (4 * resolve_worker_count(n_workers)))
+    batch_size = max(1, batch_size)
+    tasks = [
+        (
+            instance,
+            sweep,
+            start,
+            min(start + batch_size, size),
+            model_cache_dir,
+            dosing_mode,
+            pk_metrics_file is not None
+        )
+        for start in range(0, size, batch_size)
+    ]
+
+    # Simulate the sweep members and stream the results to file
+    columns = _get_selections(instance, sweep.scenario)
+    if has_reducers(sweep.scenario.outputs):
+        columns = OutputReduction(sweep.scenario.outputs, columns).columns
+    os.makedirs(os.path.dirname(out_file), exist_ok=True)
+    logger.info("Running %s members of sweep %s for instance %s", size, sweep.id, instance.id)
+    pk_metrics = []
+    with ResultsWriter(out_file, ['index'] + columns, results_options, ['index']) as writer:
+        def _write_batch(result: Tuple[np.ndarray, pd.DataFrame | None]):
+            (values, batch_pk_metrics) = result
+            writer.write(values)
+            if batch_pk_metrics is not None:
+                pk_metrics.append(batch_pk_metrics)
+        run_tasks(_run_sweep_batch, tasks, n_workers, logger, _write_batch)
+    if pk_metrics_file is not None:
+        pd.concat(pk_metrics, ignore_index=True).to_csv(pk_metrics_file, index=False)
+
+def _run_sweep_batch(
+    instance: ModelInstance,
+    sweep: ScenarioSweep,
+    start: int,
+    end: int,
+    model_cache_dir: str | None,
+    dosing_mode: DosingMode,
+    pk_metrics: bool,
+    logger: Logger
+) -> Tuple[np.ndarray, pd.DataFrame | None]:
+    """Simulate a batch of members of a sweep for a model instance and
+    return their results and (optionally) their PK metrics."""
+    model_cache = get_default_model_cache(model_cache_dir)
+    results = []
+    metrics = []
+    for index in range(start, end):
+        scenario = get_sweep_scenario(sweep, index)
+        logger.debug("- Simulating scenario %s", scenario.id)
+        accumulator = (PkMetricsAccumulator([output.id for output in scenario.outputs])
+            if pk_metrics else None)
+        if has_reducers(scenario.outputs) and scenario.steady_state is None:
+            # Reduce the outputs window by window while integrating
+            scenario_model = create_scenario_model(instance, scenario, None, model_cache, dosing_mode)
+            reduction = OutputReduction(scenario.outputs, scenario_model.selections)
+            values = np.concatenate(list(simulate_reduced_outputs(
+                scenario_model,
+                reduction,
+                accumulator = accumulator
+            )))
+        else:
+            result = simulate_scenario(instance, scenario, None, model_cache, dosing_mode)
+            if accumulator is not None:
+                accumulator.update(result.times, result.outputs)
+            values = result.values
+            if has_reducers(scenario.outputs):
+                values = OutputReduction(scenario.outputs, result.columns).reduce(values)
+        results.append(np.column_stack((np.full(len(values), index), values)))
+        if accumulator is not None:
+            df = accumulator.result().to_dataframe()
+            df.insert(0, 'index', index)
+            metrics.append(df)
+    return (np.concatenate(results), pd.concat(metrics, ignore_index=True) if pk_metrics else None)
+
 def plot_simulation_results(
     config: SimulationConfig,
     out_path: str,
@@ -127,7 +586,9 @@ def plot_simulation_results(
     """Generate plots for all scenarios in a configuration.
 
     Writes PNG files for each scenario and output variable into `out_path`.
+    Each results and reference data file is read only once.
     """
+    store = ResultStore(out_path)
     for scenario in config.scenarios:
         # Plot combined instances scenario results
         plot_scenario_results(
@@ -135,14 +596,16 @@ def plot_simulation_results(
             scenario,
             out_path,
             combine_outputs,
-            ncols_combined
+            ncols_combined,
+            store
         )
 
         if plot_reference_comparison and scenario.reference_data:
             plot_scenario_differences(
                 config.model_instances,
                 scenario,
-                out_path
+                out_path,
+                store
             )
 
 def run_scenario(
@@ -150,29 +613,393 @@ def run_scenario(
     scenario: Scenario,
     out_file: str,
     force_recompute: bool,
-    logger: Logger
+    logger: Logger,
+    model_cache: ModelCache | None = None,
+    dosing_mode: DosingMode = DosingMode.EVENTS,
+    results_options: ResultsFileOptions | None = None,
+    result_cache: ResultCache | None = None,
+    checkpoint_dir: str | None = None
 ):
     """Execute a single scenario for a model instance and save results.
 
     Loads the SBML model, applies initial states, dosing events and any
-    parameter file, runs the simulation and writes a CSV with time and
-    selected outputs.
+    parameter file, runs the simulation and writes a results file with time
+    and selected outputs (CSV by default, or in the file format specified
+    in `results_options`). Compiled models are taken from `model_cache` (or
+    from the process-wide default model cache if not specified). With
+    dosing mode `SEGMENTED`, the dosing events are expanded into a dose
+    timeline that is applied directly on the model state in between
+    piecewise integration segments, rather than being added to the model
+    as events. With dosing mode `PARAMETERISED`, generic dosing events
+    controlled by generated dosing input parameters are added to the model,
+    so that the compiled model can be reused for all scenarios with the
+    same dosing event structure.
+
+    Without `result_cache`, the simulation is skipped when `out_file`
+    already exists (unless `force_recompute` is set). With `result_cache`,
+    results are instead copied from the cache when available for the
+    current content of the model, parametrisation and scenario (unless
+    `force_recompute` is set), and new results are stored in the cache.
+
+    Chunked scenarios (see `ChunkSettings`) and, when a stream window is
+    specified in `results_options`, all scenarios without steady-state
+    detection are simulated chunk by chunk, integrating each chunk in
+    windows of at most `stream_window` output time points, and the results
+    of each window are appended to the results file directly, such that
+    only one window is kept in memory. When outputs specify reducers (see
+    `OutputReducer`), the results file contains the reduced outputs per
+    time window instead. Scenarios with reducers are always integrated
+    window by window (in windows of `stream_window`, or `REDUCTION_WINDOW`
+    output time points) and the results of each integration window are
+    fed to the reducers (see `simulate_reduced_outputs`), such that the
+    full trajectory is never kept in memory. Only scenarios with
+    steady-state detection are reduced from their full results. When PK
+    metrics are requested in `results_options`, the (unreduced) results
+    of each window are also added to a `PkMetricsAccumulator`, and the
+    metrics of the outputs are written to a table next to the results
+    file (see `get_pk_metrics_file_name`).
+
+    Chunked scenarios store a checkpoint after each chunk in
+    `checkpoint_dir` (when specified). A run that is interrupted is resumed
+    from the last completed chunk of the checkpoint (unless
+    `force_recompute` is set) and the checkpoint is removed once the
+    results file is written.
     """
-    # Skip if output already available and no forced recalculation
-    if os.path.exists(out_file) and not force_recompute:
+    check_results_file_name(
+        out_file,
+        results_options.format if results_options is not None else ResultsFormat.CSV
+    )
+    pk_metrics_file = (get_pk_metrics_file_name(out_file)
+        if results_options is not None and results_options.pk_metrics else None)
+    if result_cache is not None:
+        # Use cached results if available and no forced recalculation
+        cache_key = result_cache.get_key(instance, scenario, dosing_mode, results_options)
+        label = f"{scenario.id}_{instance.id}"
+        if not force_recompute and result_cache.fetch(cache_key, out_file, label) and (
+            pk_metrics_file is None
+            or result_cache.fetch(f"{cache_key}_pk_metrics", pk_metrics_file, label)
+        ):
+            logger.info("Skipping scenario %s: results available in result cache", scenario.id)
+            return
+    elif os.path.exists(out_file) and not force_recompute and (
+        pk_metrics_file is None or os.path.exists(pk_metrics_file)
+    ):
+        # Skip if output already available and no forced recalculation
         logger.info("Skipping scenario %s: results already available", scenario.id)
         return
 
+    # Create output folder if not exists
+    os.makedirs(os.path.dirname(out_file), exist_ok=True)
+
+    # Get the checkpoint of chunked scenarios
+    stream_window = results_options.stream_window if results_options is not None else None
+    checkpoint = None
+    if checkpoint_dir is not None and scenario.chunks is not None:
+        checkpoint = ChunkCheckpoint(
+            checkpoint_dir,
+            get_run_key(instance, scenario, dosing_mode, results_options)
+        )
+        if force_recompute:
+            checkpoint.clear()
+
+    # Outputs with reducers are reduced window by window while integrating
+    reduced = has_reducers(scenario.outputs)
+    accumulator = (PkMetricsAccumulator([output.id for output in scenario.outputs])
+        if pk_metrics_file is not None else None)
+    if scenario.chunks is not None or (
+        (stream_window is not None or reduced) and scenario.steady_state is None
+    ):
+        # Simulate the scenario window by window and stream the results to file
+        scenario_model = create_scenario_model(
+            instance,
+            scenario,
+            logger,
+            model_cache,
+            dosing_mode
+        )
+        if reduced:
+            reduction = OutputReduction(scenario.outputs, scenario_model.selections)
+            with ResultsWriter(out_file, reduction.columns, results_options) as writer:
+                for results in simulate_reduced_outputs(
+                    scenario_model,
+                    reduction,
+                    checkpoint,
+                    stream_window or REDUCTION_WINDOW,
+                    accumulator
+                ):
+                    writer.write(results)
+        else:
+            with ResultsWriter(out_file, scenario_model.selections, results_options) as writer:
+                for results in simulate_scenario_chunks(scenario_model, checkpoint, stream_window):
+                    if accumulator is not None:
+                        accumulator.update(results[:, 0], results[:, 1:])
+                    writer.write(results)
+    else:
+        if stream_window is not None or reduced:
+            logger.info("Results of scenario %s are not streamed: not supported with steady-state detection", scenario.id)
+
+        # Simulate the scenario and write results file
+        result = simulate_scenario(
+            instance,
+            scenario,
+            logger,
+            model_cache,
+            dosing_mode
+        )
+        if accumulator is not None:
+            accumulator.update(result.times, result.outputs)
+        df = result.to_dataframe()
+        if reduced:
+            reduction = OutputReduction(scenario.outputs, result.columns)
+            df = pd.DataFrame(reduction.reduce(result.values), columns=reduction.columns)
+        write_results(df, out_file, results_options)
+
+    # Write the PK metrics table
+    if accumulator is not None:
+        accumulator.result().to_dataframe().to_csv(pk_metrics_file, index=False)
+
+    # Store results in result cache
+    if result_cache is not None:
+        result_cache.store(cache_key, out_file)
+        if pk_metrics_file is not None:
+            result_cache.store(f"{cache_key}_pk_metrics", pk_metrics_file)
+
+    # Remove the checkpoint of the completed run
+    if checkpoint is not None:
+        checkpoint.clear()
+
+def simulate_scenario(
+    instance: ModelInstance,
+    scenario: Scenario,
+    logger: Logger | None = None,
+    model_cache: ModelCache | None = None,
+    dosing_mode: DosingMode = DosingMode.EVENTS,
+    parameters: Dict[str, float] | None = None,
+    checkpoint: ChunkCheckpoint | None = None
+) -> SimulationResult:
+    """Simulate a scenario for a model instance in memory.
+
+    Same as `run_scenario`, but returns the results as a simulation result
+    object (wrapping the simulation result buffer) rather than writing a
+    results file. The optional `parameters` override the instance and
+    scenario parameter values. For chunked scenarios, the optional
+    `checkpoint` is used to store and resume the simulation (see
+    `simulate_scenario_chunks`). Output reducers are ignored: the result
+    contains the full output series, which can be reduced with
+    `OutputReduction.reduce` to obtain the reduced outputs written by
+    `run_scenario`.
+    """
+    scenario_model = create_scenario_model(
+        instance,
+        scenario,
+        logger,
+        model_cache,
+        dosing_mode,
+        parameters
+    )
+    if checkpoint is not None and scenario_model.chunk_duration is not None:
+        values = np.concatenate(list(simulate_scenario_chunks(scenario_model, checkpoint)))
+    else:
+        values = simulate_scenario_model(scenario_model)
+    return SimulationResult(
+        values = values,
+        columns = scenario_model.selections,
+        output_ids = [output.id for output in scenario.outputs]
+    )
+
+def simulate_scenarios(
+    instance: ModelInstance,
+    scenarios: List[Scenario],
+    logger: Logger,
+    n_workers: int | None = 1,
+    model_cache_dir: str | None = None,
+    dosing_mode: DosingMode = DosingMode.EVENTS,
+    batch_size: int | None = None
+) -> BatchSimulationResult:
+    """Simulate multiple scenarios for a model instance in memory.
+
+    The scenarios should have the same outputs and the same output time
+    points. The scenarios are simulated in batches of `batch_size`
+    scenarios, in a process pool when `n_workers` is larger than one (use
+    None for all available cores), and the results are stacked into a
+    single array of shape (scenarios, time points, outputs). Output
+    reducers are ignored (see `simulate_scenario`).
+    """
+    if not scenarios:
+        raise ValueError("At least one scenario is required.")
+    output_ids = [output.id for output in scenarios[0].outputs]
+    for scenario in scenarios:
+        if [output.id for output in scenario.outputs] != output_ids:
+            raise ValueError(f"Outputs of scenario {scenario.id} differ from those of scenario {scenarios[0].id}.")
+
+    if batch_size is None:
+        batch_size = -(-len(scenarios) // (4 * resolve_worker_count(n_workers)))
+    batch_size = max(1, batch_size)
+    tasks = [
+        (
+            instance,
+            scenarios[start:start + batch_size],
+            start,
+            model_cache_dir,
+            dosing_mode
+        )
+        for start in range(0, len(scenarios), batch_size)
+    ]
+
+    # Simulate scenarios and stack the results
+    store: Dict[str, np.ndarray] = {}
+    def _store_batch(result: Tuple[int, np.ndarray, np.ndarray]):
+        (start, times, values) = result
+        if "values" not in store:
+            store["times"] = times
+            store["values"] = np.empty((len(scenarios),) + values.shape[1:])
+        elif not np.array_equal(times, store["times"]):
+            raise ValueError("Scenarios should have the same output time points.")
+        store["values"][start:start + values.shape[0]] = values
+    logger.info("Running %s scenarios for instance %s", len(scenarios), instance.id)
+    run_tasks(_simulate_scenario_batch, tasks, n_workers, logger, _store_batch)
+
+    return BatchSimulationResult(
+        scenario_ids = [scenario.id for scenario in scenarios],
+        output_ids = output_ids,
+        times = store["times"],
+        values = store["values"]
+    )
+
+def _simulate_scenario_batch(
+    instance: ModelInstance,
+    scenarios: List[Scenario],
+    start: int,
+    model_cache_dir: str | None,
+    dosing_mode: DosingMode,
+    logger: Logger
+) -> Tuple[int, np.ndarray, np.ndarray]:
+    """Simulate a batch of scenarios for a model instance."""
+    model_cache = get_default_model_cache(model_cache_dir)
+    times = None
+    values = None
+    for i, scenario in enumerate(scenarios):
+        logger.debug("- Simulating scenario %s", scenario.id)
+        result = simulate_scenario(instance, scenario, None, model_cache, dosing_mode)
+        if times is None or values is None:
+            times = result.times.copy()
+            values = np.empty((len(scenarios),) + result.outputs.shape)
+        elif not np.array_equal(result.times, times):
+            raise ValueError("Scenarios should have the same output time points.")
+        values[i] = result.outputs
+    return (start, times, values)
+
+def create_scenario_model(
+    instance: ModelInstance,
+    scenario: Scenario,
+    logger: Logger | None = None,
+    model_cache: ModelCache | None = None,
+    dosing_mode: DosingMode = DosingMode.EVENTS,
+    parameters: Dict[str, float] | None = None,
+    integrator: IntegratorSettings | None = None
+) -> ScenarioModel:
+    """Create a model instance that is set up for simulation of a scenario.
+
+    Gets the compiled model from `model_cache` (or from the process-wide
+    default model cache if not specified) and applies the initial states,
+    dosing events, parameter file and scenario parameters. The optional
+    `parameters` override the instance and scenario parameter values.
+    The integrator settings of the instance, the scenario and the optional
+    `integrator` settings are applied, in that order of precedence (later
+    settings override earlier settings). Periodic steady-state detection
+    (see `SteadyStateSettings`) requires the `SEGMENTED` dosing mode and
+    periodic dosing events, and cannot be combined with chunked simulation
+    (see `ChunkSettings`).
+    """
     # Load the model
-    sbml_file = instance.model_path
-    ls_document = ls.readSBML(sbml_file)
-    ls_model = ls_document.getModel()
-    rr_model = te.loadSBMLModel(sbml_file)
+    if model_cache is None:
+        model_cache = get_default_model_cache()
+    ls_model = model_cache.get_sbml_model(instance.model_path)
 
     # Simulation time and amount unit alignment
     time_unit_multiplier = get_model_time_unit_alignment_factor(ls_model, scenario.time_unit)
     amount_unit_multiplier = get_amount_unit_alignment_factor(ls_model, scenario.amount_unit, scenario.molar_mass)
 
+    # Determine duration and steps
+    duration = int(scenario.duration * time_unit_multiplier)
+    evaluation_steps = int(scenario.evaluation_resolution * duration / time_unit_multiplier) + 1
+
+    # Get explicit output times (if specified)
+    output_times = get_output_times(scenario)
+    if output_times is not None:
+        output_times = output_times * time_unit_multiplier
+        evaluation_steps = len(output_times)
+
+    # Get events or dose timeline from scenario dosing event definitions
+    event_specs = None
+    input_parameters = None
+    dosing_input_slots = None
+    dose_timeline = None
+    if scenario.dosing_events is not None:
+        if dosing_mode == DosingMode.PARAMETERISED:
+            dosing_input_slots = create_dosing_input_slots(
+                scenario.dosing_events,
+                instance.target_mappings
+            )
+            event_specs = create_dosing_input_events(dosing_input_slots)
+            input_parameters = create_dosing_input_parameters(dosing_input_slots)
+        elif dosing_mode == DosingMode.SEGMENTED:
+            dose_timeline = create_dose_timeline(
+                scenario.dosing_events,
+                time_unit_multiplier,
+                amount_unit_multiplier,
+                instance.target_mappings,
+                duration
+            )
+        else:
+            event_specs = create_rr_events(
+                scenario.dosing_events,
+                time_unit_multiplier,
+                amount_unit_multiplier,
+                instance.target_mappings
+            )
+
+    # Get the dosing cycles for periodic steady-state detection
+    dosing_cycle = None
+    if scenario.steady_state is not None:
+        if dosing_mode != DosingMode.SEGMENTED:
+            raise ValueError("Periodic steady-state detection requires the SEGMENTED dosing mode.")
+        dosing_cycle = get_dosing_cycle(scenario.dosing_events or [], time_unit_multiplier, duration)
+        if dosing_cycle is None:
+            raise ValueError(f"Periodic steady-state detection requires periodic dosing events (scenario {scenario.id}).")
+
+    # Get the chunks and parameter tables for chunked simulation
+    chunk_duration = None
+    parameter_tables = None
+    if scenario.chunks is not None:
+        if scenario.steady_state is not None:
+            raise ValueError("Periodic steady-state detection cannot be combined with chunked simulation.")
+        chunk_duration = scenario.chunks.duration * time_unit_multiplier
+        parameter_tables = [
+            (table, load_parameter_table(table))
+            for table in scenario.chunks.parameter_tables or []
+        ]
+
+    # Get the time points to integrate through for explicit output times
+    integration_times = None
+    if output_times is not None and dose_timeline is None:
+        integration_times = np.union1d([0.], output_times)
+        if dosing_mode == DosingMode.EVENTS and scenario.dosing_events is not None:
+            event_times = get_event_integration_times(
+                scenario.dosing_events,
+                time_unit_multiplier,
+                output_times[-1],
+                time_unit_multiplier / scenario.evaluation_resolution
+            )
+            integration_times = np.union1d(integration_times, event_times)
+
+    # Get (compiled) model with events
+    rr_model = model_cache.get_rr_model(instance.model_path, event_specs, input_parameters)
+
+    # Set integrator settings
+    integrator = merge_integrator_settings(instance.integrator, scenario.integrator, integrator)
+    apply_integrator_settings(rr_model, integrator)
+
     # Set initial amounts according to scenario
     if scenario.initial_states is not None:
         for item in scenario.initial_states:
@@ -182,29 +1009,10 @@ def run_scenario(
                 else item.target
             )
             amount = amount_unit_multiplier * item.amount
-            logger.info(f"- Initial amount in {target}: {amount}")
+            if logger is not None:
+                logger.info(f"- Initial amount in {target}: {amount}")
             rr_model.setInitAmount(target, amount)
 
-    # If the scenario has dosing event definitions
-    if scenario.dosing_events is not None:
-
-        # Get events from scenario
-        event_specs = create_rr_events(
-            scenario.dosing_events,
-            time_unit_multiplier,
-            amount_unit_multiplier,
-            instance.target_mappings
-        )
-
-        # Set events
-        event_count = 0
-        for ev in event_specs:
-            event_count += 1
-            eid = f"ev_{event_count}"
-            rr_model.addEvent(eid, False, ev.trigger, False)
-            rr_model.addEventAssignment(eid, ev.target, ev.assignment, False)
-        rr_model.regenerateModel(True, True)
-
     # Set instance parametrisation
     if instance.param_file is not None:
         load_parametrisation(rr_model, instance.param_file)
@@ -219,37 +1027,569 @@ def run_scenario(
             )
             rr_model[param] = value
 
+    # Set/override specified parameters
+    if parameters:
+        for param, value in parameters.items():
+            rr_model[param] = value
+
+    # Set dosing inputs
+    if dosing_input_slots is not None and scenario.dosing_events is not None:
+        set_dosing_inputs(
+            rr_model,
+            dosing_input_slots,
+            scenario.dosing_events,
+            time_unit_multiplier,
+            amount_unit_multiplier,
+            instance.target_mappings,
+            duration
+        )
+
     # Define the output selections
+    selections = _get_selections(instance, scenario)
+
+    if logger is not None:
+        if integrator is not None:
+            logger.info("- Integrator settings: %s", integrator)
+        logger.info("- Time unit multiplier: %s", time_unit_multiplier)
+        logger.info("- Amount unit multiplier: %s", amount_unit_multiplier)
+        logger.info("- Duration: %s", duration)
+        logger.info("- Steps: %s", evaluation_steps)
+
+    return ScenarioModel(
+        rr_model = rr_model,
+        selections = selections,
+        time_unit_multiplier = time_unit_multiplier,
+        amount_unit_multiplier = amount_unit_multiplier,
+        duration = duration,
+        evaluation_steps = evaluation_steps,
+        dose_timeline = dose_timeline,
+        output_times = output_times,
+        integration_times = integration_times,
+        dosing_cycle = dosing_cycle,
+        steady_state = scenario.steady_state,
+        chunk_duration = chunk_duration,
+        parameter_tables = parameter_tables
+    )
+
+def _get_selections(instance: ModelInstance, scenario: Scenario) -> List[str]:
+    """Get the simulation output selections (time and outputs, mapped to
+    the model variables of the instance) of a scenario."""
     output_selections = [
         instance.target_mappings.get(output.id, output.id)
             if instance.target_mappings is not None else output.id
         for output in scenario.outputs
     ]
-    selections = ['time'] + output_selections
+    return ['time'] + output_selections
 
-    # Determine duration and steps
-    duration = int(scenario.duration * time_unit_multiplier)
-    evaluation_steps = int(scenario.evaluation_resolution * duration / time_unit_multiplier) + 1
+def simulate_scenario_model(scenario_model: ScenarioModel) -> np.ndarray:
+    """Simulate a scenario model.
 
-    logger.info("- Time unit multiplier: %s", time_unit_multiplier)
-    logger.info("- Amount unit multiplier: %s", amount_unit_multiplier)
-    logger.info("- Duration: %s", duration)
-    logger.info("- Steps: %s", evaluation_steps)
+    Returns the simulation results (time and outputs) aligned to the
+    scenario time and amount units. When the scenario model has explicit
+    output times, the model is integrated up to the last output time and
+    results are only reported at the output times. Chunked scenario models
+    are simulated chunk by chunk (see `simulate_scenario_chunks`).
+    """
+    output_times = scenario_model.output_times
+    if scenario_model.chunk_duration is not None:
+        return np.concatenate(list(simulate_scenario_chunks(scenario_model)))
+    if scenario_model.dose_timeline is not None:
+        results = simulate_dose_timeline(
+            scenario_model.rr_model,
+            scenario_model.dose_timeline,
+            output_times[-1] if output_times is not None else scenario_model.duration,
+            scenario_model.evaluation_steps,
+            scenario_model.selections,
+            output_times,
+            scenario_model.dosing_cycle,
+            scenario_model.steady_state
+        )
+    elif output_times is not None:
+        # Integrate through the integration times, reporting only the
+        # output times
+        times = scenario_model.integration_times
+        if times is None:
+            times = np.union1d([0.], output_times)
+        results = np.asarray(scenario_model.rr_model.simulate(
+            times = times,
+            selections = scenario_model.selections
+        ))[np.searchsorted(times, output_times)]
+    else:
+        results = scenario_model.rr_model.simulate(
+            0,
+            scenario_model.duration,
+            scenario_model.evaluation_steps,
+            scenario_model.selections
+        )
 
-    # Simulate the PBPK model
-    results = rr_model.simulate(0, duration, evaluation_steps, selections)
+    # Align output times and amounts to target units
+    return align_results(
+        results,
+        scenario_model.time_unit_multiplier,
+        scenario_model.amount_unit_multiplier
+    )
 
-    # Create output folder if not exists
-    os.makedirs(os.path.dirname(out_file), exist_ok=True)
+def align_results(
+    results: np.ndarray,
+    time_unit_multiplier: float,
+    amount_unit_multiplier: float
+) -> np.ndarray:
+    """Align simulation results (time and outputs) to scenario units.
+
+    Converts the time column (first column) and output columns of the
+    simulation results from model units to scenario units. The conversion
+    is done in-place on the (roadrunner) result buffer, which is returned
+    as a plain numpy array without copying.
+    """
+    values = np.asarray(results)
+    values[:, 0] /= time_unit_multiplier
+    values[:, 1:] /= amount_unit_multiplier
+    return values
+
+def simulate_scenario_chunks(
+    scenario_model: ScenarioModel,
+    checkpoint: ChunkCheckpoint | None = None,
+    max_points: int | None = None
+) -> Iterator[np.ndarray]:
+    """Simulate a chunked scenario model chunk by chunk.
+
+    Splits the simulation horizon into chunks of `chunk_duration` (with the
+    chunk boundaries snapped to the output time points), or a single chunk
+    for scenario models without chunk duration, and yields the simulation
+    results (time and outputs, aligned to the scenario units) at the output
+    time points of each chunk, such that only one chunk is kept in memory.
+    With `max_points`, each chunk is integrated in windows of at most
+    `max_points` output time points (see `get_integration_windows`), and
+    the results are yielded per window, such that only one window is kept
+    in memory. The model state carries over from window to window. At the
+    start of each chunk (not of each window), the parameters of the
+    parameter tables are set to their values at the current age (the value
+    of the age variable of the table, or the simulation time in scenario
+    time unit). With a `checkpoint`, the model state and results are stored
+    after each chunk, and a run is resumed from the last completed chunk
+    of a matching checkpoint (yielding the stored results of the completed
+    chunks first).
+    """
+    if scenario_model.chunk_duration is None and max_points is None:
+        raise ValueError("Scenario model is not set up for chunked simulation.")
+    if scenario_model.steady_state is not None:
+        raise ValueError("Periodic steady-state detection cannot be combined with chunked simulation.")
+    if max_points is not None and max_points < 1:
+        raise ValueError("Maximum number of time points per window should be positive.")
+    rr_model = scenario_model.rr_model
+    dose_timeline = scenario_model.dose_timeline
+    output_times = scenario_model.output_times
+    grid = (output_times if output_times is not None
+        else np.linspace(0, scenario_model.duration, scenario_model.evaluation_steps))
+    integration_times = scenario_model.integration_times
+    if integration_times is None:
+        integration_times = grid
+    chunk_times = get_chunk_times(grid, scenario_model.chunk_duration)
+    n_chunks = max(len(chunk_times) - 1, 1)
+
+    # Resume from the checkpoint (if available)
+    first_chunk = 0
+    if checkpoint is not None:
+        loaded = checkpoint.load()
+        if loaded is not None:
+            (first_chunk, state) = loaded
+            rr_model.loadStateS(state)
+            for chunk_index in range(first_chunk):
+                yield from _split_results(checkpoint.get_results(chunk_index), max_points)
+    action_index = 0
+    if dose_timeline is not None and first_chunk > 0:
+        action_index = int(np.searchsorted(
+            [action.time for action in dose_timeline],
+            chunk_times[first_chunk],
+            side='left'
+        ))
 
-    # Write results file
-    df = pd.DataFrame(results, columns=selections)
+    for chunk_index in range(first_chunk, n_chunks):
+        t_start = chunk_times[chunk_index]
+        t_end = chunk_times[min(chunk_index + 1, len(chunk_times) - 1)]
+        is_final = chunk_index == n_chunks - 1
+        chunk_grid = grid[(grid >= t_start) & ((grid <= t_end) if is_final else (grid < t_end))]
+
+        # Update the parameters from the parameter tables
+        for (table, df) in scenario_model.parameter_tables or []:
+            age = (rr_model[table.age] if table.age is not None
+                else t_start / scenario_model.time_unit_multiplier)
+            for param, value in get_table_parameters(df, age).items():
+                rr_model[param] = value
+
+        # Simulate the chunk window by window
+        windows = get_integration_windows(chunk_grid, t_start, t_end, max_points)
+        chunk_results = []
+        for (window_index, (w_start, w_end, window_grid)) in enumerate(windows):
+            if dose_timeline is not None:
+                (results, action_index) = _simulate_dose_segments(
+                    rr_model,
+                    dose_timeline,
+                    action_index,
+                    w_start,
+                    w_end,
+                    window_grid,
+                    scenario_model.selections
+                )
+                if is_final and window_index == len(windows) - 1:
+                    _apply_end_doses(
+                        rr_model,
+                        dose_timeline,
+                        action_index,
+                        w_end,
+                        window_grid,
+                        results,
+                        scenario_model.selections
+                    )
+            elif w_end > w_start:
+                times = integration_times[(integration_times >= w_start) & (integration_times <= w_end)]
+                times = np.union1d(times, [w_start, w_end])
+                results = np.asarray(rr_model.simulate(
+                    times = times,
+                    selections = scenario_model.selections
+                ))[np.searchsorted(times, window_grid)]
+            else:
+                results = _get_current_results(rr_model, window_grid, scenario_model.selections)
+            results = align_results(
+                results,
+                scenario_model.time_unit_multiplier,
+                scenario_model.amount_unit_multiplier
+            )
 
-    # Align output times and amounts to target units
-    df['time'] = df['time'].apply(lambda v: v / time_unit_multiplier)
-    for output in output_selections:
-        df[output] = df[output].apply(lambda v: v / amount_unit_multiplier)
-    df.to_csv(out_file, index=False)
+            # Store the checkpoint before yielding the final window of the chunk
+            if checkpoint is not None:
+                chunk_results.append(results)
+                if window_index == len(windows) - 1:
+                    checkpoint.save(chunk_index + 1, np.concatenate(chunk_results), rr_model.saveStateS())
+            yield results
+
+def get_integration_windows(
+    grid: np.ndarray,
+    t_start: float,
+    t_end: float,
+    max_points: int | None = None
+) -> List[Tuple[float, float, np.ndarray]]:
+    """Split the integration from `t_start` to `t_end` with the output time
+    points `grid` into windows of at most `max_points` output time points.
+
+    Returns the start time, end time and output time points of each
+    window. Each window ends at the first output time point of the next
+    window (the final window at `t_end`), which is reported by the next
+    window, such that values at the window boundaries reflect the state
+    after applying the doses at these time points. Without `max_points`,
+    the integration is a single window.
+    """
+    if max_points is None or len(grid) <= max_points:
+        return [(t_start, t_end, grid)]
+    starts = list(range(0, len(grid), max_points))
+    boundaries = [t_start] + [grid[i] for i in starts[1:]] + [t_end]
+    return [
+        (boundaries[k], boundaries[k + 1], grid[i:i + max_points])
+        for (k, i) in enumerate(starts)
+    ]
+
+def _get_current_results(
+    rr_model: RoadRunner,
+    grid: np.ndarray,
+    selections: List[str]
+) -> np.ndarray:
+    """Get the results of the current model state at the output time
+    points `grid` of an empty integration window (i.e., at its end
+    time)."""
+    results = np.empty((len(grid), len(selections)))
+    results[:, 0] = grid
+    results[:, 1:] = [rr_model[selection] for selection in selections[1:]]
+    return results
+
+def simulate_reduced_outputs(
+    scenario_model: ScenarioModel,
+    reduction: OutputReduction,
+    checkpoint: ChunkCheckpoint | None = None,
+    max_points: int | None = REDUCTION_WINDOW,
+    accumulator: PkMetricsAccumulator | None = None
+) -> Iterator[np.ndarray]:
+    """Simulate a scenario model window by window (see
+    `simulate_scenario_chunks`) and yield the reduced results of the time
+    windows of the reducers that are completed by each integration window,
+    followed by the reduced results of the final (partial) windows, such
+    that the full trajectory is never kept in memory. The results of each
+    integration window are also added to the optional PK metrics
+    `accumulator`."""
+    for results in simulate_scenario_chunks(scenario_model, checkpoint, max_points):
+        if accumulator is not None:
+            accumulator.update(results[:, 0], results[:, 1:])
+        yield reduction.update(results)
+    yield reduction.finish()
+
+def _split_results(results: np.ndarray, max_points: int | None) -> Iterator[np.ndarray]:
+    """Split simulation results into windows of at most `max_points` time
+    points."""
+    if max_points is None:
+        yield results
+        return
+    for start in range(0, len(results), max_points):
+        yield results[start:start + max_points]
+
+def simulate_dose_timeline(
+    rr_model: RoadRunner,
+    dose_timeline: List[DoseAction],
+    duration: float,
+    evaluation_steps: int,
+    selections: List[str],
+    output_times: np.ndarray | None = None,
+    dosing_cycle: Tuple[float, float] | None = None,
+    steady_state: SteadyStateSettings | None = None
+) -> np.ndarray:
+    """Simulate a model with doses applied from an explicit dose timeline.
+
+    The simulation is integrated piecewise between the dose times of the
+    timeline and the doses are applied directly on the model state at the
+    segment boundaries. Results are reported on the same uniform grid of
+    `evaluation_steps` time points as a regular simulation, where values
+    at a dose time reflect the state after applying the dose. When
+    `output_times` are specified, results are instead reported at these
+    time points (which should not exceed `duration`).
+
+    With `steady_state` settings and a `dosing_cycle` (start time and
+    period, see `get_dosing_cycle`), the state is compared at the start of
+    each dosing cycle (before applying its doses). Once the state changes
+    over the last two cycles are equal within tolerance, the integration
+    stops and the trajectory of the last cycle is repeated at the remaining
+    time points, either as is (`STOP`) or extrapolated with the state
+    change per cycle (`FAST_FORWARD`), such that the results always have a
+    record per output time point.
+    """
+    grid = (output_times if output_times is not None
+        else np.linspace(0, duration, evaluation_steps))
+    evaluation_steps = len(grid)
+    results = np.empty((evaluation_steps, len(selections)))
+    dose_times = np.array(sorted({action.time for action in dose_timeline}))
+
+    cycle_starts = np.empty(0)
+    if steady_state is not None and dosing_cycle is not None:
+        cycle_starts = _get_cycle_starts(dosing_cycle, dose_times, duration)
+    state_ids = _get_state_ids(rr_model) if len(cycle_starts) else []
+    states: List[np.ndarray] = []
+
+    action_index = 0
+    grid_index = 0
+    t_start = 0.
+    for t_end in [t for t in cycle_starts if t > 0] + [duration]:
+        if steady_state is not None and len(states) < len(cycle_starts) \
+                and t_start == cycle_starts[len(states)]:
+            # Compare the state changes over the last two dosing cycles
+            states.append(np.array([rr_model[state_id] for state_id in state_ids]))
+            if len(states) >= 3 and np.allclose(
+                states[-1] - states[-2],
+                states[-2] - states[-3],
+                rtol = steady_state.relative_tolerance,
+                atol = steady_state.absolute_tolerance
+            ):
+                results[grid_index:] = _extrapolate_cycles(
+                    rr_model,
+                    dose_timeline,
+                    action_index,
+                    grid,
+                    results,
+                    grid_index,
+                    cycle_starts[len(states) - 3:len(states)],
+                    selections,
+                    steady_state.mode == SteadyStateMode.FAST_FORWARD
+                )
+                return results
+
+        # Integrate up to the next cycle start (or the end time)
+        grid_end = (evaluation_steps if t_end >= duration
+            else int(np.searchsorted(grid, t_end, side='left')))
+        (results[grid_index:grid_end], action_index) = _simulate_dose_segments(
+            rr_model,
+            dose_timeline,
+            action_index,
+            t_start,
+            t_end,
+            grid[grid_index:grid_end],
+            selections
+        )
+        grid_index = grid_end
+        t_start = t_end
+
+    # Apply doses at the end time and update the final record
+    _apply_end_doses(rr_model, dose_timeline, action_index, duration, grid, results, selections)
+    return results
+
+def _apply_end_doses(
+    rr_model: RoadRunner,
+    dose_timeline: List[DoseAction],
+    action_index: int,
+    duration: float,
+    grid: np.ndarray,
+    results: np.ndarray,
+    selections: List[str]
+):
+    """Apply the remaining doses at the end time and, when the end time is
+    a grid point, update its (final) record of the results."""
+    applied = False
+    while (action_index < len(dose_timeline)
+        and dose_timeline[action_index].time <= duration):
+        _apply_dose_action(rr_model, dose_timeline[action_index])
+        action_index += 1
+        applied = True
+    if applied and len(grid) and grid[-1] >= duration:
+        results[-1, 1:] = [rr_model[selection] for selection in selections[1:]]
+
+def _simulate_dose_segments(
+    rr_model: RoadRunner,
+    dose_timeline: List[DoseAction],
+    action_index: int,
+    t_start: float,
+    t_end: float,
+    grid: np.ndarray,
+    selections: List[str]
+) -> Tuple[np.ndarray, int]:
+    """Integrate from `t_start` to `t_end` piecewise between the dose
+    times of the timeline, applying the doses from `action_index` onwards
+    at the segment boundaries before `t_end`. Returns the results at the
+    `grid` time points (within [t_start, t_end]) and the index of the next
+    dose action."""
+    results = np.empty((len(grid), len(selections)))
+    boundaries = sorted({
+        action.time
+        for action in dose_timeline[action_index:]
+        if t_start < action.time < t_end
+    }) + [t_end]
+    grid_index = 0
+    for segment_end in boundaries:
+        # Apply doses at the start of the segment
+        while (action_index < len(dose_timeline)
+            and dose_timeline[action_index].time <= t_start):
+            _apply_dose_action(rr_model, dose_timeline[action_index])
+            action_index += 1
+
+        # Integrate segment, recording grid points in [t_start, segment_end)
+        # (or in [t_start, t_end] for the final segment)
+        grid_end = (len(grid) if segment_end >= t_end
+            else int(np.searchsorted(grid, segment_end, side='left')))
+        segment_grid = grid[grid_index:grid_end]
+        if segment_end <= t_start:
+            # Empty segment (at the end time of an empty window)
+            results[grid_index:grid_end] = _get_current_results(rr_model, segment_grid, selections)
+        else:
+            times = np.unique(np.concatenate(([t_start], segment_grid, [segment_end])))
+            segment_results = np.asarray(rr_model.simulate(times=times, selections=selections))
+            if len(segment_grid) > 0:
+                rows = np.searchsorted(times, segment_grid)
+                results[grid_index:grid_end] = segment_results[rows]
+                results[grid_index:grid_end, 0] = segment_grid
+        grid_index = grid_end
+        t_start = segment_end
+    return (results, action_index)
+
+def _get_cycle_starts(
+    dosing_cycle: Tuple[float, float],
+    dose_times: np.ndarray,
+    duration: float
+) -> np.ndarray:
+    """Get the start times of the dosing cycles before `duration`, snapped
+    to the dose times that coincide with them (up to rounding errors)."""
+    (start, period) = dosing_cycle
+    cycle_starts = start + period * np.arange(max(int(np.ceil((duration - start) / period)), 0))
+    if len(dose_times):
+        nearest = dose_times[np.clip(np.searchsorted(dose_times, cycle_starts), 0, len(dose_times) - 1)]
+        cycle_starts = np.where(np.isclose(nearest, cycle_starts), nearest, cycle_starts)
+    return cycle_starts[cycle_starts < duration]
+
+def _get_state_ids(rr_model: RoadRunner) -> List[str]:
+    """Get the ids of the state variables (floating species and rate rule
+    variables) of a model."""
+    model = rr_model.model
+    return [
+        model.getStateVectorId(i)
+        for i in range(model.getNumFloatingSpecies() + model.getNumRateRules())
+    ]
+
+def _extrapolate_cycles(
+    rr_model: RoadRunner,
+    dose_timeline: List[DoseAction],
+    action_index: int,
+    grid: np.ndarray,
+    results: np.ndarray,
+    grid_index: int,
+    cycle_starts: np.ndarray,
+    selections: List[str],
+    with_change: bool = True
+) -> np.ndarray:
+    """Extrapolate the trajectory of the last dosing cycle to the grid time
+    points from `grid_index` onwards.
+
+    The `cycle_starts` are the start times of the last two completed cycles
+    and of the current cycle. The results at the remaining time points are
+    the results at the same phase of the last cycle plus (`with_change`)
+    the change of the results per cycle. These are taken from the recorded results when the
+    grid points of the last two cycles cover all phases, and are otherwise
+    obtained by simulating two more cycles.
+    """
+    remaining = grid[grid_index:]
+    period = cycle_starts[2] - cycle_starts[1]
+    offsets = remaining - cycle_starts[2]
+    cycles = np.floor(offsets / period + 1e-9)
+    phases = np.maximum(offsets - cycles * period, 0.)
+    (unique_phases, inverse) = np.unique(phases, return_inverse=True)
+
+    previous = [
+        _get_phase_results(grid, results, start, period, unique_phases)
+        for start in cycle_starts[:2]
+    ]
+    if previous[0] is not None and previous[1] is not None:
+        (base, change) = (previous[1], previous[1] - previous[0])
+        cycles += 1
+    else:
+        cycle_results = []
+        for k in range(2):
+            start = cycle_starts[2] + k * period
+            (values, action_index) = _simulate_dose_segments(
+                rr_model,
+                dose_timeline,
+                action_index,
+                start,
+                start + period,
+                start + unique_phases,
+                selections
+            )
+            cycle_results.append(values)
+        (base, change) = (cycle_results[0], cycle_results[1] - cycle_results[0])
+    if not with_change:
+        change = np.zeros_like(change)
+    extrapolated = base[inverse] + cycles[:, np.newaxis] * change[inverse]
+    extrapolated[:, 0] = remaining
+    return extrapolated
+
+def _get_phase_results(
+    grid: np.ndarray,
+    results: np.ndarray,
+    cycle_start: float,
+    period: float,
+    phases: np.ndarray
+) -> np.ndarray | None:
+    """Get the recorded results at the specified phases of a dosing cycle,
+    or None when not all phases are on the grid."""
+    start = int(np.searchsorted(grid, cycle_start - 1e-9 * period, side='left'))
+    end = int(np.searchsorted(grid, cycle_start + period - 1e-9 * period, side='left'))
+    cycle_phases = grid[start:end] - cycle_start
+    if len(cycle_phases) == 0:
+        return None
+    index = np.clip(np.searchsorted(cycle_phases, phases - 1e-9 * period), 0, len(cycle_phases) - 1)
+    if not np.allclose(cycle_phases[index], phases, rtol=0, atol=1e-9 * period):
+        return None
+    return results[start:end][index]
+
+def _apply_dose_action(rr_model: RoadRunner, action: DoseAction):
+    """Apply a dose action directly on the state of the model."""
+    if action.reset:
+        rr_model[action.target] = 0.
+    elif action.adjustment is not None:
+        rr_model[action.target] = rr_model[action.target] + rr_model[action.adjustment] * action.amount
+    else:
+        rr_model[action.target] = rr_model[action.target] + action.amount
 
 def load_parametrisation(model, filename):
     """Load parameter values from a CSV file into a roadrunner model.
@@ -266,13 +1606,21 @@ def plot_scenario_results(
     scenario: Scenario,
     out_path: str,
     combine_outputs: bool = False,
-    ncols_combined: int = 4
+    ncols_combined: int = 4,
+    store: ResultStore | None = None
 ) -> None:
     """Plot time series results for a scenario across model instances.
 
-    Reads per-instance CSV results from `out_path` and writes PNG files for
-    each configured `Output` in the scenario.
+    Reads per-instance results files (of any supported format) from
+    `out_path` and writes PNG files for each configured `Output` in the
+    scenario. Results and reference data are taken from `store` (a new
+    result store for `out_path` if not specified).
     """
+    import matplotlib.pyplot as plt
+
+    if store is None:
+        store = ResultStore(out_path)
+
     # Line and marker styles
     linestyles = ['-', '--', '-.', ':']
     markers = ['x', 'o', 's', '*', '^', 'v', 'p', '.']
@@ -311,15 +1659,8 @@ def plot_scenario_results(
         # Cycle through a small set of linestyles so multiple instances are
         # visually distinguishable even when colors are similar.
         for idx, instance in enumerate(instances):
-            # Get instance scenario output file
-            out_file = os.path.join(out_path, f"{scenario.id}_{instance.id}.csv")
-            output_df = pd.read_csv(out_file, skipinitialspace=True)
-
-            # Extract time and output variable from output
-            times = output_df['time'].to_numpy(dtype=float)
-            output_id = instance.target_mappings.get(output.id, output.id) \
-                if instance.target_mappings is not None else output.id
-            values = output_df[output_id].to_numpy(dtype=float)
+            # Get time and output variable from instance scenario results
+            (times, values) = store.get_output_series(scenario, instance, output)
 
             # Plot time series
             linestyle = linestyles[idx % len(linestyles)]
@@ -328,20 +1669,9 @@ def plot_scenario_results(
         # Plot reference data/series
         if scenario.reference_data:
             for idx, item in enumerate(scenario.reference_data):
-                time_unit_multiplier = get_time_unit_alignment_factor(
-                    item.time_unit,
-                    scenario.time_unit
-                )
-
                 if output.id in item.mappings.keys():
-                    ref_id = item.mappings[output.id]
-
-                    # Get instance scenario output file
-                    reference_df = pd.read_csv(item.file_path, skipinitialspace=True)
-
-                    # Extract time and output variable from output
-                    times = reference_df['time'].apply(lambda v: v / time_unit_multiplier)
-                    values = reference_df[ref_id].to_numpy(dtype=float)
+                    # Get (aligned) time and reference series of output
+                    (times, values) = store.get_reference_series(scenario, item, output.id)
 
                     if item.series_type == SeriesType.CHECKPOINTS:
                         # Plot points
@@ -390,7 +1720,8 @@ def plot_scenario_results(
 def plot_scenario_differences(
     instances: list[ModelInstance],
     scenario: Scenario,
-    out_path: str
+    out_path: str,
+    store: ResultStore | None = None
 ) -> None:
     """Compare instance results with reference data and plot differences.
 
@@ -400,7 +1731,14 @@ def plot_scenario_differences(
     - interpolates model results to reference time points,
     - plots model series, reference points and a residual subplot, and
     - writes a PNG file named ``{scenario.id}_{output.id}_diff.png`` in ``out_path``.
+
+    Results and reference data are taken from `store` (a new result store
+    for `out_path` if not specified).
     """
+    import matplotlib.pyplot as plt
+
+    if store is None:
+        store = ResultStore(out_path)
 
     linestyles = ['-', '--', '-.', ':']
     markers = ['x', 'o', 's', '*', '^', 'v', 'p', '.']
@@ -428,26 +1766,15 @@ def plot_scenario_differences(
 
         # Plot model instance series
         for idx, instance in enumerate(instances):
-            out_file = os.path.join(out_path, f"{scenario.id}_{instance.id}.csv")
-            output_df = pd.read_csv(out_file, skipinitialspace=True)
-            times = output_df['time'].to_numpy(dtype=float)
-            output_id = (instance.target_mappings.get(output.id, output.id)
-                if instance.target_mappings is not None else output.id)
-            values = output_df[output_id].to_numpy(dtype=float)
+            (times, values) = store.get_output_series(scenario, instance, output)
             linestyle = linestyles[idx % len(linestyles)]
             ax_series.plot(times, values, linestyle=linestyle, linewidth=1, label=instance.label)
 
         # For each reference item, compute stats and plot reference points
-        diffs_rows = []
-        for r_idx, (item, series_id) in enumerate(ref_items):
-            reference_df = pd.read_csv(item.file_path, skipinitialspace=True)
-
-            # Align times using same approach as existing plotting
-            time_unit_multiplier = get_time_unit_alignment_factor(item.time_unit, scenario.time_unit)
-            ref_times = reference_df['time'].apply(lambda v: v / time_unit_multiplier).to_numpy(dtype=float)
-
-            # Get reference series values
-            ref_values = reference_df[series_id].to_numpy(dtype=float)
+        diffs_frames = []
+        for r_idx, (item, _) in enumerate(ref_items):
+            # Get reference series with times aligned to scenario time unit
+            (ref_times, ref_values) = store.get_reference_series(scenario, item, output.id)
 
             # Plot reference points
             if item.series_type == SeriesType.CHECKPOINTS:
@@ -471,15 +1798,10 @@ def plot_scenario_differences(
 
             # Compute per-instance statistics at reference points
             for idx, instance in enumerate(instances):
-                out_file = os.path.join(out_path, f"{scenario.id}_{instance.id}.csv")
-                output_df = pd.read_csv(out_file, skipinitialspace=True)
-                model_times = output_df['time'].to_numpy(dtype=float)
-                model_values = output_df[instance.target_mappings.get(output.id, output.id) if instance.target_mappings is not None else output.id].to_numpy(dtype=float)
-
-                # interpolate model to reference times
-                interp_vals = np.interp(ref_times, model_times, model_values)
-
-                residuals = interp_vals - ref_values
+                # Differences of model (interpolated to reference times)
+                # and reference values
+                differences = get_differences(scenario, output, item, instance, store)
+                residuals = differences['residual'].to_numpy()
 
                 # Add residual points to residual subplot
                 if item.series_type == SeriesType.CHECKPOINTS:
@@ -505,23 +1827,7 @@ def plot_scenario_differences(
                     )
 
                 # Append detailed diffs for CSV
-                for t, mval, rval, res in zip(ref_times, interp_vals, ref_values, residuals):
-                    abs_diff = abs(res)
-                    rel_diff = (res / rval) if rval != 0 else float('nan')
-                    diffs_rows.append({
-                        'scenario': scenario.id,
-                        'output': output.id,
-                        'reference_label': item.label,
-                        'reference_series': series_id,
-                        'time': t,
-                        'instance': instance.id,
-                        'instance_label': instance.label,
-                        'model_value': mval,
-                        'ref_value': rval,
-                        'residual': res,
-                        'abs_diff': abs_diff,
-                        'rel_diff': rel_diff
-                    })
+                diffs_frames.append(differences.drop(columns='reference'))
 
         # Layout and labels
         ax_series.set_xlabel(f'Time ({str(scenario.time_unit)})')
@@ -541,11 +1847,39 @@ def plot_scenario_differences(
         plt.close()
 
         # Write detailed diffs and summary CSVs
-        if diffs_rows:
-            diffs_df = pd.DataFrame(diffs_rows)
+        if diffs_frames:
+            diffs_df = pd.concat(diffs_frames, ignore_index=True)
             diffs_csv = os.path.join(out_path, f"{scenario.id}_{output.id}_diffs.csv")
             diffs_df.to_csv(diffs_csv, index=False)
 
+def get_event_integration_times(
+    events: List[DosingEvent],
+    time_unit_multiplier: float,
+    end_time: float,
+    time_step: float
+) -> np.ndarray:
+    """Get the time points to integrate through for the triggers of dosing
+    events (added as model events) to fire as on the uniform evaluation grid.
+
+    The triggers of (repeated) dosing events are only met at the time
+    points reported by the integrator. Returns the dose times, the end
+    times of continuous doses and, for repeated dosing events, the
+    multiples of the dosing interval, each followed by the next time point
+    of the evaluation grid with step `time_step` (all in model time unit),
+    up to `end_time`.
+    """
+    times = []
+    for event in events:
+        dose_times = get_dose_times(event, time_unit_multiplier, end_time)
+        times.extend(dose_times)
+        if event.duration is not None and event.type.endswith("continuous"):
+            times.extend(t + time_unit_multiplier * event.duration for t in dose_times)
+        if event.interval and event.type.startswith("repeated"):
+            times.extend(np.arange(0, end_time, time_unit_multiplier * event.interval))
+    times = np.asarray(times, dtype=float)
+    times = np.union1d(times, times + time_step)
+    return times[(times >= 0) & (times <= end_time)]
+
 def create_rr_events(
     events: List[DosingEvent],
     time_unit_multiplier: float,
@@ -741,3 +2075,47 @@ def repeated_continuous(
             assignment = "0"
         )
     ]
+
+def create_dose_timeline(
+    events: List[DosingEvent],
+    time_unit_multiplier: float,
+    amount_unit_multiplier: float,
+    target_mappings: Dict[str, str] | None,
+    end_time: float
+) -> List[DoseAction]:
+    """Expand a list of dosing events into a sorted timeline of dose actions.
+
+    Repeated doses are applied at `time + k * interval` for as long as the
+    dose time is before `until` (or not after `end_time` when `until` is not
+    specified). Continuous doses are represented by a dose action at the
+    start of the dosing period and a reset action at its end. Actions at the
+    same time are ordered such that resets precede doses.
+    """
+    timeline: List[DoseAction] = []
+    for event in events:
+        target = (target_mappings[event.target]
+            if target_mappings is not None and event.target in target_mappings.keys()
+            else event.target)
+        adjustment = None
+        if event.adjustment is not None:
+            if target_mappings is not None and event.adjustment in target_mappings.keys():
+                adjustment = target_mappings[event.adjustment]
+            else:
+                adjustment = event.adjustment
+        amount = amount_unit_multiplier * event.amount
+
+        dose_times = get_dose_times(event, time_unit_multiplier, end_time)
+
+        if event.type in ("single_continuous", "repeated_continuous"):
+            if event.duration is None:
+                raise ValueError(f"duration is required for {event.type} dosing event")
+            duration = time_unit_multiplier * event.duration
+            for dose_time in dose_times:
+                timeline.append(DoseAction(dose_time, target, amount, adjustment))
+                timeline.append(DoseAction(dose_time + duration, target, 0., None, True))
+        else:
+            for dose_time in dose_times:
+                timeline.append(DoseAction(dose_time, target, amount, adjustment))
+
+    timeline.sort(key=lambda action: (action.time, not action.reset))
+    return timeline
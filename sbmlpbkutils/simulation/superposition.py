@@ -0,0 +1,317 @@
+"""Simulation of linear PBK models by superposition of impulse responses.
+
+For PBK models that are linear in the state amounts (e.g., models with
+only first-order transfer and elimination), the response to a dosing
+schedule is the trajectory without dosing (baseline) plus the sum of the
+responses to the individual doses, each of which is a shifted and scaled
+copy of the response to a unit dose on the dosing target. This module
+simulates these impulse responses once per dosing target (and dosing
+period duration of continuous doses) and computes the results of any
+dosing schedule by FFT or direct convolution of the dose series with the
+impulse responses, such that many dosing schedules cost a single ODE
+solve per dosing target.
+"""
+
+import dataclasses
+from logging import Logger
+from typing import Dict, List, Tuple
+import numpy as np
+from scipy.signal import fftconvolve
+
+from .definitions import (
+    ConvolutionMethod,
+    DoseAction,
+    DosingEvent,
+    DosingMode,
+    ModelInstance,
+    Scenario
+)
+from .dosing import CONTINUOUS_DOSING_TYPES, get_dose_times
+from .model_cache import ModelCache, get_default_model_cache
+from .simulation import (
+    BatchSimulationResult,
+    SimulationResult,
+    align_results,
+    create_scenario_model,
+    simulate_dose_timeline,
+    simulate_scenario,
+    simulate_scenarios
+)
+
+_GRID_TOLERANCE = 1e-9
+
+def convolve_doses(
+    times: np.ndarray,
+    response: np.ndarray,
+    dose_times: np.ndarray,
+    amounts: np.ndarray,
+    method: ConvolutionMethod = ConvolutionMethod.AUTO
+) -> np.ndarray:
+    """Compute the superposition of the responses to doses.
+
+    The `response` (time points x outputs) is the response to a unit dose
+    at time zero at the uniform time points `times` (starting at zero).
+    Returns the sum of the responses to the doses with the specified
+    `amounts` at `dose_times`, at the same time points. FFT convolution
+    requires the dose times to be on the time points. Direct convolution
+    linearly interpolates the response for dose times in between the time
+    points.
+    """
+    times = np.asarray(times, dtype=float)
+    dose_times = np.asarray(dose_times, dtype=float)
+    amounts = np.asarray(amounts, dtype=float)
+    step = times[1] - times[0] if len(times) > 1 else 1.
+    positions = dose_times / step
+    indices = np.round(positions).astype(int)
+    on_grid = bool(np.all(np.abs(positions - indices) <= _GRID_TOLERANCE)
+        and np.all((indices >= 0) & (indices < len(times))))
+    if method == ConvolutionMethod.FFT and not on_grid:
+        raise ValueError("FFT convolution requires the dose times to be on the output time points.")
+    if method == ConvolutionMethod.FFT or (method == ConvolutionMethod.AUTO and on_grid):
+        series = np.bincount(indices, weights=amounts, minlength=len(times))
+        return fftconvolve(series[:, np.newaxis], response, axes=0)[:len(times)]
+    result = np.zeros_like(response, dtype=float)
+    for (dose_time, amount) in zip(dose_times, amounts):
+        first = int(np.searchsorted(times, dose_time - _GRID_TOLERANCE * step, side='left'))
+        shifted = np.maximum(times[first:] - dose_time, 0.)
+        result[first:] += amount * _interpolate(times, response, shifted)
+    return result
+
+class LinearResponseModel:
+    """Model instance that computes the results of dosing schedules for a
+    base scenario by superposition of impulse responses.
+
+    The model instance is set up for the base scenario (parameters,
+    initial states, units, outputs and output times), of which the dosing
+    events are ignored, and the baseline trajectory without dosing is
+    simulated on the uniform grid of the evaluation resolution of the
+    scenario. The responses to unit doses are simulated on first use per
+    dosing target (and dosing period duration of continuous doses) and are
+    kept for all subsequent dosing schedules. Doses are applied as in the
+    `SEGMENTED` dosing mode, where the end of a continuous dosing period
+    empties the target, so no other doses should be applied to the target
+    within a continuous dosing period. Dose adjustments use the baseline
+    trajectory of the adjustment variable.
+    """
+
+    def __init__(
+        self,
+        instance: ModelInstance,
+        scenario: Scenario,
+        logger: Logger | None = None,
+        model_cache: ModelCache | None = None
+    ):
+        if scenario.chunks is not None:
+            raise ValueError("Superposition is not supported for chunked scenarios.")
+        if model_cache is None:
+            model_cache = get_default_model_cache()
+        self.instance = instance
+        self.scenario = dataclasses.replace(scenario, dosing_events=None, steady_state=None)
+        self._model_cache = model_cache
+        scenario_model = create_scenario_model(
+            instance,
+            self.scenario,
+            logger,
+            model_cache,
+            DosingMode.SEGMENTED
+        )
+        self._rr_model = scenario_model.rr_model
+        self._state = self._rr_model.saveStateS()
+        self._selections = scenario_model.selections
+        self._time_unit_multiplier = scenario_model.time_unit_multiplier
+        self._amount_unit_multiplier = scenario_model.amount_unit_multiplier
+        self._output_times = scenario_model.output_times
+        self.duration = scenario_model.duration
+        n_steps = int(scenario.evaluation_resolution * self.duration / self._time_unit_multiplier) + 1
+        self.times = np.linspace(0, self.duration, n_steps)
+        self._baseline = self._simulate([], self._selections)[:, 1:]
+        self._adjustments: Dict[str, np.ndarray] = {}
+        self._responses: Dict[Tuple[str, float | None], np.ndarray] = {}
+
+    def simulate(
+        self,
+        dosing_events: List[DosingEvent] | None,
+        method: ConvolutionMethod = ConvolutionMethod.AUTO
+    ) -> SimulationResult:
+        """Compute the results of the base scenario with the specified
+        dosing events (aligned to the scenario units, at the output time
+        points of the scenario)."""
+        values = self._baseline.copy()
+        for ((target, period), (dose_times, amounts)) in self._get_doses(dosing_events or []).items():
+            values += convolve_doses(
+                self.times,
+                self.get_response(target, period),
+                dose_times,
+                amounts,
+                method
+            )
+        times = self.times
+        if self._output_times is not None:
+            values = np.column_stack([
+                np.interp(self._output_times, self.times, values[:, j])
+                for j in range(values.shape[1])
+            ])
+            times = self._output_times
+        return SimulationResult(
+            values = align_results(
+                np.column_stack((times, values)),
+                self._time_unit_multiplier,
+                self._amount_unit_multiplier
+            ),
+            columns = self._selections,
+            output_ids = [output.id for output in self.scenario.outputs]
+        )
+
+    def get_response(self, target: str, period: float | None = None) -> np.ndarray:
+        """Get the response of the outputs (in model units, at the uniform
+        grid time points) to a unit dose on the target at time zero, which
+        is removed from the target after `period` (in model time unit) for
+        continuous doses."""
+        key = (target, period)
+        if key not in self._responses:
+            timeline = [DoseAction(0., target, 1.)]
+            if period is not None:
+                timeline.append(DoseAction(period, target, 0., None, True))
+            self._responses[key] = self._simulate(timeline, self._selections)[:, 1:] - self._baseline
+        return self._responses[key]
+
+    def is_linear(
+        self,
+        dosing_events: List[DosingEvent],
+        relative_tolerance: float = 1e-4
+    ) -> bool:
+        """Check numerically whether superposition applies to the dosing
+        events, by comparing the superposition results with full
+        simulations of the dosing events and of the doubled doses. The
+        errors of the outputs should be within `relative_tolerance` of the
+        maximum absolute output values."""
+        for factor in (1., 2.):
+            events = [dataclasses.replace(event, amount=factor * event.amount) for event in dosing_events]
+            expected = simulate_scenario(
+                self.instance,
+                dataclasses.replace(self.scenario, dosing_events=events),
+                None,
+                self._model_cache,
+                DosingMode.SEGMENTED
+            ).outputs
+            errors = np.abs(self.simulate(events).outputs - expected)
+            scale = np.max(np.abs(expected), axis=0)
+            if not np.all(errors <= relative_tolerance * scale + np.finfo(float).tiny):
+                return False
+        return True
+
+    def _simulate(self, timeline: List[DoseAction], selections: List[str]) -> np.ndarray:
+        """Simulate the model from its initial state with doses applied from
+        the dose timeline, at the uniform grid time points."""
+        self._rr_model.loadStateS(self._state)
+        return simulate_dose_timeline(
+            self._rr_model,
+            timeline,
+            self.duration,
+            len(self.times),
+            selections,
+            output_times = self.times
+        )
+
+    def _get_adjustment(self, variable: str) -> np.ndarray:
+        if variable not in self._adjustments:
+            self._adjustments[variable] = self._simulate([], ['time', variable])[:, 1]
+        return self._adjustments[variable]
+
+    def _get_doses(
+        self,
+        dosing_events: List[DosingEvent]
+    ) -> Dict[Tuple[str, float | None], Tuple[np.ndarray, np.ndarray]]:
+        """Get the dose times and amounts (in model units) per dosing target
+        and dosing period duration."""
+        mappings = self.instance.target_mappings or {}
+        doses: Dict[Tuple[str, float | None], Tuple[np.ndarray, np.ndarray]] = {}
+        periods: Dict[str, List[Tuple[float, float | None]]] = {}
+        for event in dosing_events:
+            target = mappings.get(event.target, event.target)
+            period = None
+            if event.type in CONTINUOUS_DOSING_TYPES:
+                if event.duration is None:
+                    raise ValueError(f"duration is required for {event.type} dosing event")
+                period = self._time_unit_multiplier * event.duration
+            dose_times = np.maximum(get_dose_times(event, self._time_unit_multiplier, self.duration), 0.)
+            dose_times = dose_times[dose_times <= self.duration]
+            amounts = np.full(len(dose_times), self._amount_unit_multiplier * event.amount)
+            if event.adjustment is not None:
+                adjustment = mappings.get(event.adjustment, event.adjustment)
+                amounts *= np.interp(dose_times, self.times, self._get_adjustment(adjustment))
+            (times, values) = doses.get((target, period), (np.empty(0), np.empty(0)))
+            doses[(target, period)] = (np.concatenate((times, dose_times)), np.concatenate((values, amounts)))
+            periods.setdefault(target, []).extend((t, period) for t in dose_times)
+
+        # Continuous dosing periods empty the target, including other doses
+        for (target, items) in periods.items():
+            starts = np.sort([t for (t, _) in items])
+            for (start, period) in items:
+                if period is not None and (np.searchsorted(starts, start + period, side='left')
+                        - np.searchsorted(starts, start, side='left')) > 1:
+                    raise ValueError(f"Doses on target {target} overlap continuous dosing periods: superposition does not apply.")
+        return doses
+
+def simulate_scenarios_linear(
+    instance: ModelInstance,
+    scenarios: List[Scenario],
+    logger: Logger,
+    model_cache: ModelCache | None = None,
+    method: ConvolutionMethod = ConvolutionMethod.AUTO,
+    relative_tolerance: float = 1e-4
+) -> BatchSimulationResult:
+    """Simulate multiple scenarios that only differ in their dosing events
+    for a linear model instance by superposition of impulse responses.
+
+    The impulse responses are simulated once per dosing target (see
+    `LinearResponseModel`). When the linearity of the model instance is not
+    declared (`linear` is None), it is checked on the dosing events of the
+    first scenario (see `LinearResponseModel.is_linear`). For model
+    instances that are not linear, the scenarios are simulated by
+    `simulate_scenarios` instead.
+    """
+    if not scenarios:
+        raise ValueError("At least one scenario is required.")
+    base = _get_base_scenario(scenarios[0])
+    for scenario in scenarios:
+        if _get_base_scenario(scenario) != base:
+            raise ValueError(f"Scenario {scenario.id} differs from scenario {scenarios[0].id} in more than its dosing events.")
+
+    model = None
+    if instance.linear is not False:
+        model = LinearResponseModel(instance, scenarios[0], logger, model_cache)
+        if instance.linear is None and not model.is_linear(scenarios[0].dosing_events or [], relative_tolerance):
+            model = None
+    if model is None:
+        logger.info("Model instance %s is not linear: simulating scenarios by integration", instance.id)
+        return simulate_scenarios(instance, scenarios, logger, dosing_mode=DosingMode.SEGMENTED)
+
+    logger.info("Computing %s scenarios for instance %s by superposition", len(scenarios), instance.id)
+    values = None
+    times = None
+    for (i, scenario) in enumerate(scenarios):
+        result = model.simulate(scenario.dosing_events, method)
+        if values is None:
+            times = result.times.copy()
+            values = np.empty((len(scenarios),) + result.outputs.shape)
+        values[i] = result.outputs
+    return BatchSimulationResult(
+        scenario_ids = [scenario.id for scenario in scenarios],
+        output_ids = [output.id for output in scenarios[0].outputs],
+        times = times,
+        values = values
+    )
+
+def _get_base_scenario(scenario: Scenario) -> Scenario:
+    """Get the scenario without id, label, dosing events and reference data."""
+    return dataclasses.replace(scenario, id="", label="", dosing_events=None, reference_data=None)
+
+def _interpolate(times: np.ndarray, values: np.ndarray, at: np.ndarray) -> np.ndarray:
+    """Linearly interpolate the rows of `values` (at `times`) at the time
+    points `at`."""
+    if len(times) < 2:
+        return np.repeat(values[:1], len(at), axis=0)
+    index = np.clip(np.searchsorted(times, at, side='right') - 1, 0, len(times) - 2)
+    weights = ((at - times[index]) / (times[index + 1] - times[index]))[:, np.newaxis]
+    return values[index] * (1 - weights) + values[index + 1] * weights
@@ -0,0 +1,125 @@
+"""Expansion of scenario sweeps.
+
+This module provides methods to expand scenario sweeps (e.g., the
+cartesian product of dose amounts, dosing intervals and dosing targets)
+into scenarios. Sweep members are identified by their (flat) index in the
+cartesian product and are created on demand, such that the members of
+large sweeps are never held in memory at once.
+"""
+
+import copy
+from enum import Enum
+from typing import Any, Dict, Iterator
+import numpy as np
+import pandas as pd
+
+from .definitions import (
+    Scenario,
+    ScenarioSweep
+)
+
+def get_sweep_size(sweep: ScenarioSweep) -> int:
+    """Get the number of members of a sweep."""
+    return int(np.prod([len(values) for values in sweep.matrix.values()], dtype=int))
+
+def get_sweep_values(sweep: ScenarioSweep, index: int) -> Dict[str, Any]:
+    """Get the field values of a member of a sweep."""
+    if not 0 <= index < get_sweep_size(sweep):
+        raise ValueError(f"Member {index} not found in sweep {sweep.id}.")
+    shape = [len(values) for values in sweep.matrix.values()]
+    positions = np.unravel_index(index, shape) if shape else ()
+    return {
+        path: values[int(position)]
+        for ((path, values), position) in zip(sweep.matrix.items(), positions)
+    }
+
+def get_sweep_scenario(sweep: ScenarioSweep, index: int) -> Scenario:
+    """Create the scenario of a member of a sweep.
+
+    The member is a copy of the base scenario with id `{sweep.id}_{index}`,
+    in which the swept fields are set to the values of the member.
+    """
+    scenario = copy.deepcopy(sweep.scenario)
+    scenario.id = f"{sweep.id}_{index}"
+    scenario.label = f"{sweep.label} ({index})"
+    for path, value in get_sweep_values(sweep, index).items():
+        try:
+            set_field(scenario, path, value)
+        except ValueError as e:
+            raise ValueError(f"Field {path} not found in scenario {scenario.id}.") from e
+    return scenario
+
+def expand_sweep(sweep: ScenarioSweep) -> Iterator[Scenario]:
+    """Lazily expand a sweep into the scenarios of its members."""
+    for index in range(get_sweep_size(sweep)):
+        yield get_sweep_scenario(sweep, index)
+
+def get_sweep_members(sweep: ScenarioSweep) -> pd.DataFrame:
+    """Get a table of the members of a sweep, with the index, scenario id
+    and the values of the swept fields of each member (enumeration values
+    by name)."""
+    size = get_sweep_size(sweep)
+    records = [
+        {
+            "index": index,
+            "scenario": f"{sweep.id}_{index}",
+            **{
+                path: value.name if isinstance(value, Enum) else value
+                for path, value in get_sweep_values(sweep, index).items()
+            }
+        }
+        for index in range(size)
+    ]
+    return pd.DataFrame(records, columns=["index", "scenario"] + list(sweep.matrix.keys()))
+
+def get_field(target: Any, path: str) -> Any:
+    """Get a field of an object (e.g., a scenario) specified by a dotted
+    path of attributes, list indices and dictionary keys."""
+    for part in path.split("."):
+        if isinstance(target, list):
+            if not part.isdigit() or int(part) >= len(target):
+                raise ValueError(f"Field {path} not found.")
+            target = target[int(part)]
+        elif isinstance(target, dict):
+            if part not in target:
+                raise ValueError(f"Field {path} not found.")
+            target = target[part]
+        elif hasattr(target, part):
+            target = getattr(target, part)
+        else:
+            raise ValueError(f"Field {path} not found.")
+    return target
+
+def set_field(target: Any, path: str, value: Any):
+    """Set a field of an object (e.g., a scenario, or a scenario of a YAML
+    configuration) specified by a dotted path of attributes, list indices
+    and dictionary keys. Missing dictionaries (e.g., scenario parameters)
+    are created."""
+    parts = path.split(".")
+    for (i, part) in enumerate(parts):
+        is_last = i == len(parts) - 1
+        if isinstance(target, list):
+            if not part.isdigit() or int(part) >= len(target):
+                raise ValueError(f"Field {path} not found.")
+            if is_last:
+                target[int(part)] = value
+            else:
+                target = target[int(part)]
+        elif isinstance(target, dict):
+            if is_last:
+                target[part] = value
+            else:
+                if target.get(part) is None:
+                    # Create missing dictionaries (e.g., scenario parameters)
+                    target[part] = {}
+                target = target[part]
+        elif hasattr(target, part):
+            if is_last:
+                setattr(target, part, value)
+            else:
+                if getattr(target, part) is None:
+                    # Create missing dictionaries (e.g., scenario parameters)
+                    setattr(target, part, {})
+                target = getattr(target, part)
+        else:
+            raise ValueError(f"Field {path} not found.")
@@ -0,0 +1,64 @@
+"""Micro-benchmark of the alignment of simulation results to scenario units.
+
+Compares the element-wise alignment of results in a DataFrame with the
+whole-array alignment of `align_results` on the results of the lifetime
+scenario of the `simple_lifetime` model. Run from the repository root with:
+
+    python -m tests.benchmarks.result_alignment_benchmark
+"""
+
+import os
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from tests.conf import TEST_SCENARIOS_PATH
+from sbmlpbkutils import load_config, load_parametrisation
+from sbmlpbkutils.simulation.model_cache import ModelCache
+from sbmlpbkutils.simulation.simulation import align_results
+
+def _align_elementwise(results, selections, time_unit_multiplier, amount_unit_multiplier):
+    df = pd.DataFrame(results, columns=selections)
+    df['time'] = df['time'].apply(lambda v: v / time_unit_multiplier)
+    for output in selections[1:]:
+        df[output] = df[output].apply(lambda v: v / amount_unit_multiplier)
+    return df
+
+def _align_vectorised(results, selections, time_unit_multiplier, amount_unit_multiplier):
+    values = align_results(results, time_unit_multiplier, amount_unit_multiplier)
+    return pd.DataFrame(values, columns=selections, copy=False)
+
+def run_benchmark(repeats: int = 5):
+    config = load_config(os.path.join(TEST_SCENARIOS_PATH, 'lifetime.yaml'))
+    instance = config.model_instances[0]
+    scenario = config.scenarios[0]
+
+    # Simulate the scenario (without dosing) at hourly resolution
+    rr_model = ModelCache().get_rr_model(instance.model_path)
+    load_parametrisation(rr_model, instance.param_file)
+    selections = ['time'] + [output.output for output in scenario.outputs]
+    duration = scenario.duration * 24
+    results = np.asarray(rr_model.simulate(0, duration, duration + 1, selections))
+    (time_unit_multiplier, amount_unit_multiplier) = (24., 1000.)
+
+    # Check equivalence
+    expected = _align_elementwise(results.copy(), selections, time_unit_multiplier, amount_unit_multiplier)
+    actual = _align_vectorised(results.copy(), selections, time_unit_multiplier, amount_unit_multiplier)
+    pd.testing.assert_frame_equal(expected, actual)
+
+    # Time both approaches (including the copy of the input buffer)
+    timings = {}
+    for name, fn in [('element-wise', _align_elementwise), ('vectorised', _align_vectorised)]:
+        timings[name] = min(timeit.repeat(
+            lambda fn=fn: fn(results.copy(), selections, time_unit_multiplier, amount_unit_multiplier),
+            number=1,
+            repeat=repeats
+        ))
+    print(f"Results: {results.shape[0]} rows x {results.shape[1]} columns")
+    for name, seconds in timings.items():
+        print(f"- {name}: {1000 * seconds:.2f} ms")
+    print(f"Speedup: {timings['element-wise'] / timings['vectorised']:.1f}x")
+
+if __name__ == '__main__':
+    run_benchmark()
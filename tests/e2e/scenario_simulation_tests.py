@@ -1,10 +1,13 @@
 import unittest
 import os
+import pandas as pd
 from parameterized import parameterized
 
 from tests.helpers import create_console_logger
 from tests.conf import TEST_OUTPUT_PATH, TEST_SCENARIOS_PATH
-from sbmlpbkutils import run_config, load_config, plot_simulation_results
+from sbmlpbkutils import run_config, run_population_config, load_config, plot_simulation_results
+from sbmlpbkutils.simulation.goodness_of_fit import evaluate_goodness_of_fit
+from sbmlpbkutils.simulation.definitions import ResultsFileOptions, ResultsFormat
 
 class ScenarioSimulationTests(unittest.TestCase):
 
@@ -53,3 +56,66 @@ class ScenarioSimulationTests(unittest.TestCase):
             combine_outputs = True,
             ncols_combined = 2
         )
+
+    def test_simulation_parallel(self):
+        # Load config
+        config = load_config(os.path.join(TEST_SCENARIOS_PATH, "oral.yaml"))
+
+        # Run simulations sequentially and in parallel
+        logger = create_console_logger()
+        out_path_sequential = os.path.join(self.out_path, config.id, 'sequential')
+        out_path_parallel = os.path.join(self.out_path, config.id, 'parallel')
+        run_config(config, out_path_sequential, True, logger)
+        run_config(config, out_path_parallel, True, logger, n_workers=2)
+
+        # Check that results are identical
+        for scenario in config.scenarios:
+            for instance in config.model_instances:
+                filename = f"{scenario.id}_{instance.id}.csv"
+                pd.testing.assert_frame_equal(
+                    pd.read_csv(os.path.join(out_path_sequential, filename)),
+                    pd.read_csv(os.path.join(out_path_parallel, filename))
+                )
+
+    def test_simulation_parquet(self):
+        # Load config
+        config = load_config(os.path.join(TEST_SCENARIOS_PATH, "oral.yaml"))
+
+        # Run simulations writing parquet results files
+        logger = create_console_logger()
+        out_path = os.path.join(self.out_path, config.id, 'parquet')
+        run_config(
+            config = config,
+            out_path = out_path,
+            force_recompute = True,
+            logger = logger,
+            results_options = ResultsFileOptions(ResultsFormat.PARQUET, True, 'zstd')
+        )
+        for scenario in config.scenarios:
+            for instance in config.model_instances:
+                filename = f"{scenario.id}_{instance.id}.parquet"
+                self.assertTrue(os.path.exists(os.path.join(out_path, filename)))
+
+        # Plot results
+        plot_simulation_results(
+            config = config,
+            out_path = out_path
+        )
+
+        # Compute goodness-of-fit against reference data
+        df = evaluate_goodness_of_fit(config, out_path)
+        self.assertEqual(len(df), 2 * len(config.model_instances))
+        self.assertTrue((df['n'] > 0).all())
+
+    def test_simulation_population(self):
+        # Load config
+        config = load_config(os.path.join(TEST_SCENARIOS_PATH, "population.yaml"))
+        self.assertEqual(config.model_instances[0].population.size, 32)
+
+        # Run population simulations in parallel
+        logger = create_console_logger()
+        out_path = os.path.join(self.out_path, config.id)
+        run_population_config(config, out_path, logger, n_workers=2)
+        df = pd.read_csv(os.path.join(out_path, "oral_repeated_simple_population_percentiles.csv"))
+        self.assertEqual(len(df), 4 * 24 + 1)
+        self.assertTrue((df["ABlood_p2.5"] <= df["ABlood_p97.5"]).all())
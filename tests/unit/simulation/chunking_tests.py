@@ -0,0 +1,197 @@
+import logging
+import os
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from parameterized import parameterized
+from roadrunner import RoadRunner
+
+from tests.conf import TEST_MODELS_PATH, TEST_OUTPUT_PATH
+from tests.unit.simulation.helpers import create_scenario
+from sbmlpbkutils.simulation.chunking import (
+    ChunkCheckpoint,
+    get_chunk_times,
+    get_table_parameters
+)
+from sbmlpbkutils.simulation.definitions import (
+    ChunkSettings,
+    DosingEvent,
+    DosingMode,
+    ModelInstance,
+    ParameterTable,
+    ResultsFileOptions,
+    ResultsFormat
+)
+from sbmlpbkutils.simulation.simulation import (
+    create_scenario_model,
+    get_integration_windows,
+    run_scenario,
+    simulate_scenario,
+    simulate_scenario_chunks
+)
+from sbmlpbkutils.simulation.results_io import read_results
+
+class ChunkingTests(unittest.TestCase):
+
+    def setUp(self):
+        self.out_path = os.path.join(TEST_OUTPUT_PATH, 'chunking')
+        os.makedirs(self.out_path, exist_ok=True)
+        self.logger = logging.getLogger('chunking_tests')
+        self.instance = ModelInstance(
+            id = 'lifetime',
+            label = 'lifetime',
+            model_path = os.path.join(TEST_MODELS_PATH, 'simple_lifetime/simple_lifetime.annotated.sbml'),
+            param_file = os.path.join(TEST_MODELS_PATH, 'simple_lifetime/simple_lifetime.params.csv')
+        )
+        self.scenario = create_scenario(
+            'test',
+            ['BW', 'ABlood', 'ALiver', 'AUrine'],
+            [DosingEvent('repeated_bolus', 'AGut', 1, 0, interval=1, adjustment='BW')],
+            duration = 20
+        )
+
+    def test_get_chunk_times(self):
+        grid = np.linspace(0, 10, 21)
+        self.assertListEqual(list(get_chunk_times(grid, 3)), [0, 3, 6, 9, 10])
+        self.assertListEqual(list(get_chunk_times(grid, 3.2)), [0, 3.5, 6.5, 10])
+        self.assertListEqual(list(get_chunk_times(grid, 20)), [0, 10])
+        self.assertListEqual(list(get_chunk_times(grid)), [0, 10])
+        with self.assertRaises(ValueError):
+            get_chunk_times(grid, 0)
+
+    @parameterized.expand([
+        (DosingMode.EVENTS, ResultsFormat.CSV),
+        (DosingMode.SEGMENTED, ResultsFormat.PARQUET),
+        (DosingMode.PARAMETERISED, ResultsFormat.ARROW)
+    ])
+    def test_run_scenario_streamed(self, dosing_mode, results_format):
+        expected = simulate_scenario(self.instance, self.scenario, dosing_mode=dosing_mode).to_dataframe()
+        options = ResultsFileOptions(results_format, stream_window=50)
+        out_file = os.path.join(self.out_path, f'streamed_{dosing_mode.value}.dat')
+        run_scenario(self.instance, self.scenario, out_file, True, self.logger, dosing_mode=dosing_mode, results_options=options)
+        df = read_results(out_file)
+        self.assertListEqual(list(df.columns), list(expected.columns))
+        scale = np.max(np.abs(expected.to_numpy()), axis=0)
+        self.assertTrue(np.all(np.abs(df.to_numpy() - expected.to_numpy()) <= 1e-5 * scale))
+
+    @parameterized.expand([
+        (DosingMode.EVENTS, 50),
+        (DosingMode.SEGMENTED, 50),
+        (DosingMode.PARAMETERISED, 50),
+        (DosingMode.SEGMENTED, 4)
+    ])
+    def test_run_scenario_streamed_windows(self, dosing_mode, stream_window):
+        expected = simulate_scenario(self.instance, self.scenario, dosing_mode=dosing_mode).values.copy()
+        options = ResultsFileOptions(ResultsFormat.CSV, stream_window=stream_window)
+        out_file = os.path.join(self.out_path, f'windows_{dosing_mode.value}_{stream_window}.csv')
+        simulate = RoadRunner.simulate
+        with mock.patch.object(RoadRunner, 'simulate', autospec=True, side_effect=simulate) as spy:
+            run_scenario(self.instance, self.scenario, out_file, True, self.logger, dosing_mode=dosing_mode, results_options=options)
+
+        # Each simulate call integrates a window of at most stream_window
+        # output time points (plus the window start and end times)
+        scenario_model = create_scenario_model(self.instance, self.scenario, None, None, dosing_mode)
+        step = scenario_model.time_unit_multiplier / self.scenario.evaluation_resolution
+        self.assertGreaterEqual(spy.call_count, np.ceil((len(expected) - 1) / stream_window))
+        for call in spy.call_args_list:
+            times = call.kwargs['times']
+            self.assertLessEqual(len(times), stream_window + 2)
+            self.assertLessEqual(times[-1] - times[0], stream_window * step + 1e-9)
+        results = pd.read_csv(out_file).to_numpy()
+        self.assertEqual(results.shape, expected.shape)
+        scale = np.max(np.abs(expected), axis=0)
+        self.assertTrue(np.all(np.abs(results - expected) <= 1e-5 * scale))
+
+    def test_get_integration_windows(self):
+        grid = np.linspace(0, 1, 11)
+        windows = get_integration_windows(grid, 0, 1, 4)
+        self.assertListEqual([(start, end) for (start, end, _) in windows], [(0, 0.4), (0.4, 0.8), (0.8, 1)])
+        np.testing.assert_array_equal(np.concatenate([w for (_, _, w) in windows]), grid)
+        windows = get_integration_windows(grid[:-1], 0, 1)
+        self.assertEqual(len(windows), 1)
+        windows = get_integration_windows(grid, 0, 1, 5)
+        self.assertEqual(windows[-1][:2], (1, 1))
+
+    def test_get_table_parameters(self):
+        df = pd.DataFrame({'age': [0., 10.], 'BWRef': [10., 20.]})
+        self.assertDictEqual(get_table_parameters(df, 5), {'BWRef': 15.})
+        self.assertDictEqual(get_table_parameters(df, 20), {'BWRef': 20.})
+
+    @parameterized.expand([
+        (DosingMode.EVENTS,),
+        (DosingMode.SEGMENTED,),
+        (DosingMode.PARAMETERISED,)
+    ])
+    def test_simulate_scenario_chunked(self, dosing_mode):
+        expected = simulate_scenario(self.instance, self.scenario, dosing_mode=dosing_mode).values.copy()
+        self.scenario.chunks = ChunkSettings(duration=7)
+        scenario_model = create_scenario_model(self.instance, self.scenario, None, None, dosing_mode)
+        chunks = list(simulate_scenario_chunks(scenario_model))
+        self.assertListEqual([chunk[0, 0] for chunk in chunks], [0, 7, 14])
+        results = np.concatenate(chunks)
+        self.assertEqual(results.shape, expected.shape)
+        scale = np.max(np.abs(expected), axis=0)
+        self.assertTrue(np.all(np.abs(results - expected) <= 1e-5 * scale))
+
+    def test_simulate_scenario_parameter_tables(self):
+        table_file = os.path.join(self.out_path, 'bw_table.csv')
+        pd.DataFrame({'age': [0., 10.], 'BWRef': [50., 70.]}).to_csv(table_file, index=False)
+        self.scenario.chunks = ChunkSettings(duration=5, parameter_tables=[ParameterTable(table_file)])
+        result = simulate_scenario(self.instance, self.scenario)
+        bw = result.get_output('BW')
+        times = result.times
+        # Body weight reference is updated (stepwise) at the chunk starts
+        for (start, bw_ref) in [(0, 50), (5, 60), (10, 70), (15, 70)]:
+            self.scenario.parameters = {'BWRef': bw_ref}
+            self.scenario.chunks = None
+            expected = simulate_scenario(self.instance, self.scenario).get_output('BW')
+            index = np.searchsorted(times, start)
+            self.assertAlmostEqual(bw[index], expected[index])
+
+    def test_run_scenario_streamed_parameter_tables(self):
+        table_file = os.path.join(self.out_path, 'bw_table_streamed.csv')
+        pd.DataFrame({'age': [0., 20.], 'BWRef': [50., 70.]}).to_csv(table_file, index=False)
+        self.scenario.chunks = ChunkSettings(duration=10, parameter_tables=[ParameterTable(table_file)])
+        out_file = os.path.join(self.out_path, 'tables_unstreamed.csv')
+        run_scenario(self.instance, self.scenario, out_file, True, self.logger)
+        expected = pd.read_csv(out_file)
+        # Parameter tables are applied per chunk, not per stream window
+        out_file = os.path.join(self.out_path, 'tables_streamed.csv')
+        options = ResultsFileOptions(ResultsFormat.CSV, stream_window=24)
+        run_scenario(self.instance, self.scenario, out_file, True, self.logger, results_options=options)
+        df = pd.read_csv(out_file)
+        self.assertListEqual(list(df.columns), list(expected.columns))
+        np.testing.assert_allclose(df.to_numpy(), expected.to_numpy(), rtol=1e-5, atol=1e-12)
+
+    def test_run_scenario_resumes_checkpoint(self):
+        self.scenario.chunks = ChunkSettings(duration=5)
+        expected = simulate_scenario(self.instance, self.scenario).values.copy()
+        checkpoint_dir = os.path.join(self.out_path, 'checkpoint')
+        checkpoint = ChunkCheckpoint(checkpoint_dir, 'key')
+        checkpoint.clear()
+
+        # Interrupt the run after two chunks
+        scenario_model = create_scenario_model(self.instance, self.scenario)
+        chunks = simulate_scenario_chunks(scenario_model, checkpoint)
+        first = [next(chunks), next(chunks)]
+        del chunks
+        self.assertEqual(checkpoint.load()[0], 2)
+        self.assertIsNone(ChunkCheckpoint(checkpoint_dir, 'other').load())
+
+        # Resume the run from the checkpoint
+        scenario_model = create_scenario_model(self.instance, self.scenario)
+        results = list(simulate_scenario_chunks(scenario_model, checkpoint))
+        self.assertEqual(len(results), 4)
+        np.testing.assert_array_equal(results[0], first[0])
+        np.testing.assert_allclose(np.concatenate(results), expected, rtol=1e-6, atol=1e-12)
+
+        # Checkpoint is removed after a completed run
+        out_file = os.path.join(self.out_path, 'checkpoint.csv')
+        run_scenario(self.instance, self.scenario, out_file, True, self.logger, checkpoint_dir=checkpoint_dir)
+        self.assertFalse(os.path.exists(checkpoint_dir))
+        np.testing.assert_allclose(pd.read_csv(out_file).to_numpy(), expected, rtol=1e-6, atol=1e-12)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import logging
+import os
+import unittest
+
+import numpy as np
+import pandas as pd
+from parameterized import parameterized
+
+from tests.conf import TEST_MODELS_PATH, TEST_OUTPUT_PATH
+from tests.unit.simulation.helpers import create_scenario
+from sbmlpbkutils.simulation.definitions import (
+    DosingEvent,
+    FitParameter,
+    ModelInstance,
+    ObjectiveType,
+    ReferenceData,
+    SeriesType,
+    SimulationConfig
+)
+from sbmlpbkutils.simulation.fitting import fit_parameters, get_reference_series
+from sbmlpbkutils.simulation.simulation import (
+    create_scenario_model,
+    simulate_scenario_model
+)
+from sbmlpbkutils.simulation.units import TimeUnit
+
+class FittingTests(unittest.TestCase):
+
+    def setUp(self):
+        self.out_path = os.path.join(TEST_OUTPUT_PATH, 'fitting')
+        os.makedirs(self.out_path, exist_ok=True)
+        self.logger = logging.getLogger('fitting_tests')
+        self.instance = ModelInstance(
+            id = 'simple',
+            label = 'simple',
+            model_path = os.path.join(TEST_MODELS_PATH, 'simple/simple.annotated.sbml')
+        )
+        self.true_parameters = {'Ka': 0.2, 'CLUrine': 0.5}
+        self.config = SimulationConfig(
+            id = 'fitting',
+            label = 'fitting',
+            scenarios = [
+                self._create_scenario('single', [DosingEvent('single_bolus', 'AGut', 1, 0)]),
+                self._create_scenario('repeated', [DosingEvent('repeated_bolus', 'AGut', 2, 0.5, interval=1)])
+            ],
+            model_instances = [self.instance]
+        )
+
+    def test_get_reference_series(self):
+        series = get_reference_series(self.config.scenarios)
+        self.assertListEqual([item.label for item in series], [
+            'single/ABlood/reference', 'single/AUrine/reference',
+            'repeated/ABlood/reference', 'repeated/AUrine/reference'
+        ])
+        # Reference times are in hours, scenario times in days
+        self.assertAlmostEqual(series[0].times[1], 0.25)
+
+    @parameterized.expand([
+        (ObjectiveType.LEAST_SQUARES, 1),
+        (ObjectiveType.LOG_LIKELIHOOD, 2)
+    ])
+    def test_fit_parameters(self, objective, n_workers):
+        parameters = [
+            FitParameter('Ka', 0.01, 1, log_scale=True),
+            FitParameter('CLUrine', 0.1, 2, initial=1)
+        ]
+        result = fit_parameters(
+            self.config,
+            self.instance,
+            parameters,
+            self.logger,
+            objective,
+            n_workers = n_workers
+        )
+        self.assertTrue(result.success, result.message)
+        for param, value in self.true_parameters.items():
+            self.assertAlmostEqual(result.parameters[param], value, delta=0.05 * value)
+        self.assertGreater(result.n_evaluations, 0)
+
+    def _create_scenario(self, scenario_id, dosing_events):
+        scenario = create_scenario(scenario_id, ['ABlood', 'AUrine'], dosing_events, duration=3)
+
+        # Create reference data from simulation with the true parameters and
+        # multiplicative measurement errors
+        results = simulate_scenario_model(
+            create_scenario_model(self.instance, scenario, parameters=self.true_parameters)
+        )[::6]
+        errors = np.random.default_rng(1).normal(1, 0.02, size=(len(results), 2))
+        reference = pd.DataFrame({
+            'time': results[:, 0] * 24,
+            'QBlood': results[:, 1] * errors[:, 0],
+            'QUrine': results[:, 2] * errors[:, 1]
+        })
+        file_path = os.path.join(self.out_path, f'{scenario_id}_reference.csv')
+        reference.to_csv(file_path, index=False)
+        scenario.reference_data = [
+            ReferenceData(
+                id = 'reference',
+                label = 'reference',
+                file_path = file_path,
+                series_type = SeriesType.CHECKPOINTS,
+                time_unit = TimeUnit.HOUR,
+                mappings = {'ABlood': 'QBlood', 'AUrine': 'QUrine'}
+            )
+        ]
+        return scenario
@@ -0,0 +1,111 @@
+import os
+import subprocess
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from tests.conf import TEST_OUTPUT_PATH
+from sbmlpbkutils.simulation.definitions import (
+    ModelInstance,
+    Output,
+    ReferenceData,
+    Scenario,
+    SeriesType,
+    SimulationConfig
+)
+from sbmlpbkutils.simulation.goodness_of_fit import (
+    compute_goodness_of_fit,
+    evaluate_goodness_of_fit,
+    get_scenario_differences
+)
+from sbmlpbkutils.simulation.result_store import ResultStore
+from sbmlpbkutils.simulation.units import AmountUnit, TimeUnit
+
+class GoodnessOfFitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.out_path = os.path.join(TEST_OUTPUT_PATH, 'goodness_of_fit')
+        os.makedirs(self.out_path, exist_ok=True)
+        times = np.arange(5.)
+        pd.DataFrame({'time': times, 'A': times}) \
+            .to_csv(os.path.join(self.out_path, 'test_exact.csv'), index=False)
+        pd.DataFrame({'time': times, 'A': 2 * times}) \
+            .to_csv(os.path.join(self.out_path, 'test_double.csv'), index=False)
+        reference_file = os.path.join(self.out_path, 'reference.csv')
+        pd.DataFrame({'time': [0.5, 1, 2, 4], 'QA': [0.5, 1, 2, np.nan]}) \
+            .to_csv(reference_file, index=False)
+        self.config = SimulationConfig(
+            id = 'gof',
+            label = 'gof',
+            model_instances = [
+                ModelInstance(id='exact', label='exact', model_path='exact.sbml'),
+                ModelInstance(id='double', label='double', model_path='double.sbml')
+            ],
+            scenarios = [
+                Scenario(
+                    id = 'test',
+                    label = 'test',
+                    duration = 4,
+                    evaluation_resolution = 1,
+                    initial_states = None,
+                    parameters = None,
+                    dosing_events = None,
+                    outputs = [Output('A', 'A'), Output('B', 'B')],
+                    reference_data = [
+                        ReferenceData('ref', 'ref', reference_file, SeriesType.CHECKPOINTS, TimeUnit.DAY, {'A': 'QA'})
+                    ],
+                    time_unit = TimeUnit.DAY,
+                    amount_unit = AmountUnit.MICROGRAMS
+                )
+            ]
+        )
+
+    def test_get_scenario_differences(self):
+        store = ResultStore(self.out_path)
+        df = get_scenario_differences(self.config.model_instances, self.config.scenarios[0], store)
+        self.assertEqual(len(df), 2 * 4)
+        double = df[df['instance'] == 'double']
+        self.assertListEqual(double['model_value'].tolist(), [1, 2, 4, 8])
+        self.assertTrue(np.allclose(double['rel_diff'].to_numpy()[:3], 1))
+
+    def test_evaluate_goodness_of_fit(self):
+        df = evaluate_goodness_of_fit(self.config, self.out_path).set_index('instance')
+        self.assertListEqual(list(df.index), ['exact', 'double'])
+        self.assertTrue((df['n'] == 3).all())
+        self.assertAlmostEqual(df.loc['exact', 'rmse'], 0)
+        self.assertAlmostEqual(df.loc['exact', 'r2'], 1)
+        self.assertAlmostEqual(df.loc['exact', 'gmfe'], 1)
+        self.assertAlmostEqual(df.loc['double', 'rmse'], np.sqrt((0.25 + 1 + 4) / 3))
+        self.assertAlmostEqual(df.loc['double', 'mape'], 100)
+        self.assertAlmostEqual(df.loc['double', 'gmfe'], 2)
+        self.assertAlmostEqual(df.loc['double', 'fraction_2fold'], 1)
+        self.assertAlmostEqual(df.loc['double', 'r2'], 1 - 5.25 / (7 / 6))
+
+    def test_compute_goodness_of_fit_fold_errors(self):
+        differences = pd.DataFrame({
+            'scenario': 's', 'output': 'o', 'instance': 'i', 'reference': 'r', 'reference_series': 'q',
+            'model_value': [3., 0., 1.],
+            'ref_value': [1., 1., 1.]
+        })
+        differences['residual'] = differences['model_value'] - differences['ref_value']
+        df = compute_goodness_of_fit(differences)
+        self.assertAlmostEqual(df.loc[0, 'gmfe'], np.sqrt(3))
+        self.assertAlmostEqual(df.loc[0, 'fraction_2fold'], 0.5)
+
+    def test_import_without_matplotlib(self):
+        # Block matplotlib imports in a fresh interpreter
+        code = (
+            "import sys\n"
+            "sys.modules['matplotlib'] = None\n"
+            "from sbmlpbkutils.simulation.goodness_of_fit import evaluate_goodness_of_fit\n"
+            "from sbmlpbkutils import evaluate_goodness_of_fit\n"
+        )
+        process = subprocess.run(
+            [sys.executable, '-c', code],
+            capture_output = True,
+            text = True,
+            check = False
+        )
+        self.assertEqual(process.returncode, 0, process.stderr)
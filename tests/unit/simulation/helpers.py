@@ -0,0 +1,35 @@
+from typing import List
+
+from sbmlpbkutils.simulation.definitions import (
+    DosingEvent,
+    InitialState,
+    Output,
+    Scenario
+)
+from sbmlpbkutils.simulation.units import AmountUnit, TimeUnit
+
+def create_scenario(
+    scenario_id: str,
+    outputs: List[str],
+    dosing_events: List[DosingEvent] | None = None,
+    initial_states: List[InitialState] | None = None,
+    duration: float = 4,
+    **kwargs
+) -> Scenario:
+    """Create a test scenario (in days and micrograms, with 24 evaluation
+    steps per day) with an output per output id. Other scenario fields can
+    be specified as keyword arguments."""
+    return Scenario(**{
+        'id': scenario_id,
+        'label': scenario_id,
+        'duration': duration,
+        'evaluation_resolution': 24,
+        'initial_states': initial_states,
+        'parameters': None,
+        'dosing_events': dosing_events,
+        'outputs': [Output(output_id, output_id) for output_id in outputs],
+        'reference_data': None,
+        'time_unit': TimeUnit.DAY,
+        'amount_unit': AmountUnit.MICROGRAMS,
+        **kwargs
+    })
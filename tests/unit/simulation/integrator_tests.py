@@ -0,0 +1,115 @@
+import contextlib
+import io
+import logging
+import os
+import unittest
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from tests.conf import TEST_MODELS_PATH, TEST_OUTPUT_PATH, TEST_SCENARIOS_PATH
+from tests.unit.simulation.helpers import create_scenario
+from sbmlpbkutils.simulation.definitions import (
+    DosingEvent,
+    IntegratorSettings,
+    ModelInstance
+)
+from sbmlpbkutils.simulation.integrator import merge_integrator_settings
+from sbmlpbkutils.simulation.integrator_tuning import (
+    create_integrator_candidates,
+    main,
+    tune_integrator
+)
+from sbmlpbkutils.simulation.simulation import create_scenario_model
+
+class IntegratorTests(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger('integrator_tests')
+        self.instance = ModelInstance(
+            id = 'simple',
+            label = 'simple',
+            model_path = os.path.join(TEST_MODELS_PATH, 'simple/simple.annotated.sbml'),
+            integrator = IntegratorSettings(relative_tolerance=1e-5, maximum_num_steps=5000)
+        )
+
+    def test_merge_integrator_settings(self):
+        self.assertIsNone(merge_integrator_settings(None, None))
+        merged = merge_integrator_settings(
+            self.instance.integrator,
+            None,
+            IntegratorSettings(relative_tolerance=1e-7, stiff=False)
+        )
+        self.assertEqual(merged, IntegratorSettings(
+            relative_tolerance = 1e-7,
+            stiff = False,
+            maximum_num_steps = 5000
+        ))
+        self.assertEqual(self.instance.integrator.relative_tolerance, 1e-5)
+
+    def test_create_scenario_model_integrator_settings(self):
+        scenario = create_scenario(
+            'integrator',
+            ['ABlood', 'AUrine'],
+            [DosingEvent('repeated_bolus', 'AGut', 1, 0, interval=1)]
+        )
+        scenario.integrator = IntegratorSettings(absolute_tolerance=1e-9, stiff=False)
+        scenario_model = create_scenario_model(self.instance, scenario)
+        integrator = scenario_model.rr_model.getIntegrator()
+        self.assertEqual(integrator.getValue('relative_tolerance'), 1e-5)
+        self.assertEqual(integrator.getValue('absolute_tolerance'), 1e-9)
+        self.assertEqual(integrator.getValue('maximum_num_steps'), 5000)
+        self.assertFalse(integrator.getValue('stiff'))
+
+    def test_tune_integrator(self):
+        scenario = create_scenario(
+            'integrator',
+            ['ABlood', 'AUrine'],
+            [DosingEvent('repeated_bolus', 'AGut', 1, 0, interval=1)]
+        )
+        candidates = create_integrator_candidates([1e-3, 1e-8], [1e-10], [True])
+        result = tune_integrator(
+            self.instance,
+            scenario,
+            self.logger,
+            {'ABlood': 1e-6},
+            candidates,
+            n_repeats = 1
+        )
+        self.assertEqual(len(result.benchmark), 2)
+        self.assertListEqual(list(result.benchmark['within_budget']), [False, True])
+        self.assertTrue(np.all(result.benchmark['error_ABlood'] > 0))
+        self.assertEqual(result.settings.relative_tolerance, 1e-8)
+        self.assertEqual(result.settings.maximum_num_steps, 5000)
+        result = tune_integrator(self.instance, scenario, self.logger, 1e-12, candidates, n_repeats=1)
+        self.assertIsNone(result.settings)
+        with self.assertRaises(ValueError):
+            tune_integrator(self.instance, scenario, self.logger, {'AGut': 1e-3}, candidates)
+
+    def test_tune_integrator_command(self):
+        out_path = os.path.join(TEST_OUTPUT_PATH, 'integrator')
+        os.makedirs(out_path, exist_ok=True)
+        benchmark_file = os.path.join(out_path, 'benchmark.csv')
+        args = [
+            os.path.join(TEST_SCENARIOS_PATH, 'oral.yaml'),
+            '--scenario', 'oral_single',
+            '--instance', 'simple',
+            '--output-max-error', 'ABlood', '1e-6',
+            '--relative-tolerances', '1e-3', '1e-8',
+            '--absolute-tolerances', '1e-10',
+            '--repeats', '1',
+            '--benchmark-file', benchmark_file
+        ]
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            self.assertEqual(main(args), 0)
+
+        # The printed section can be used as integrator settings of the instance
+        settings = IntegratorSettings(**yaml.safe_load(stdout.getvalue())['integrator'])
+        self.assertEqual(settings.relative_tolerance, 1e-8)
+        self.assertEqual(settings.absolute_tolerance, 1e-10)
+        self.assertEqual(len(pd.read_csv(benchmark_file)), 4)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(main(args[:3] + ['--instance', 'simple', '--max-error', '1e-14', '--repeats', '1']), 1)
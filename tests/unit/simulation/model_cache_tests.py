@@ -0,0 +1,112 @@
+import glob
+import os
+import shutil
+import unittest
+
+import numpy as np
+
+from tests.conf import TEST_MODELS_PATH, TEST_OUTPUT_PATH
+from sbmlpbkutils.simulation.definitions import EventSpec
+from sbmlpbkutils.simulation.model_cache import ModelCache, ModelStateCache, get_file_hash
+
+class ModelCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.out_path = os.path.join(TEST_OUTPUT_PATH, 'model_cache')
+        os.makedirs(self.out_path, exist_ok=True)
+
+    def test_get_rr_model_compiles_once(self):
+        model_file = os.path.join(TEST_MODELS_PATH, 'simple/simple.annotated.sbml')
+        cache = ModelCache()
+        for _ in range(3):
+            ls_model = cache.get_sbml_model(model_file)
+            rr_model = cache.get_rr_model(model_file)
+            self.assertEqual(ls_model.getId(), 'simple')
+            self.assertIsNotNone(rr_model)
+        self.assertEqual(cache.misses, 1)
+        self.assertEqual(cache.hits, 2)
+
+    def test_get_rr_model_returns_reset_copy(self):
+        model_file = os.path.join(TEST_MODELS_PATH, 'simple/simple.annotated.sbml')
+        cache = ModelCache()
+        rr_model = cache.get_rr_model(model_file)
+        rr_model['BW'] = 10
+        rr_model.addEvent('ev_1', False, 'time >= 1', False)
+        rr_model.addEventAssignment('ev_1', 'AGut', 'AGut + 1', False)
+        rr_model.regenerateModel(True, True)
+        rr_model.simulate(0, 2, 3)
+        rr_model = cache.get_rr_model(model_file)
+        self.assertEqual(rr_model['BW'], 70)
+        self.assertEqual(rr_model['time'], 0)
+        self.assertEqual(rr_model.model.getNumEvents(), 0)
+
+    def test_get_rr_model_with_events(self):
+        model_file = os.path.join(TEST_MODELS_PATH, 'simple/simple.annotated.sbml')
+        event_specs = [EventSpec('AGut', '(time >= 1)', 'AGut + 1')]
+        cache = ModelCache()
+        rr_model = cache.get_rr_model(model_file, event_specs)
+        self.assertEqual(rr_model.model.getNumEvents(), 1)
+        # The base model of the events is not counted or cached
+        self.assertEqual((cache.misses, cache.hits, len(cache)), (1, 0, 1))
+        rr_model = cache.get_rr_model(model_file, event_specs)
+        self.assertEqual(rr_model.model.getNumEvents(), 1)
+        rr_model = cache.get_rr_model(model_file)
+        self.assertEqual(rr_model.model.getNumEvents(), 0)
+        self.assertEqual(cache.misses, 2)
+        self.assertEqual(cache.hits, 1)
+        # A cached base model is reused without changing the counters
+        cache.get_rr_model(model_file, [EventSpec('AGut', '(time >= 2)', 'AGut + 1')])
+        self.assertEqual((cache.misses, cache.hits, len(cache)), (3, 1, 3))
+
+    def test_get_rr_model_evicts_least_recently_used(self):
+        model_file_1 = os.path.join(TEST_MODELS_PATH, 'simple/simple.annotated.sbml')
+        model_file_2 = os.path.join(TEST_MODELS_PATH, 'simple_metab/simple_metab.annotated.sbml')
+        cache = ModelCache(max_size=1)
+        cache.get_rr_model(model_file_1)
+        cache.get_rr_model(model_file_2)
+        cache.get_rr_model(model_file_1)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.misses, 3)
+
+    def test_get_sbml_model_reloads_modified_file(self):
+        model_file = os.path.join(self.out_path, 'model.sbml')
+        shutil.copy(os.path.join(TEST_MODELS_PATH, 'simple/simple.annotated.sbml'), model_file)
+        cache = ModelCache()
+        cache.get_sbml_model(model_file)
+        shutil.copy(os.path.join(TEST_MODELS_PATH, 'simple_metab/simple_metab.annotated.sbml'), model_file)
+        ls_model = cache.get_sbml_model(model_file)
+        self.assertEqual(ls_model.getId(), 'simple_metab')
+
+    def test_state_cache_load_saved_model(self):
+        cache_dir = os.path.join(self.out_path, 'states')
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        model_file = os.path.join(TEST_MODELS_PATH, 'simple/simple.annotated.sbml')
+        event_specs = [EventSpec('AGut', '(time >= 1)', 'AGut + 1')]
+
+        # First cache compiles models and stores states
+        cache = ModelCache(state_cache=ModelStateCache(cache_dir))
+        expected = cache.get_rr_model(model_file, event_specs).simulate(0, 4, 5, ['time', 'AGut'])
+        self.assertEqual(len(glob.glob(os.path.join(cache_dir, '*.rrstate'))), 2)
+
+        # Second cache loads the models from the stored states
+        state_cache = ModelStateCache(cache_dir)
+        cache = ModelCache(state_cache=state_cache)
+        self.assertIsNotNone(state_cache.load(state_cache.get_key(get_file_hash(model_file), '')))
+        rr_model = cache.get_rr_model(model_file, event_specs)
+        self.assertEqual(rr_model.model.getNumEvents(), 1)
+        result = rr_model.simulate(0, 4, 5, ['time', 'AGut'])
+        self.assertTrue(np.allclose(expected, result))
+
+    def test_state_cache_evict(self):
+        cache_dir = os.path.join(self.out_path, 'states_evict')
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        os.makedirs(cache_dir)
+        stale_file = os.path.join(cache_dir, '0.0.0-stale.rrstate')
+        with open(stale_file, 'wb') as f:
+            f.write(b'stale')
+        model_file = os.path.join(TEST_MODELS_PATH, 'simple/simple.annotated.sbml')
+        state_cache = ModelStateCache(cache_dir, max_size=1)
+        cache = ModelCache(state_cache=state_cache)
+        cache.get_rr_model(model_file)
+        self.assertFalse(os.path.exists(stale_file))
+        self.assertEqual(len(glob.glob(os.path.join(cache_dir, '*.rrstate'))), 0)
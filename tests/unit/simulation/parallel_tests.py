@@ -0,0 +1,60 @@
+import logging
+import os
+import unittest
+
+from sbmlpbkutils.simulation.parallel import TaskPool, run_tasks
+
+def _square(value: int, logger: logging.Logger) -> int:
+    logger.info("Task %s", value)
+    return value * value
+
+def _fail(value: int, logger: logging.Logger) -> int:
+    logger.info("Task %s", value)
+    if value == 2:
+        raise ValueError(f"Task {value} failed")
+    return value
+
+def _get_pid(_: int, logger: logging.Logger) -> int:
+    return os.getpid()
+
+class SimulationParallelTests(unittest.TestCase):
+
+    def test_run_tasks_sequential(self):
+        logger = logging.getLogger('parallel_tests_sequential')
+        with self.assertLogs(logger, level='INFO') as logs:
+            results = run_tasks(_square, [(i,) for i in range(4)], 1, logger)
+        self.assertListEqual(results, [0, 1, 4, 9])
+        self.assertListEqual([r.getMessage() for r in logs.records], [f"Task {i}" for i in range(4)])
+
+    def test_run_tasks_parallel_deterministic(self):
+        logger = logging.getLogger('parallel_tests_parallel')
+        with self.assertLogs(logger, level='INFO') as logs:
+            results = run_tasks(_square, [(i,) for i in range(8)], 4, logger)
+        self.assertListEqual(results, [i * i for i in range(8)])
+        self.assertListEqual([r.getMessage() for r in logs.records], [f"Task {i}" for i in range(8)])
+
+    def test_run_tasks_parallel_error(self):
+        logger = logging.getLogger('parallel_tests_error')
+        with self.assertLogs(logger, level='INFO') as logs:
+            with self.assertRaises(ValueError):
+                run_tasks(_fail, [(i,) for i in range(4)], 2, logger)
+        messages = [r.getMessage() for r in logs.records]
+        self.assertListEqual(messages[:3], ["Task 0", "Task 1", "Task 2"])
+
+    def test_run_tasks_on_result(self):
+        logger = logging.getLogger('parallel_tests_on_result')
+        logger.setLevel(logging.WARNING)
+        for n_workers in [1, 3]:
+            streamed = []
+            results = run_tasks(_square, [(i,) for i in range(6)], n_workers, logger, streamed.append)
+            self.assertListEqual(results, [])
+            self.assertListEqual(streamed, [i * i for i in range(6)])
+
+    def test_task_pool_reuses_workers(self):
+        logger = logging.getLogger('parallel_tests_pool')
+        logger.setLevel(logging.WARNING)
+        with TaskPool(2) as pool:
+            first = set(pool.run(_get_pid, [(i,) for i in range(8)], logger))
+            second = set(pool.run(_get_pid, [(i,) for i in range(8)], logger))
+        self.assertTrue(first & second)
+        self.assertNotIn(os.getpid(), first)
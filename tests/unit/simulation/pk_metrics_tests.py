@@ -0,0 +1,179 @@
+import logging
+import os
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from parameterized import parameterized
+
+from tests.conf import TEST_MODELS_PATH, TEST_OUTPUT_PATH
+from tests.unit.simulation.helpers import create_scenario
+from sbmlpbkutils.simulation.definitions import (
+    DosingEvent,
+    DosingMode,
+    ModelInstance,
+    OutputReducer,
+    ReducerType,
+    ResultsFileOptions,
+    ResultsFormat,
+    ScenarioSweep
+)
+from sbmlpbkutils.simulation.pk_metrics import (
+    PkMetricsAccumulator,
+    compute_accumulation_ratio,
+    compute_auc,
+    compute_cmax,
+    compute_cmin,
+    compute_pk_metrics,
+    compute_terminal_half_life
+)
+from sbmlpbkutils.simulation.result_cache import ResultCache
+from sbmlpbkutils.simulation.results_io import get_pk_metrics_file_name
+from sbmlpbkutils.simulation.simulation import run_scenario, run_sweep, simulate_scenario
+
+class PkMetricsTests(unittest.TestCase):
+
+    def setUp(self):
+        self.times = np.linspace(0, 4, 9)
+        self.values = np.column_stack([
+            [0, 1, 2, 1, 0, 1, 2, 1, 0],
+            np.exp(-np.log(2.) * np.linspace(0, 4, 9))
+        ]).astype(float)
+
+    def test_compute_auc(self):
+        auc = compute_auc(self.times, self.values)
+        np.testing.assert_allclose(auc, np.trapezoid(self.values, self.times, axis=0))
+        # Window boundaries within segments are interpolated
+        self.assertAlmostEqual(compute_auc(self.times, self.values, 0.25, 0.75)[0], 0.5)
+        self.assertAlmostEqual(compute_auc(self.times, self.values, 10, 20)[0], 0)
+
+    def test_compute_cmax_cmin(self):
+        (cmax, tmax) = compute_cmax(self.times, self.values)
+        np.testing.assert_array_equal(cmax, [2, 1])
+        np.testing.assert_array_equal(tmax, [1, 0])
+        (cmax, tmax) = compute_cmax(self.times, self.values, start=2)
+        np.testing.assert_array_equal(tmax, [3, 2])
+        np.testing.assert_array_equal(compute_cmin(self.times, self.values, end=1), [0, 0.5])
+
+    def test_compute_terminal_half_life(self):
+        half_life = compute_terminal_half_life(self.times, self.values)
+        self.assertTrue(np.isnan(half_life[0]))
+        self.assertAlmostEqual(half_life[1], 1)
+
+    def test_compute_accumulation_ratio(self):
+        times = np.linspace(0, 4, 41)
+        values = (1 - np.exp(-times))[:, np.newaxis]
+        ratio = compute_accumulation_ratio(times, values, 1)
+        expected = compute_auc(times, values, 3, 4) / compute_auc(times, values, 0, 1)
+        np.testing.assert_allclose(ratio, expected)
+        self.assertGreater(ratio[0], 1)
+
+    def test_compute_pk_metrics_batch(self):
+        batch = np.stack([self.values, 2 * self.values])
+        metrics = compute_pk_metrics(self.times, batch, ['A', 'B'], windows=[(0, 2)])
+        self.assertEqual(metrics.auc.shape, (2, 2))
+        np.testing.assert_allclose(metrics.auc[1], 2 * metrics.auc[0])
+        np.testing.assert_allclose(metrics.half_life[:, 1], [1, 1])
+        np.testing.assert_allclose(metrics.window_aucs[(0, 2)][0], compute_auc(self.times, self.values, 0, 2))
+        df = metrics.to_dataframe()
+        self.assertEqual(len(df), 4)
+        self.assertListEqual(list(df['index']), [0, 0, 1, 1])
+        self.assertListEqual(list(df['output']), ['A', 'B', 'A', 'B'])
+        self.assertIn('auc_0_2', df.columns)
+
+    @parameterized.expand([
+        (1,),
+        (3,),
+        (9,)
+    ])
+    def test_accumulator_chunks(self, chunk_size):
+        times = np.linspace(0, 4, 41)
+        values = np.stack([np.column_stack([np.sin(times) ** 2, np.exp(-times)])] * 3)
+        expected = compute_pk_metrics(times, values, ['A', 'B'], windows=[(0.55, 2.05)], interval=1)
+        accumulator = PkMetricsAccumulator(['A', 'B'], windows=[(0.55, 2.05)], interval=1, end_time=4)
+        for start in range(0, len(times), chunk_size):
+            accumulator.update(times[start:start + chunk_size], values[:, start:start + chunk_size])
+        metrics = accumulator.result()
+        for metric in ['auc', 'cmax', 'tmax', 'cmin', 'half_life', 'accumulation_ratio']:
+            np.testing.assert_allclose(getattr(metrics, metric), getattr(expected, metric))
+        np.testing.assert_allclose(metrics.window_aucs[(0.55, 2.05)], expected.window_aucs[(0.55, 2.05)])
+
+    def test_accumulator_requires_end_time(self):
+        with self.assertRaises(ValueError):
+            PkMetricsAccumulator(['A'], interval=1)
+
+    @parameterized.expand([
+        (None, False),
+        (50, False),
+        (None, True),
+        (50, True)
+    ])
+    def test_run_scenario_pk_metrics(self, stream_window, reduced):
+        (instance, scenario) = self._create_run()
+        result = simulate_scenario(instance, scenario)
+        expected = compute_pk_metrics(result.times, result.outputs, result.output_ids).to_dataframe()
+        if reduced:
+            scenario.outputs[0].reducers = [OutputReducer(ReducerType.MAX, 1)]
+        out_path = os.path.join(TEST_OUTPUT_PATH, 'pk_metrics')
+        out_file = os.path.join(out_path, f'metrics_{stream_window}_{reduced}.parquet')
+        options = ResultsFileOptions(ResultsFormat.PARQUET, stream_window=stream_window, pk_metrics=True)
+        update = PkMetricsAccumulator.update
+        with mock.patch.object(PkMetricsAccumulator, 'update', autospec=True, side_effect=update) as spy:
+            run_scenario(instance, scenario, out_file, True, logging.getLogger('pk_metrics_tests'), results_options=options)
+
+        # Metrics are accumulated from the integration windows
+        if stream_window is not None:
+            self.assertEqual(spy.call_count, int(np.ceil(len(result.times) / stream_window)))
+        df = pd.read_csv(get_pk_metrics_file_name(out_file))
+        self.assertListEqual(list(df.columns), list(expected.columns))
+        self.assertListEqual(list(df['output']), ['ABlood', 'ALiver'])
+        for metric in ['auc', 'cmax', 'tmax', 'cmin']:
+            np.testing.assert_allclose(df[metric], expected[metric], rtol=1e-5)
+
+    def test_run_scenario_pk_metrics_result_cache(self):
+        (instance, scenario) = self._create_run()
+        out_path = os.path.join(TEST_OUTPUT_PATH, 'pk_metrics')
+        out_file = os.path.join(out_path, 'metrics_cached.csv')
+        metrics_file = get_pk_metrics_file_name(out_file)
+        cache = ResultCache(os.path.join(out_path, 'cache'))
+        options = ResultsFileOptions(pk_metrics=True)
+        logger = logging.getLogger('pk_metrics_tests')
+        run_scenario(instance, scenario, out_file, True, logger, results_options=options, result_cache=cache)
+        expected = pd.read_csv(metrics_file)
+        os.remove(metrics_file)
+        run_scenario(instance, scenario, out_file, False, logger, results_options=options, result_cache=cache)
+        pd.testing.assert_frame_equal(pd.read_csv(metrics_file), expected)
+
+    def test_run_sweep_pk_metrics(self):
+        (instance, scenario) = self._create_run()
+        amounts = [1., 2., 4.]
+        sweep = ScenarioSweep('sweep', 'sweep', scenario, {'dosing_events.0.amount': amounts})
+        out_file = os.path.join(TEST_OUTPUT_PATH, 'pk_metrics', 'sweep.csv')
+        options = ResultsFileOptions(pk_metrics=True)
+        run_sweep(instance, sweep, out_file, True, logging.getLogger('pk_metrics_tests'), batch_size=2, results_options=options)
+        df = pd.read_csv(get_pk_metrics_file_name(out_file))
+        self.assertListEqual(list(df['index']), [0, 0, 1, 1, 2, 2])
+        result = simulate_scenario(instance, scenario, dosing_mode=DosingMode.SEGMENTED)
+        expected = compute_pk_metrics(result.times, result.outputs, result.output_ids)
+        for (i, amount) in enumerate(amounts):
+            # The outputs of this linear model are proportional to the dose
+            np.testing.assert_allclose(df['auc'][2 * i:2 * i + 2], amount * expected.auc, rtol=1e-4)
+
+    def _create_run(self):
+        instance = ModelInstance(
+            id = 'simple',
+            label = 'simple',
+            model_path = os.path.join(TEST_MODELS_PATH, 'simple/simple.annotated.sbml'),
+            param_file = os.path.join(TEST_MODELS_PATH, 'simple/simple.params.csv')
+        )
+        scenario = create_scenario(
+            'test',
+            ['ABlood', 'ALiver'],
+            [DosingEvent('repeated_bolus', 'AGut', 1, 0, interval=1)],
+            duration = 5
+        )
+        return (instance, scenario)
+
+if __name__ == '__main__':
+    unittest.main()
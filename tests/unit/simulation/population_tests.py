@@ -0,0 +1,159 @@
+import logging
+import os
+import unittest
+
+import numpy as np
+import pandas as pd
+from parameterized import parameterized
+
+from tests.conf import TEST_MODELS_PATH, TEST_OUTPUT_PATH
+from tests.unit.simulation.helpers import create_scenario
+from sbmlpbkutils.simulation.definitions import (
+    DistributionType,
+    DosingEvent,
+    ModelInstance,
+    ParameterCorrelation,
+    ParameterDistribution,
+    Population,
+    SamplingMethod
+)
+from sbmlpbkutils.simulation.population import (
+    compute_population_percentiles,
+    get_population_file_names,
+    run_population,
+    sample_population
+)
+from sbmlpbkutils.simulation.simulation import (
+    create_scenario_model,
+    simulate_scenario_model
+)
+
+class PopulationTests(unittest.TestCase):
+
+    def setUp(self):
+        self.out_path = os.path.join(TEST_OUTPUT_PATH, 'population')
+        self.logger = logging.getLogger('population_tests')
+
+    @parameterized.expand([
+        (SamplingMethod.RANDOM,),
+        (SamplingMethod.LATIN_HYPERCUBE,),
+        (SamplingMethod.SOBOL,)
+    ])
+    def test_sample_population_reproducible(self, sampling):
+        population = self._create_population(64, sampling)
+        samples = sample_population(population)
+        self.assertListEqual(list(samples.columns), ['Ka', 'CLUrine'])
+        self.assertEqual(len(samples), 64)
+        pd.testing.assert_frame_equal(samples, sample_population(population))
+
+    def test_sample_population_latin_hypercube(self):
+        population = Population(
+            size = 50,
+            parameters = [ParameterDistribution('X', DistributionType.UNIFORM, lower=0, upper=1)],
+            seed = 1,
+            sampling = SamplingMethod.LATIN_HYPERCUBE
+        )
+        samples = sample_population(population)['X'].to_numpy()
+        strata = np.sort(np.floor(samples * 50).astype(int))
+        self.assertListEqual(list(strata), list(range(50)))
+
+    def test_sample_population_distributions(self):
+        population = Population(
+            size = 20000,
+            parameters = [
+                ParameterDistribution('N', DistributionType.NORMAL, mean=10, sd=2),
+                ParameterDistribution('LN', DistributionType.LOGNORMAL, mean=10, cv=0.3),
+                ParameterDistribution('U', DistributionType.UNIFORM, lower=2, upper=4),
+                ParameterDistribution('LU', DistributionType.LOGUNIFORM, lower=1, upper=100)
+            ],
+            seed = 1
+        )
+        samples = sample_population(population)
+        self.assertAlmostEqual(samples['N'].mean(), 10, delta=0.1)
+        self.assertAlmostEqual(samples['N'].std(), 2, delta=0.1)
+        self.assertAlmostEqual(samples['LN'].mean(), 10, delta=0.1)
+        self.assertAlmostEqual(samples['LN'].std() / samples['LN'].mean(), 0.3, delta=0.02)
+        self.assertTrue(samples['U'].between(2, 4).all())
+        self.assertTrue(samples['LU'].between(1, 100).all())
+        self.assertAlmostEqual(np.log10(samples['LU']).mean(), 1, delta=0.05)
+
+    def test_sample_population_correlations(self):
+        population = self._create_population(5000, SamplingMethod.LATIN_HYPERCUBE)
+        population.correlations = [ParameterCorrelation('Ka', 'CLUrine', 0.8)]
+        samples = sample_population(population)
+        correlation = samples.corr(method='spearman').loc['Ka', 'CLUrine']
+        self.assertAlmostEqual(correlation, 0.8, delta=0.05)
+
+    def test_sample_population_invalid_correlations(self):
+        population = self._create_population(10, SamplingMethod.RANDOM)
+        population.correlations = [ParameterCorrelation('Ka', 'CLUrine', 1.5)]
+        with self.assertRaises(ValueError):
+            sample_population(population)
+        population.correlations = [ParameterCorrelation('Ka', 'BW', 0.5)]
+        with self.assertRaises(ValueError):
+            sample_population(population)
+
+    def test_sample_population_missing_fields(self):
+        population = Population(
+            size = 10,
+            parameters = [ParameterDistribution('X', DistributionType.LOGNORMAL, mean=1)]
+        )
+        with self.assertRaises(ValueError):
+            sample_population(population)
+
+    def test_compute_population_percentiles(self):
+        store = np.random.default_rng(1).random((101, 37, 3)).astype(np.float32)
+        percentiles = compute_population_percentiles(store, [5, 50, 95], max_block_size=4096)
+        expected = np.percentile(store.astype(np.float64), [5, 50, 95], axis=0)
+        self.assertTrue(np.allclose(percentiles, expected))
+
+    @parameterized.expand([(1,), (2,)])
+    def test_run_population(self, n_workers):
+        instance = ModelInstance(
+            id = f'simple_{n_workers}',
+            label = 'simple',
+            model_path = os.path.join(TEST_MODELS_PATH, 'simple/simple.annotated.sbml'),
+            population = self._create_population(10, SamplingMethod.LATIN_HYPERCUBE)
+        )
+        scenario = create_scenario(
+            'population',
+            ['ALiver', 'AUrine'],
+            [DosingEvent('repeated_bolus', 'AGut', 1, 0.5, interval=1)]
+        )
+        df = run_population(instance, scenario, self.out_path, self.logger, n_workers, batch_size=3)
+
+        (samples_file, store_file, percentiles_file) = [
+            os.path.join(self.out_path, file_name)
+            for file_name in get_population_file_names(scenario.id, instance.id)
+        ]
+        samples = pd.read_csv(samples_file)
+        store = np.load(store_file, mmap_mode='r')
+        self.assertEqual(store.shape, (10, 4 * 24 + 1, 2))
+        self.assertEqual(store.dtype, np.float32)
+        self.assertListEqual(
+            list(df.columns),
+            ['time', 'ALiver_p5', 'ALiver_p50', 'ALiver_p95', 'AUrine_p5', 'AUrine_p50', 'AUrine_p95']
+        )
+        pd.testing.assert_frame_equal(df, pd.read_csv(percentiles_file))
+
+        # Results of individuals should match single runs with the sampled parameters
+        for i in [0, 9]:
+            scenario_model = create_scenario_model(
+                instance,
+                scenario,
+                parameters = samples.iloc[i].to_dict()
+            )
+            values = simulate_scenario_model(scenario_model)
+            self.assertTrue(np.allclose(store[i], values[:, 1:], rtol=1e-5, atol=1e-9))
+        self.assertTrue(np.allclose(df['ALiver_p50'], np.median(store[:, :, 0], axis=0), rtol=1e-5))
+
+    def _create_population(self, size, sampling):
+        return Population(
+            size = size,
+            parameters = [
+                ParameterDistribution('Ka', DistributionType.LOGNORMAL, mean=1, cv=0.5),
+                ParameterDistribution('CLUrine', DistributionType.UNIFORM, lower=0.05, upper=0.2)
+            ],
+            seed = 42,
+            sampling = sampling
+        )
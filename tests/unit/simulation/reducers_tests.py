@@ -0,0 +1,166 @@
+import logging
+import os
+import unittest
+from unittest import mock
+
+import numpy as np
+from parameterized import parameterized
+from roadrunner import RoadRunner
+
+from tests.conf import TEST_MODELS_PATH, TEST_OUTPUT_PATH
+from tests.unit.simulation.helpers import create_scenario
+from sbmlpbkutils.simulation.definitions import (
+    DosingEvent,
+    ModelInstance,
+    Output,
+    OutputReducer,
+    ReducerType,
+    ResultsFileOptions,
+    ResultsFormat
+)
+from sbmlpbkutils.simulation.reducers import OutputReduction
+from sbmlpbkutils.simulation.results_io import read_results
+from sbmlpbkutils.simulation import simulation
+from sbmlpbkutils.simulation.simulation import run_scenario, simulate_scenario
+
+class ReducersTests(unittest.TestCase):
+
+    def setUp(self):
+        self.out_path = os.path.join(TEST_OUTPUT_PATH, 'reducers')
+        os.makedirs(self.out_path, exist_ok=True)
+        self.logger = logging.getLogger('reducers_tests')
+        self.times = np.linspace(0, 5, 51)
+        self.results = np.column_stack([self.times, np.sin(self.times), self.times ** 2])
+        self.outputs = [
+            Output('A', 'A', reducers=[
+                OutputReducer(reducer_type, 2) for reducer_type in ReducerType
+            ]),
+            Output('B', 'B')
+        ]
+
+    def test_reduce(self):
+        reduction = OutputReduction(self.outputs, ['time', 'A', 'B'])
+        self.assertListEqual(
+            reduction.columns,
+            ['time', 'A_max', 'A_min', 'A_mean', 'A_integral', 'A_last', 'B']
+        )
+        rows = reduction.reduce(self.results)
+        np.testing.assert_allclose(rows[:, 0], [2, 4, 5])
+        np.testing.assert_allclose(rows[:, 6], [4, 16, 25])
+        for (i, (start, end)) in enumerate([(0, 2), (2, 4), (4, 5)]):
+            mask = (self.times >= start - 1e-9) & (self.times <= end + 1e-9)
+            values = np.sin(self.times[mask])
+            integral = np.trapezoid(values, self.times[mask])
+            np.testing.assert_allclose(
+                rows[i, 1:6],
+                [values.max(), values.min(), integral / (end - start), integral, values[-1]]
+            )
+
+    @parameterized.expand([
+        (1,),
+        (7,),
+        (20,)
+    ])
+    def test_reduce_chunks(self, chunk_size):
+        outputs = [
+            Output('A', 'A', reducers=[
+                OutputReducer(ReducerType.INTEGRAL, 0.75),
+                OutputReducer(ReducerType.MAX, 2)
+            ]),
+            Output('B', 'B', reducers=[OutputReducer(ReducerType.MEAN, 2)])
+        ]
+        expected = OutputReduction(outputs, ['time', 'A', 'B']).reduce(self.results)
+        reduction = OutputReduction(outputs, ['time', 'A', 'B'])
+        rows = [
+            reduction.update(self.results[start:start + chunk_size])
+            for start in range(0, len(self.results), chunk_size)
+        ]
+        rows = np.concatenate(rows + [reduction.finish()])
+        np.testing.assert_allclose(rows, expected)
+        # Reduced values are only reported at the window ends of the reducers
+        self.assertEqual(np.count_nonzero(~np.isnan(rows[:, 1])), 7)
+        self.assertEqual(np.count_nonzero(~np.isnan(rows[:, 2])), 3)
+
+    def test_duplicate_reducers(self):
+        outputs = [Output('A', 'A', reducers=[
+            OutputReducer(ReducerType.MAX, 1),
+            OutputReducer(ReducerType.MAX, 2)
+        ])]
+        with self.assertRaises(ValueError):
+            OutputReduction(outputs, ['time', 'A'])
+
+    @parameterized.expand([
+        (None,),
+        (50,)
+    ])
+    def test_run_scenario_reducers(self, stream_window):
+        instance = ModelInstance(
+            id = 'simple',
+            label = 'simple',
+            model_path = os.path.join(TEST_MODELS_PATH, 'simple/simple.annotated.sbml'),
+            param_file = os.path.join(TEST_MODELS_PATH, 'simple/simple.params.csv')
+        )
+        scenario = create_scenario(
+            'test',
+            ['ABlood', 'ALiver'],
+            [DosingEvent('repeated_bolus', 'AGut', 1, 0, interval=1)],
+            duration = 10
+        )
+        result = simulate_scenario(instance, scenario)
+        scenario.outputs[0].reducers = [
+            OutputReducer(ReducerType.MAX, 1),
+            OutputReducer(ReducerType.MEAN, 1)
+        ]
+        out_file = os.path.join(self.out_path, 'reduced.parquet')
+        options = ResultsFileOptions(ResultsFormat.PARQUET, stream_window=stream_window)
+        run_scenario(instance, scenario, out_file, True, self.logger, results_options=options)
+        df = read_results(out_file)
+        self.assertListEqual(list(df.columns), ['time', 'ABlood_max', 'ABlood_mean', 'ALiver'])
+        # Results are integrated in windows of stream_window time points
+        # (a single window without it), which only changes the results
+        # within the integrator tolerances
+        expected = OutputReduction(scenario.outputs, result.columns).reduce(result.values)
+        np.testing.assert_allclose(df.to_numpy(), expected, rtol=1e-5 if stream_window else 1e-12)
+        np.testing.assert_allclose(df['time'], np.arange(1, 11))
+        blood = result.get_output('ABlood')
+        for (day, row) in df.iterrows():
+            mask = (result.times >= day) & (result.times <= day + 1)
+            np.testing.assert_allclose(row['ABlood_max'], blood[mask].max(), rtol=1e-5)
+            np.testing.assert_allclose(
+                row['ABlood_mean'],
+                np.trapezoid(blood[mask], result.times[mask]),
+                rtol=1e-5
+            )
+
+    def test_run_scenario_reducers_incremental(self):
+        instance = ModelInstance(
+            id = 'simple',
+            label = 'simple',
+            model_path = os.path.join(TEST_MODELS_PATH, 'simple/simple.annotated.sbml'),
+            param_file = os.path.join(TEST_MODELS_PATH, 'simple/simple.params.csv')
+        )
+        scenario = create_scenario(
+            'test',
+            ['ABlood', 'ALiver'],
+            [DosingEvent('repeated_bolus', 'AGut', 1, 0, interval=1)],
+            duration = 10
+        )
+        result = simulate_scenario(instance, scenario)
+        scenario.outputs[0].reducers = [OutputReducer(ReducerType.MEAN, 1)]
+        expected = OutputReduction(scenario.outputs, result.columns).reduce(result.values)
+        out_file = os.path.join(self.out_path, 'reduced_incremental.csv')
+        with mock.patch.object(simulation, 'REDUCTION_WINDOW', 50), \
+                mock.patch.object(RoadRunner, 'simulate', autospec=True, side_effect=RoadRunner.simulate) as simulate, \
+                mock.patch.object(OutputReduction, 'reduce', autospec=True) as reduce:
+            run_scenario(instance, scenario, out_file, True, self.logger)
+
+        # The integration windows are fed to the reducers, without a
+        # reduction of the full results
+        reduce.assert_not_called()
+        self.assertGreaterEqual(simulate.call_count, 5)
+        for call in simulate.call_args_list:
+            self.assertLessEqual(len(call.kwargs['times']), 52)
+        np.testing.assert_allclose(read_results(out_file).to_numpy(), expected, rtol=1e-5)
+
+if __name__ == '__main__':
+    unittest.main()
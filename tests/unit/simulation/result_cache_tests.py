@@ -0,0 +1,83 @@
+import dataclasses
+import logging
+import os
+import shutil
+import unittest
+
+import pandas as pd
+
+from tests.conf import TEST_OUTPUT_PATH, TEST_SCENARIOS_PATH
+from sbmlpbkutils import load_config
+from sbmlpbkutils.simulation.definitions import (
+    DosingMode,
+    OutputReducer,
+    ReducerType
+)
+from sbmlpbkutils.simulation.result_cache import ResultCache, get_run_key
+from sbmlpbkutils.simulation.simulation import run_scenario
+
+class ResultCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.out_path = os.path.join(TEST_OUTPUT_PATH, 'result_cache')
+        self.cache_dir = os.path.join(self.out_path, 'cache')
+        shutil.rmtree(self.out_path, ignore_errors=True)
+        os.makedirs(self.out_path, exist_ok=True)
+        self.config = load_config(os.path.join(TEST_SCENARIOS_PATH, 'oral.yaml'))
+        self.logger = logging.getLogger('result_cache_tests')
+
+    def test_get_key(self):
+        cache = ResultCache(self.cache_dir)
+        instance = self.config.model_instances[0]
+        scenario = self.config.scenarios[0]
+        key = cache.get_key(instance, scenario)
+
+        # Labels and ids do not affect the key
+        relabelled = dataclasses.replace(scenario, id='other', label='other')
+        self.assertEqual(cache.get_key(instance, relabelled), key)
+
+        # Scenario definitions, target mappings and dosing modes do
+        changed = dataclasses.replace(scenario, duration=scenario.duration + 1)
+        self.assertNotEqual(cache.get_key(instance, changed), key)
+        remapped = dataclasses.replace(instance, target_mappings={'AGut': 'ABlood'})
+        self.assertNotEqual(cache.get_key(remapped, scenario), key)
+        self.assertNotEqual(cache.get_key(instance, scenario, DosingMode.SEGMENTED), key)
+
+        # Output reducers do
+        outputs = [dataclasses.replace(output) for output in scenario.outputs]
+        outputs[0].reducers = [OutputReducer(ReducerType.MAX, 1)]
+        reduced = dataclasses.replace(scenario, outputs=outputs)
+        self.assertNotEqual(get_run_key(instance, reduced), get_run_key(instance, scenario))
+        self.assertNotEqual(cache.get_key(instance, reduced), key)
+
+        # Model content does
+        other_model = dataclasses.replace(instance, model_path=self.config.model_instances[1].model_path)
+        self.assertNotEqual(cache.get_key(other_model, scenario), key)
+
+    def test_run_scenario_with_result_cache(self):
+        cache = ResultCache(self.cache_dir)
+        instance = self.config.model_instances[0]
+        scenario = self.config.scenarios[0]
+        out_file_1 = os.path.join(self.out_path, 'config_1', 'results.csv')
+        out_file_2 = os.path.join(self.out_path, 'config_2', 'results.csv')
+        run_scenario(instance, scenario, out_file_1, False, self.logger, result_cache=cache)
+        run_scenario(instance, scenario, out_file_2, False, self.logger, result_cache=cache)
+        pd.testing.assert_frame_equal(pd.read_csv(out_file_1), pd.read_csv(out_file_2))
+        statuses = [record['status'] for record in cache.read_manifest()]
+        self.assertListEqual(statuses, ['miss', 'hit'])
+
+        # Changed scenario is not served stale results
+        changed = dataclasses.replace(scenario, duration=2)
+        run_scenario(instance, changed, out_file_1, False, self.logger, result_cache=cache)
+        self.assertEqual(cache.read_manifest()[-1]['status'], 'miss')
+        self.assertEqual(pd.read_csv(out_file_1)['time'].iloc[-1], 2)
+
+    def test_evict(self):
+        cache = ResultCache(self.cache_dir, max_size=0)
+        instance = self.config.model_instances[0]
+        scenario = self.config.scenarios[0]
+        out_file = os.path.join(self.out_path, 'results.csv')
+        run_scenario(instance, scenario, out_file, False, self.logger, result_cache=cache)
+        run_scenario(instance, scenario, out_file, False, self.logger, result_cache=cache)
+        statuses = [record['status'] for record in cache.read_manifest()]
+        self.assertListEqual(statuses, ['miss', 'miss'])
@@ -0,0 +1,94 @@
+import os
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from tests.conf import TEST_OUTPUT_PATH
+from sbmlpbkutils.simulation.definitions import (
+    ModelInstance,
+    Output,
+    OutputReducer,
+    ReducerType,
+    ReferenceData,
+    Scenario,
+    SeriesType
+)
+from sbmlpbkutils.simulation.result_store import ResultStore
+from sbmlpbkutils.simulation.units import AmountUnit, TimeUnit
+
+class ResultStoreTests(unittest.TestCase):
+
+    def setUp(self):
+        self.out_path = os.path.join(TEST_OUTPUT_PATH, 'result_store')
+        os.makedirs(self.out_path, exist_ok=True)
+        pd.DataFrame({'time': [0., 1., 2.], 'QBlood': [0., 2., 1.]}) \
+            .to_csv(os.path.join(self.out_path, 'test_model.csv'), index=False)
+        self.reference_file = os.path.join(self.out_path, 'reference.csv')
+        pd.DataFrame({'time': [12., 36.], 'CBlood': [1.5, 1.]}) \
+            .to_csv(self.reference_file, index=False)
+        self.instance = ModelInstance(
+            id = 'model',
+            label = 'model',
+            model_path = 'model.sbml',
+            target_mappings = {'ABlood': 'QBlood'}
+        )
+        self.reference = ReferenceData(
+            id = 'reference',
+            label = 'reference',
+            file_path = self.reference_file,
+            series_type = SeriesType.CHECKPOINTS,
+            time_unit = TimeUnit.HOUR,
+            mappings = {'ABlood': 'CBlood'}
+        )
+        self.scenario = Scenario(
+            id = 'test',
+            label = 'test',
+            duration = 2,
+            evaluation_resolution = 1,
+            initial_states = None,
+            parameters = None,
+            dosing_events = None,
+            outputs = [Output('ABlood', 'ABlood')],
+            reference_data = [self.reference],
+            time_unit = TimeUnit.DAY,
+            amount_unit = AmountUnit.MICROGRAMS
+        )
+
+    def test_get_output_series(self):
+        store = ResultStore(self.out_path)
+        (times, values) = store.get_output_series(self.scenario, self.instance, self.scenario.outputs[0])
+        self.assertListEqual(times.tolist(), [0, 1, 2])
+        self.assertListEqual(values.tolist(), [0, 2, 1])
+
+    def test_get_output_series_reduced(self):
+        pd.DataFrame({'time': [1., 2., 3.], 'ABlood_max': [2., np.nan, 3.], 'ABlood_mean': [1., 1.5, 2.]}) \
+            .to_csv(os.path.join(self.out_path, 'reduced_model.csv'), index=False)
+        self.scenario.id = 'reduced'
+        output = Output('ABlood', 'ABlood', reducers=[
+            OutputReducer(ReducerType.MAX, 2),
+            OutputReducer(ReducerType.MEAN, 1)
+        ])
+        store = ResultStore(self.out_path)
+        (times, values) = store.get_output_series(self.scenario, self.instance, output)
+        self.assertListEqual(times.tolist(), [1, 3])
+        self.assertListEqual(values.tolist(), [2, 3])
+
+    def test_get_reference_series(self):
+        store = ResultStore()
+        (times, values) = store.get_reference_series(self.scenario, self.reference, 'ABlood')
+        self.assertTrue(np.allclose(times, [0.5, 1.5]))
+        self.assertListEqual(values.tolist(), [1.5, 1])
+
+    def test_files_loaded_once(self):
+        store = ResultStore(self.out_path)
+        output = self.scenario.outputs[0]
+        first = store.get_output_series(self.scenario, self.instance, output)
+        reference = store.get_reference_series(self.scenario, self.reference, 'ABlood')
+        os.remove(os.path.join(self.out_path, 'test_model.csv'))
+        os.remove(self.reference_file)
+        self.assertIs(store.get_output_series(self.scenario, self.instance, output)[0], first[0])
+        self.assertIs(store.get_reference_series(self.scenario, self.reference, 'ABlood')[0], reference[0])
+        store.clear()
+        with self.assertRaises(FileNotFoundError):
+            store.get_reference(self.reference_file)
@@ -0,0 +1,136 @@
+import os
+import shutil
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from parameterized import parameterized
+
+from tests.conf import TEST_OUTPUT_PATH
+from sbmlpbkutils.simulation.definitions import ResultsFileOptions, ResultsFormat
+from sbmlpbkutils.simulation.results_io import (
+    ResultsWriter,
+    check_results_file_name,
+    find_results_file,
+    get_results_file_name,
+    get_results_format,
+    read_results,
+    write_results
+)
+
+class ResultsIoTests(unittest.TestCase):
+
+    def setUp(self):
+        self.out_path = os.path.join(TEST_OUTPUT_PATH, 'results_io')
+        os.makedirs(self.out_path, exist_ok=True)
+        self.df = pd.DataFrame({
+            'time': np.linspace(0, 10, 11),
+            'ABlood': np.linspace(0, 1, 11) ** 2
+        })
+
+    @parameterized.expand([
+        (ResultsFormat.CSV, False, None),
+        (ResultsFormat.PARQUET, False, None),
+        (ResultsFormat.PARQUET, True, 'zstd'),
+        (ResultsFormat.ARROW, False, None),
+        (ResultsFormat.ARROW, True, 'lz4'),
+    ])
+    def test_write_read_results(self, results_format, float32, compression):
+        options = ResultsFileOptions(results_format, float32, compression)
+        out_file = os.path.join(self.out_path, get_results_file_name('scenario', 'instance', results_format))
+        write_results(self.df, out_file, options)
+        df = read_results(out_file)
+        self.assertListEqual(list(df.columns), ['time', 'ABlood'])
+        self.assertTrue(np.allclose(df.to_numpy(), self.df.to_numpy(), rtol=1e-6))
+        if float32 and results_format != ResultsFormat.CSV:
+            self.assertTrue(all(dtype == np.float32 for dtype in df.dtypes))
+
+    @parameterized.expand([
+        (ResultsFormat.CSV, False, None),
+        (ResultsFormat.PARQUET, True, 'zstd'),
+        (ResultsFormat.ARROW, False, 'lz4'),
+    ])
+    def test_results_writer(self, results_format, float32, compression):
+        options = ResultsFileOptions(results_format, float32, compression)
+        expected_file = os.path.join(self.out_path, f'expected_{results_format.value}.dat')
+        write_results(self.df, expected_file, options)
+        out_file = os.path.join(self.out_path, f'streamed_{results_format.value}.dat')
+        values = self.df.to_numpy()
+        with ResultsWriter(out_file, list(self.df.columns), options) as writer:
+            for start in range(0, len(values), 4):
+                writer.write(values[start:start + 4])
+        self.assertEqual(get_results_format(out_file), results_format)
+        pd.testing.assert_frame_equal(read_results(out_file), read_results(expected_file))
+        self.assertListEqual(
+            [f for f in os.listdir(self.out_path) if f.endswith('.tmp')], []
+        )
+
+    def test_results_writer_error(self):
+        out_file = os.path.join(self.out_path, 'failed.csv')
+        if os.path.exists(out_file):
+            os.remove(out_file)
+        with self.assertRaises(RuntimeError):
+            with ResultsWriter(out_file, list(self.df.columns)) as writer:
+                writer.write(self.df.to_numpy())
+                raise RuntimeError()
+        self.assertFalse(os.path.exists(out_file))
+        self.assertListEqual(
+            [f for f in os.listdir(self.out_path) if f.endswith('.tmp')], []
+        )
+
+    def test_write_results_csv_compression(self):
+        options = ResultsFileOptions(ResultsFormat.CSV, compression='gzip')
+        with self.assertRaises(ValueError):
+            write_results(self.df, os.path.join(self.out_path, 'compressed.csv'), options)
+
+    @parameterized.expand([
+        (ResultsFormat.PARQUET,),
+        (ResultsFormat.ARROW,),
+    ])
+    def test_write_results_without_pyarrow(self, results_format):
+        options = ResultsFileOptions(results_format)
+        out_file = os.path.join(self.out_path, get_results_file_name('no_pyarrow', 'instance', results_format))
+        with mock.patch('sbmlpbkutils.simulation.results_io.pa', None):
+            with self.assertRaisesRegex(ImportError, 'pyarrow'):
+                write_results(self.df, out_file, options)
+            with self.assertRaisesRegex(ImportError, 'pyarrow'):
+                ResultsWriter(out_file, list(self.df.columns), options)
+
+    @parameterized.expand([
+        (ResultsFormat.PARQUET,),
+        (ResultsFormat.ARROW,),
+    ])
+    def test_get_results_format_from_content(self, results_format):
+        out_file = os.path.join(self.out_path, f'results_{results_format.value}.dat')
+        write_results(self.df, out_file, ResultsFileOptions(results_format))
+        self.assertEqual(get_results_format(out_file), results_format)
+        # The content takes precedence over the extension
+        out_file = os.path.join(self.out_path, f'mislabelled_{results_format.value}.csv')
+        write_results(self.df, out_file, ResultsFileOptions(results_format))
+        self.assertEqual(get_results_format(out_file), results_format)
+        pd.testing.assert_frame_equal(read_results(out_file), self.df)
+
+    def test_check_results_file_name(self):
+        check_results_file_name('results.parquet', ResultsFormat.PARQUET)
+        check_results_file_name('results.dat', ResultsFormat.ARROW)
+        with self.assertRaises(ValueError):
+            check_results_file_name('results.csv', ResultsFormat.PARQUET)
+        with self.assertRaises(ValueError):
+            check_results_file_name('results.arrow', ResultsFormat.CSV)
+
+    def test_find_results_file(self):
+        out_path = os.path.join(self.out_path, 'find')
+        shutil.rmtree(out_path, ignore_errors=True)
+        os.makedirs(out_path)
+        with self.assertRaises(FileNotFoundError):
+            find_results_file(out_path, 'scenario', 'instance')
+        csv_file = os.path.join(out_path, 'scenario_instance.csv')
+        write_results(self.df, csv_file)
+        parquet_file = os.path.join(out_path, 'scenario_instance.parquet')
+        write_results(self.df, parquet_file, ResultsFileOptions(ResultsFormat.PARQUET))
+        os.utime(csv_file, (1000, 1000))
+        os.utime(parquet_file, (2000, 2000))
+        self.assertEqual(find_results_file(out_path, 'scenario', 'instance'), parquet_file)
+        os.utime(csv_file, (3000, 3000))
+        self.assertEqual(find_results_file(out_path, 'scenario', 'instance'), csv_file)
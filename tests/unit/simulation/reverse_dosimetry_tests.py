@@ -0,0 +1,97 @@
+import logging
+import os
+import unittest
+
+import numpy as np
+from parameterized import parameterized
+
+from tests.conf import TEST_MODELS_PATH
+from tests.unit.simulation.helpers import create_scenario
+from sbmlpbkutils.simulation.definitions import (
+    DoseMetric,
+    DosingEvent,
+    InitialState,
+    ModelInstance
+)
+from sbmlpbkutils.simulation.reverse_dosimetry import (
+    compute_dose_metric,
+    run_reverse_dosimetry,
+    scale_dosing_events
+)
+from sbmlpbkutils.simulation.simulation import (
+    create_scenario_model,
+    simulate_scenario_model
+)
+
+class ReverseDosimetryTests(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger('reverse_dosimetry_tests')
+        self.instance = ModelInstance(
+            id = 'simple',
+            label = 'simple',
+            model_path = os.path.join(TEST_MODELS_PATH, 'simple/simple.annotated.sbml')
+        )
+
+    def test_compute_dose_metric(self):
+        times = np.linspace(0, 4, 9)
+        values = np.array([0, 1, 2, 1, 0, 1, 2, 1, 0], dtype=float)
+        self.assertEqual(compute_dose_metric(times, values, DoseMetric.CMAX), 2)
+        self.assertAlmostEqual(compute_dose_metric(times, values, DoseMetric.AUC), 4)
+        self.assertAlmostEqual(compute_dose_metric(times, values, DoseMetric.STEADY_STATE, 2), 1)
+        self.assertEqual(compute_dose_metric(times, values, DoseMetric.STEADY_STATE), 0)
+
+    @parameterized.expand([
+        (DoseMetric.CMAX,),
+        (DoseMetric.AUC,),
+        (DoseMetric.STEADY_STATE,)
+    ])
+    def test_reverse_dosimetry_linear(self, metric):
+        scenario = create_scenario(
+            'reverse',
+            ['ABlood'],
+            [DosingEvent('repeated_bolus', 'AGut', 2, 0, interval=1)],
+            duration = 5
+        )
+        targets = [0.01, 0.1, 1., 10.]
+        linear = run_reverse_dosimetry(self.instance, scenario, 'ABlood', metric, targets, self.logger)
+        solved = run_reverse_dosimetry(
+            self.instance,
+            scenario,
+            'ABlood',
+            metric,
+            targets,
+            self.logger,
+            n_workers = 2,
+            assume_linear = False
+        )
+        self.assertTrue(linear['converged'].all() and solved['converged'].all())
+        self.assertTrue(np.allclose(linear['dose_factor'], solved['dose_factor'], rtol=1e-5))
+        self.assertTrue(np.allclose(linear['dose_1'], 2 * linear['dose_factor']))
+
+    def test_reverse_dosimetry_nonlinear(self):
+        # Initial amounts make the metric an affine (rather than linear)
+        # function of the dose, targets below the metric of the initial
+        # amounts cannot be reached
+        scenario = create_scenario(
+            'reverse',
+            ['ABlood'],
+            [DosingEvent('repeated_bolus', 'AGut', 2, 0, interval=1)],
+            [InitialState('AGut', 50)],
+            duration = 5
+        )
+        targets = [2., 5., 100.]
+        result = run_reverse_dosimetry(
+            self.instance,
+            scenario,
+            'ABlood',
+            DoseMetric.CMAX,
+            targets + [0.5],
+            self.logger
+        )
+        self.assertListEqual(list(result['converged']), [True, True, True, False])
+        for target, factor in zip(targets, result['dose_factor']):
+            results = simulate_scenario_model(
+                create_scenario_model(self.instance, scale_dosing_events(scenario, factor))
+            )
+            self.assertAlmostEqual(np.max(results[:, 1]) / target, 1, places=5)
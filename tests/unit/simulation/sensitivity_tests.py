@@ -0,0 +1,135 @@
+import logging
+import os
+import unittest
+
+import numpy as np
+from parameterized import parameterized
+
+from tests.conf import TEST_MODELS_PATH
+from tests.unit.simulation.helpers import create_scenario
+from sbmlpbkutils.simulation.definitions import (
+    DistributionType,
+    DosingEvent,
+    InitialState,
+    LocalSensitivityMethod,
+    ModelInstance,
+    ParameterDistribution,
+    SensitivityMethod
+)
+from sbmlpbkutils.simulation.sensitivity import (
+    compute_local_sensitivities,
+    compute_morris_indices,
+    compute_sobol_indices,
+    create_morris_design,
+    create_saltelli_design,
+    run_sensitivity_analysis
+)
+
+def _ishigami(x):
+    x = -np.pi + 2 * np.pi * x
+    return np.sin(x[:, 0]) + 7 * np.sin(x[:, 1]) ** 2 + 0.1 * x[:, 2] ** 4 * np.sin(x[:, 0])
+
+class SensitivityTests(unittest.TestCase):
+
+    def setUp(self):
+        self.instance = ModelInstance(
+            id = 'simple',
+            label = 'simple',
+            model_path = os.path.join(TEST_MODELS_PATH, 'simple/simple.annotated.sbml')
+        )
+
+    def test_saltelli_design(self):
+        design = create_saltelli_design(3, 8, seed=1)
+        self.assertEqual(design.shape, (8 * 5, 3))
+        (a, b, ab_2) = (design[:8], design[8:16], design[24:32])
+        self.assertTrue(np.array_equal(ab_2[:, [0, 2]], a[:, [0, 2]]))
+        self.assertTrue(np.array_equal(ab_2[:, 1], b[:, 1]))
+
+    def test_sobol_indices_ishigami(self):
+        design = create_saltelli_design(3, 2 ** 14, seed=1)
+        (first, total, first_conf, total_conf) = compute_sobol_indices(_ishigami(design), 3, seed=1)
+        self.assertTrue(np.allclose(first[:, 0], [0.3139, 0.4424, 0.], atol=0.02))
+        self.assertTrue(np.allclose(total[:, 0], [0.5576, 0.4424, 0.2437], atol=0.02))
+        self.assertTrue(np.all(first_conf > 0) and np.all(total_conf > 0))
+
+    def test_morris_design(self):
+        design = create_morris_design(4, 10, seed=1)
+        self.assertEqual(design.shape, (10 * 5, 4))
+        self.assertTrue(np.all((design >= 0) & (design <= 1)))
+        steps = np.diff(design.reshape(10, 5, 4), axis=1)
+        self.assertTrue(np.all(np.count_nonzero(steps, axis=2) == 1))
+
+    def test_morris_indices_linear(self):
+        design = create_morris_design(3, 20, seed=1)
+        values = design @ np.array([2., -1., 0.])
+        (mu, mu_star, sigma) = compute_morris_indices(values, design)
+        self.assertTrue(np.allclose(mu[:, 0], [2, -1, 0]))
+        self.assertTrue(np.allclose(mu_star[:, 0], [2, 1, 0]))
+        self.assertTrue(np.allclose(sigma[:, 0], 0))
+
+    @parameterized.expand([
+        ('simple', ['Ka', 'CLUrine', 'PCLiver', 'BW']),
+        ('simple_lifetime', ['Ka', 'CLUrine', 'BWAdult'])
+    ])
+    def test_local_sensitivities_forward(self, model, parameters):
+        instance = ModelInstance(
+            id = model,
+            label = model,
+            model_path = os.path.join(TEST_MODELS_PATH, f'{model}/{model}.annotated.sbml')
+        )
+        scenario = create_scenario('sensitivity', ['AUrine', 'ALiver'], None, [InitialState('AGut', 1)], duration=2)
+        forward = compute_local_sensitivities(instance, scenario, parameters)
+        self.assertEqual(forward.method, LocalSensitivityMethod.FORWARD)
+        self.assertEqual(forward.values.shape, (2 * 24 + 1, len(parameters), 2))
+        finite_difference = compute_local_sensitivities(
+            instance,
+            scenario,
+            parameters,
+            LocalSensitivityMethod.FINITE_DIFFERENCE
+        )
+        self.assertTrue(np.allclose(forward.values, finite_difference.values, atol=1e-3))
+        self.assertTrue(np.allclose(forward.times, finite_difference.times))
+
+    def test_local_sensitivities_events(self):
+        scenario = create_scenario('sensitivity', ['AUrine'], [DosingEvent('single_bolus', 'AGut', 1, 0.5)], duration=2)
+        with self.assertRaises(ValueError):
+            compute_local_sensitivities(self.instance, scenario, ['Ka'], LocalSensitivityMethod.FORWARD)
+        result = compute_local_sensitivities(self.instance, scenario, ['Ka', 'CLUrine'], normalise=False)
+        self.assertEqual(result.method, LocalSensitivityMethod.FINITE_DIFFERENCE)
+        self.assertTrue(np.all(result.values[:12] == 0))
+        self.assertTrue(np.all(result.values[-1, :, 0] > 0))
+        parallel = compute_local_sensitivities(
+            self.instance,
+            scenario,
+            ['Ka', 'CLUrine'],
+            normalise = False,
+            n_workers = 2
+        )
+        np.testing.assert_allclose(parallel.values, result.values)
+
+    def test_run_sensitivity_analysis(self):
+        instance = self.instance
+        scenario = create_scenario('sensitivity', ['AUrine'], [DosingEvent('single_bolus', 'AGut', 1, 0.5)], duration=2)
+        parameters = [
+            ParameterDistribution('CLUrine', DistributionType.UNIFORM, lower=0.05, upper=0.2),
+            ParameterDistribution('PCRest', DistributionType.UNIFORM, lower=1, upper=1.001),
+        ]
+        logger = logging.getLogger('sensitivity_tests')
+        for method in SensitivityMethod:
+            df = run_sensitivity_analysis(
+                instance,
+                scenario,
+                parameters,
+                logger,
+                method,
+                n_samples = 16,
+                seed = 1,
+                n_workers = 2
+            )
+            self.assertEqual(len(df), 2 * 2)
+            auc = df[(df['metric'] == 'auc')].set_index('parameter')
+            if method == SensitivityMethod.SOBOL:
+                self.assertGreater(auc.loc['CLUrine', 'ST'], 0.9)
+                self.assertLess(auc.loc['PCRest', 'ST'], 0.01)
+            else:
+                self.assertGreater(auc.loc['CLUrine', 'mu_star'], 100 * auc.loc['PCRest', 'mu_star'])
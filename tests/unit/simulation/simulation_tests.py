@@ -0,0 +1,277 @@
+import logging
+import os
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from tests.conf import TEST_MODELS_PATH, TEST_OUTPUT_PATH
+from tests.unit.simulation.helpers import create_scenario
+from sbmlpbkutils.simulation.definitions import (
+    DosingEvent,
+    DosingMode,
+    ModelInstance,
+    OutputTimes,
+    OutputTimesType,
+    ReferenceData,
+    SeriesType,
+    SteadyStateMode,
+    SteadyStateSettings
+)
+from sbmlpbkutils.simulation.dosing import get_dosing_cycle
+from sbmlpbkutils.simulation.model_cache import ModelCache
+from sbmlpbkutils.simulation import output_times
+from sbmlpbkutils.simulation.output_times import get_output_times
+from sbmlpbkutils.simulation.simulation import (
+    align_results,
+    create_dose_timeline,
+    run_scenario,
+    simulate_scenario,
+    simulate_scenarios
+)
+from sbmlpbkutils.simulation.units import TimeUnit
+
+OUTPUT_IDS = ['AGut', 'ABlood', 'ALiver', 'ARest', 'AUrine']
+
+class SimulationTests(unittest.TestCase):
+
+    def setUp(self):
+        self.out_path = os.path.join(TEST_OUTPUT_PATH, 'simulation')
+        os.makedirs(self.out_path, exist_ok=True)
+        self.logger = logging.getLogger('simulation_tests')
+        self.instance = ModelInstance(
+            id = 'simple',
+            label = 'simple',
+            model_path = os.path.join(TEST_MODELS_PATH, 'simple/simple.annotated.sbml')
+        )
+
+    def test_align_results(self):
+        results = np.array([[0., 1., 2.], [24., 3., 4.]])
+        values = align_results(results, 24, 1000)
+        self.assertTrue(np.allclose(values, [[0, 1e-3, 2e-3], [1, 3e-3, 4e-3]]))
+        self.assertTrue(np.shares_memory(values, results))
+
+    def test_create_dose_timeline_repeated_bolus(self):
+        events = [DosingEvent('repeated_bolus', 'AGut', 1, 0, interval=1, until=3)]
+        timeline = create_dose_timeline(events, 24, 1000, {'AGut': 'QGut'}, 96)
+        self.assertListEqual([a.time for a in timeline], [0, 24, 48])
+        self.assertTrue(all(a.target == 'QGut' and a.amount == 1000 for a in timeline))
+
+    def test_create_dose_timeline_repeated_bolus_until_end(self):
+        events = [DosingEvent('repeated_bolus', 'AGut', 1, 1, interval=2)]
+        timeline = create_dose_timeline(events, 1, 1, None, 9)
+        self.assertListEqual([a.time for a in timeline], [1, 3, 5, 7, 9])
+
+    def test_create_dose_timeline_repeated_continuous(self):
+        events = [DosingEvent('repeated_continuous', 'ASkin', 1, 1, duration=1, interval=1, until=3)]
+        timeline = create_dose_timeline(events, 1, 1, None, 10)
+        self.assertListEqual(
+            [(a.time, a.reset) for a in timeline],
+            [(1, False), (2, True), (2, False), (3, True)]
+        )
+
+    def test_create_dose_timeline_missing_interval(self):
+        events = [DosingEvent('repeated_bolus', 'AGut', 1, 0)]
+        with self.assertRaises(ValueError):
+            create_dose_timeline(events, 1, 1, None, 10)
+
+    def test_run_scenario_segmented_single_bolus(self):
+        scenario = create_scenario('test', OUTPUT_IDS, [DosingEvent('single_bolus', 'AGut', 1, 1)])
+        results = {}
+        for dosing_mode in DosingMode:
+            out_file = os.path.join(self.out_path, f'single_bolus_{dosing_mode.value}.csv')
+            run_scenario(self.instance, scenario, out_file, True, self.logger, dosing_mode=dosing_mode)
+            results[dosing_mode] = pd.read_csv(out_file)
+        pd.testing.assert_frame_equal(
+            results[DosingMode.EVENTS],
+            results[DosingMode.SEGMENTED],
+            rtol=1e-5,
+            atol=1e-9
+        )
+
+    def test_run_scenario_segmented_repeated_bolus(self):
+        scenario = create_scenario(
+            'test',
+            OUTPUT_IDS,
+            [DosingEvent('repeated_bolus', 'AGut', 1, 0, interval=1, until=3)]
+        )
+        out_file = os.path.join(self.out_path, 'repeated_bolus_segmented.csv')
+        run_scenario(self.instance, scenario, out_file, True, self.logger, dosing_mode=DosingMode.SEGMENTED)
+        df = pd.read_csv(out_file)
+        self.assertEqual(len(df), 4 * 24 + 1)
+        total = df[['AGut', 'ABlood', 'ALiver', 'ARest', 'AUrine']].sum(axis=1).to_numpy()
+        self.assertTrue(np.allclose(total[[0, 23, 24, 47, 48, 96]], [1, 1, 2, 2, 3, 3]))
+
+    def test_run_scenario_parameterised(self):
+        dosing_events = [
+            DosingEvent('repeated_bolus', 'AGut', 1, 0, interval=1, until=3),
+            DosingEvent('single_continuous', 'ABlood', 2, 0.5, duration=0.25)
+        ]
+        scenario = create_scenario('test', OUTPUT_IDS, dosing_events)
+        results = {}
+        for dosing_mode in [DosingMode.SEGMENTED, DosingMode.PARAMETERISED]:
+            out_file = os.path.join(self.out_path, f'parameterised_{dosing_mode.value}.csv')
+            run_scenario(self.instance, scenario, out_file, True, self.logger, dosing_mode=dosing_mode)
+            results[dosing_mode] = pd.read_csv(out_file)
+        pd.testing.assert_frame_equal(
+            results[DosingMode.SEGMENTED],
+            results[DosingMode.PARAMETERISED],
+            rtol=1e-5,
+            atol=1e-9
+        )
+
+    def test_run_scenario_parameterised_compiles_once(self):
+        model_cache = ModelCache()
+        for amount in [1, 2, 3]:
+            scenario = create_scenario(
+                'test',
+                OUTPUT_IDS,
+                [DosingEvent('repeated_bolus', 'AGut', amount, amount, interval=amount / 2)]
+            )
+            out_file = os.path.join(self.out_path, f'parameterised_{amount}.csv')
+            run_scenario(
+                self.instance,
+                scenario,
+                out_file,
+                True,
+                self.logger,
+                model_cache,
+                DosingMode.PARAMETERISED
+            )
+            df = pd.read_csv(out_file)
+            total = df[['AGut', 'ABlood', 'ALiver', 'ARest', 'AUrine']].sum(axis=1).to_numpy()
+            n_doses = len(np.arange(amount, 4 + 1e-9, amount / 2))
+            self.assertAlmostEqual(total[-1], n_doses * amount, places=6)
+        # Only the model with dosing inputs is compiled
+        self.assertEqual((model_cache.misses, model_cache.hits), (1, 2))
+
+    def test_get_output_times(self):
+        scenario = create_scenario('test', OUTPUT_IDS)
+        self.assertIsNone(get_output_times(scenario))
+        scenario.output_times = OutputTimes(OutputTimesType.LIST, times=[2, 0.5, 2, 10])
+        self.assertListEqual(get_output_times(scenario).tolist(), [0.5, 2])
+        scenario.output_times = OutputTimes(OutputTimesType.LOG, start=0.004, n_points=4)
+        self.assertTrue(np.allclose(get_output_times(scenario), [0, 0.004, 0.04, 0.4, 4]))
+        reference_file = os.path.join(self.out_path, 'output_times_reference.csv')
+        pd.DataFrame({'time': [6, 12, 48, 200], 'QBlood': [1, 2, 3, 4]}).to_csv(reference_file, index=False)
+        scenario.reference_data = [
+            ReferenceData('ref', 'ref', reference_file, SeriesType.CHECKPOINTS, TimeUnit.HOUR, {'ABlood': 'QBlood'})
+        ]
+        scenario.output_times = OutputTimes(OutputTimesType.REFERENCE)
+        self.assertListEqual(get_output_times(scenario).tolist(), [0.25, 0.5, 2])
+        scenario.output_times = OutputTimes(OutputTimesType.LOG, n_points=4)
+        with self.assertRaises(ValueError):
+            get_output_times(scenario)
+
+    def test_get_output_times_reference_read_once(self):
+        reference_file = os.path.join(self.out_path, 'output_times_reference_once.csv')
+        pd.DataFrame({'time': [6, 12, 48], 'QBlood': [1, 2, 3]}).to_csv(reference_file, index=False)
+        scenario = create_scenario(
+            'test',
+            OUTPUT_IDS,
+            reference_data = [
+                ReferenceData('ref', 'ref', reference_file, SeriesType.CHECKPOINTS, TimeUnit.HOUR, {'ABlood': 'QBlood'})
+            ],
+            output_times = OutputTimes(OutputTimesType.REFERENCE)
+        )
+        with mock.patch.object(output_times, 'read_results', wraps=output_times.read_results) as read_results:
+            for _ in range(3):
+                self.assertListEqual(get_output_times(scenario).tolist(), [0.25, 0.5, 2])
+            self.assertEqual(read_results.call_count, 1)
+
+            # Changed reference data files are read again
+            pd.DataFrame({'time': [24, 72, 96], 'QBlood': [1, 2, 3]}).to_csv(reference_file, index=False)
+            self.assertListEqual(get_output_times(scenario).tolist(), [1, 3, 4])
+            self.assertEqual(read_results.call_count, 2)
+
+    def test_run_scenario_output_times(self):
+        dosing_events = [
+            DosingEvent('repeated_bolus', 'AGut', 1, 0, interval=1, until=3),
+            DosingEvent('repeated_continuous', 'ABlood', 2, 0.5, duration=0.25, interval=1)
+        ]
+        output_times = OutputTimes(OutputTimesType.LIST, times=[0.25, 1, 2.5, 4])
+        for dosing_mode in DosingMode:
+            scenario = create_scenario('test', OUTPUT_IDS, dosing_events)
+            out_file = os.path.join(self.out_path, f'output_times_{dosing_mode.value}_dense.csv')
+            run_scenario(self.instance, scenario, out_file, True, self.logger, dosing_mode=dosing_mode)
+            dense = pd.read_csv(out_file)
+            scenario.output_times = output_times
+            out_file = os.path.join(self.out_path, f'output_times_{dosing_mode.value}.csv')
+            run_scenario(self.instance, scenario, out_file, True, self.logger, dosing_mode=dosing_mode)
+            df = pd.read_csv(out_file)
+            self.assertTrue(np.allclose(df['time'], [0.25, 1, 2.5, 4]))
+            pd.testing.assert_frame_equal(
+                df,
+                dense.iloc[[6, 24, 60, 96]].reset_index(drop=True),
+                rtol=1e-4,
+                atol=1e-9
+            )
+
+    def test_simulate_scenario(self):
+        scenario = create_scenario('test', OUTPUT_IDS, [DosingEvent('repeated_bolus', 'AGut', 1, 0, interval=1)])
+        result = simulate_scenario(self.instance, scenario)
+        self.assertEqual(result.values.shape, (4 * 24 + 1, 6))
+        self.assertTrue(np.shares_memory(result.outputs, result.values))
+        self.assertTrue(np.array_equal(result.get_output('ABlood'), result.values[:, 2]))
+        df = result.to_dataframe()
+        self.assertIs(result.to_dataframe(), df)
+        out_file = os.path.join(self.out_path, 'simulate_scenario.csv')
+        run_scenario(self.instance, scenario, out_file, True, self.logger)
+        pd.testing.assert_frame_equal(df, pd.read_csv(out_file), rtol=1e-12)
+        with self.assertRaises(ValueError):
+            result.get_output('AUnknown')
+
+    def test_simulate_scenarios(self):
+        scenarios = []
+        for amount in [1, 2, 3]:
+            scenario = create_scenario('test', OUTPUT_IDS, [DosingEvent('repeated_bolus', 'AGut', amount, 0, interval=1)])
+            scenario.id = f'amount_{amount}'
+            scenarios.append(scenario)
+        result = simulate_scenarios(self.instance, scenarios, self.logger, n_workers=2, batch_size=2)
+        self.assertEqual(result.values.shape, (3, 4 * 24 + 1, 5))
+        self.assertListEqual(result.scenario_ids, ['amount_1', 'amount_2', 'amount_3'])
+        for i, scenario in enumerate(scenarios):
+            expected = simulate_scenario(self.instance, scenario)
+            self.assertTrue(np.allclose(result.get_values(scenario.id), expected.outputs))
+            self.assertTrue(np.allclose(result.times, expected.times))
+        scenarios[2].duration = 2
+        with self.assertRaises(ValueError):
+            simulate_scenarios(self.instance, scenarios, self.logger, batch_size=2)
+
+    def test_get_dosing_cycle(self):
+        events = [
+            DosingEvent('single_bolus', 'AGut', 1, 2),
+            DosingEvent('repeated_bolus', 'AGut', 1, 1, interval=1),
+            DosingEvent('repeated_continuous', 'ASkin', 1, 0, duration=1, interval=0.5)
+        ]
+        self.assertEqual(get_dosing_cycle(events, 24, 240), (48, 24))
+        self.assertIsNone(get_dosing_cycle(events[:1], 24, 240))
+        events[2].interval = 0.7
+        self.assertIsNone(get_dosing_cycle(events, 24, 240))
+        self.assertIsNone(get_dosing_cycle([DosingEvent('repeated_bolus', 'AGut', 1, 0, interval=1, until=5)], 24, 240))
+
+    def test_simulate_scenario_steady_state(self):
+        scenario = create_scenario('test', OUTPUT_IDS, [DosingEvent('repeated_bolus', 'AGut', 1, 0, interval=1)])
+        scenario.duration = 100
+        expected = simulate_scenario(self.instance, scenario, dosing_mode=DosingMode.SEGMENTED).values.copy()
+        scale = np.max(np.abs(expected), axis=0)
+        for output_times in [None, OutputTimes(OutputTimesType.LOG, start=0.01, n_points=40)]:
+            scenario.output_times = output_times
+            reference = (expected if output_times is None else
+                simulate_scenario(self.instance, scenario, dosing_mode=DosingMode.SEGMENTED).values.copy())
+            scenario.steady_state = SteadyStateSettings()
+            result = simulate_scenario(self.instance, scenario, dosing_mode=DosingMode.SEGMENTED)
+            self.assertEqual(result.values.shape, reference.shape)
+            # The accumulating urine amount is extrapolated as well
+            self.assertTrue(np.all(np.abs(result.values - reference) <= 1e-5 * scale))
+            scenario.steady_state = SteadyStateSettings(SteadyStateMode.STOP)
+            result = simulate_scenario(self.instance, scenario, dosing_mode=DosingMode.SEGMENTED)
+            self.assertEqual(result.values.shape, reference.shape)
+            # The last cycle is repeated without the accumulation of the urine amount
+            self.assertTrue(np.all(np.abs(result.values[:, :-1] - reference[:, :-1]) <= 1e-5 * scale[:-1]))
+            self.assertLess(result.values[-1, -1], 0.9 * reference[-1, -1])
+            scenario.steady_state = None
+        scenario.steady_state = SteadyStateSettings()
+        with self.assertRaises(ValueError):
+            simulate_scenario(self.instance, scenario, dosing_mode=DosingMode.EVENTS)
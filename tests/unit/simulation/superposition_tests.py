@@ -0,0 +1,117 @@
+import logging
+import os
+import unittest
+
+import numpy as np
+from parameterized import parameterized
+
+from tests.conf import TEST_MODELS_PATH
+from tests.unit.simulation.helpers import create_scenario
+from sbmlpbkutils.simulation.definitions import (
+    ConvolutionMethod,
+    DosingEvent,
+    DosingMode,
+    ModelInstance
+)
+from sbmlpbkutils.simulation.simulation import simulate_scenario
+from sbmlpbkutils.simulation.superposition import (
+    LinearResponseModel,
+    convolve_doses,
+    simulate_scenarios_linear
+)
+
+class SuperpositionTests(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger('superposition_tests')
+        self.instance = ModelInstance(
+            id = 'simple',
+            label = 'simple',
+            model_path = os.path.join(TEST_MODELS_PATH, 'simple/simple.annotated.sbml'),
+            param_file = os.path.join(TEST_MODELS_PATH, 'simple/simple.params.csv')
+        )
+        self.scenario = create_scenario(
+            'test',
+            ['ABlood', 'ALiver'],
+            [DosingEvent('repeated_bolus', 'AGut', 1, 0, interval=1)],
+            duration = 10
+        )
+
+    def test_convolve_doses(self):
+        times = np.linspace(0, 10, 101)
+        response = np.column_stack([np.exp(-times), times * np.exp(-times)])
+        dose_times = np.array([0, 1.5, 4, 4])
+        amounts = np.array([1, 2, 0.5, 0.5])
+        expected = sum(
+            a * np.where(times[:, np.newaxis] >= t, np.exp(-(times - t))[:, np.newaxis]
+                * np.column_stack([np.ones_like(times), times - t]), 0)
+            for (t, a) in zip(dose_times, amounts)
+        )
+        for method in ConvolutionMethod:
+            result = convolve_doses(times, response, dose_times, amounts, method)
+            np.testing.assert_allclose(result, expected, atol=1e-12)
+
+    def test_convolve_doses_off_grid(self):
+        times = np.linspace(0, 10, 101)
+        response = np.column_stack([times])
+        result = convolve_doses(times, response, [0.25], [2], ConvolutionMethod.AUTO)
+        np.testing.assert_allclose(result[:, 0], 2 * np.maximum(times - 0.25, 0), atol=1e-12)
+        with self.assertRaises(ValueError):
+            convolve_doses(times, response, [0.25], [2], ConvolutionMethod.FFT)
+
+    @parameterized.expand([
+        ([DosingEvent('repeated_bolus', 'AGut', 1, 0, interval=1)],),
+        ([DosingEvent('single_bolus', 'AGut', 2, 0.5), DosingEvent('single_bolus', 'AGut', 1, 3.25)],),
+        ([DosingEvent('repeated_continuous', 'AGut', 1, 0, interval=2, duration=0.5)],),
+    ])
+    def test_simulate(self, dosing_events):
+        model = LinearResponseModel(self.instance, self.scenario)
+        self.scenario.dosing_events = dosing_events
+        expected = simulate_scenario(self.instance, self.scenario, dosing_mode=DosingMode.SEGMENTED)
+        for method in (ConvolutionMethod.AUTO, ConvolutionMethod.DIRECT):
+            result = model.simulate(dosing_events, method)
+            self.assertListEqual(result.columns, expected.columns)
+            np.testing.assert_allclose(result.times, expected.times)
+            scale = np.max(np.abs(expected.outputs), axis=0)
+            self.assertTrue(np.all(np.abs(result.outputs - expected.outputs) <= 1e-4 * scale))
+        self.assertTrue(model.is_linear(dosing_events))
+
+    def test_simulate_overlapping_continuous(self):
+        model = LinearResponseModel(self.instance, self.scenario)
+        with self.assertRaises(ValueError):
+            model.simulate([
+                DosingEvent('single_continuous', 'AGut', 1, 0, duration=2),
+                DosingEvent('single_bolus', 'AGut', 1, 1)
+            ])
+
+    @parameterized.expand([
+        (None,),
+        (True,),
+        (False,)
+    ])
+    def test_simulate_scenarios_linear(self, linear):
+        self.instance.linear = linear
+        scenarios = []
+        for (i, amount) in enumerate([1, 2, 5]):
+            scenario = create_scenario(
+                f'dose_{i}',
+                ['ABlood', 'ALiver'],
+                [DosingEvent('repeated_bolus', 'AGut', amount, 0, interval=1 + i)],
+                duration = 10
+            )
+            scenarios.append(scenario)
+        result = simulate_scenarios_linear(self.instance, scenarios, self.logger)
+        self.assertListEqual(result.scenario_ids, ['dose_0', 'dose_1', 'dose_2'])
+        self.assertEqual(result.values.shape, (3, 241, 2))
+        for (i, scenario) in enumerate(scenarios):
+            expected = simulate_scenario(self.instance, scenario, dosing_mode=DosingMode.SEGMENTED).outputs
+            scale = np.max(np.abs(expected), axis=0)
+            self.assertTrue(np.all(np.abs(result.values[i] - expected) <= 1e-4 * scale))
+
+        # Scenarios should only differ in their dosing events
+        scenarios[1].duration = 5
+        with self.assertRaises(ValueError):
+            simulate_scenarios_linear(self.instance, scenarios, self.logger)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+import logging
+import os
+import dataclasses
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from parameterized import parameterized
+import yaml
+
+from tests.conf import TEST_OUTPUT_PATH, TEST_SCENARIOS_PATH
+from sbmlpbkutils import load_config
+from sbmlpbkutils.simulation.definitions import (
+    DosingEvent,
+    DosingMode,
+    OutputReducer,
+    ReducerType,
+    ResultsFileOptions,
+    ResultsFormat
+)
+from sbmlpbkutils.simulation.reducers import OutputReduction
+from sbmlpbkutils.simulation.results_io import read_results
+from sbmlpbkutils.simulation.simulation import run_config, run_sweep, simulate_scenario
+from sbmlpbkutils.simulation.units import TimeUnit
+from sbmlpbkutils.simulation.sweeps import (
+    expand_sweep,
+    get_sweep_members,
+    get_sweep_scenario,
+    get_sweep_size
+)
+
+class SweepsTests(unittest.TestCase):
+
+    def setUp(self):
+        self.out_path = os.path.join(TEST_OUTPUT_PATH, 'sweeps')
+        os.makedirs(self.out_path, exist_ok=True)
+        self.logger = logging.getLogger('sweeps_tests')
+        self.config = load_config(os.path.join(TEST_SCENARIOS_PATH, 'sweep.yaml'))
+        self.sweep = self.config.sweeps[0]
+
+    def test_expand_sweep(self):
+        self.assertEqual(get_sweep_size(self.sweep), 12)
+        scenarios = list(expand_sweep(self.sweep))
+        self.assertEqual(len(scenarios), 12)
+        self.assertEqual(scenarios[0].id, 'oral_dose_response_0')
+        # Last field varies fastest
+        events = [scenario.dosing_events[0] for scenario in scenarios]
+        self.assertListEqual([event.target for event in events[:2]], ['AGut', 'ABlood'])
+        self.assertListEqual([event.interval for event in events[:4]], [0.5, 0.5, 1, 1])
+        self.assertListEqual([event.amount for event in events[::4]], [1, 10, 100])
+        # Base scenario is not modified
+        self.assertEqual(self.sweep.scenario.dosing_events[0].amount, 1)
+        members = get_sweep_members(self.sweep)
+        self.assertListEqual(
+            list(members.columns),
+            ['index', 'scenario', 'dosing_events.0.amount', 'dosing_events.0.interval', 'dosing_events.0.target']
+        )
+        self.assertEqual(members['dosing_events.0.amount'][5], 10)
+
+    def test_sweep_parameters(self):
+        self.sweep.matrix = {'parameters.Ka': [0.5, 1]}
+        scenario = get_sweep_scenario(self.sweep, 1)
+        self.assertDictEqual(scenario.parameters, {'Ka': 1})
+        self.assertIsNone(self.sweep.scenario.parameters)
+
+    def test_sweep_invalid_field(self):
+        self.sweep.matrix = {'dosing_events.1.amount': [1]}
+        with self.assertRaises(ValueError):
+            get_sweep_scenario(self.sweep, 0)
+        self.sweep.matrix = {'dose': [1]}
+        with self.assertRaises(ValueError):
+            get_sweep_scenario(self.sweep, 0)
+        with self.assertRaises(ValueError):
+            get_sweep_scenario(self.sweep, 1)
+
+    def test_load_config_sweep_values(self):
+        with open(os.path.join(TEST_SCENARIOS_PATH, 'sweep.yaml'), 'r', encoding='utf-8') as f:
+            data = yaml.safe_load(f)
+        data['sweeps'][0]['matrix'] = {
+            'time_unit': ['HOUR', 'DAY'],
+            'dosing_events.0': [{'type': 'single_bolus', 'target': 'AGut', 'amount': 2, 'time': 1}]
+        }
+        config_file = os.path.join(self.out_path, 'sweep_values.yaml')
+        with open(config_file, 'w', encoding='utf-8') as f:
+            yaml.safe_dump(data, f)
+        sweep = load_config(config_file).sweeps[0]
+        # Swept values are parsed like the fields of scenarios
+        scenario = get_sweep_scenario(sweep, 0)
+        self.assertEqual(scenario.time_unit, TimeUnit.HOUR)
+        self.assertEqual(scenario.dosing_events[0], DosingEvent('single_bolus', 'AGut', 2, 1))
+        self.assertListEqual(list(get_sweep_members(sweep)['time_unit']), ['HOUR', 'DAY'])
+        data['sweeps'][0]['matrix'] = {'time_unit': ['WEEKS']}
+        with open(config_file, 'w', encoding='utf-8') as f:
+            yaml.safe_dump(data, f)
+        with self.assertRaises(ValueError):
+            load_config(config_file)
+
+    @parameterized.expand([
+        (1,),
+        (2,)
+    ])
+    def test_run_sweep(self, n_workers):
+        instance = self.config.model_instances[0]
+        out_file = os.path.join(self.out_path, f'sweep_{n_workers}.csv')
+        run_sweep(instance, self.sweep, out_file, True, self.logger, n_workers=n_workers, batch_size=5)
+        df = read_results(out_file)
+        self.assertListEqual(list(df.columns), ['index', 'time', 'ABlood', 'ALiver'])
+        self.assertListEqual(list(df['index'].unique()), list(range(12)))
+        for index in [0, 7, 11]:
+            scenario = get_sweep_scenario(self.sweep, index)
+            expected = simulate_scenario(instance, scenario, dosing_mode=DosingMode.SEGMENTED)
+            np.testing.assert_allclose(
+                df[df['index'] == index].to_numpy()[:, 1:],
+                expected.values,
+                rtol=1e-10
+            )
+
+    @parameterized.expand([
+        (ResultsFormat.CSV,),
+        (ResultsFormat.PARQUET,)
+    ])
+    def test_run_sweep_index_column(self, results_format):
+        instance = self.config.model_instances[0]
+        out_file = os.path.join(self.out_path, f'sweep_index.{results_format.value}')
+        options = ResultsFileOptions(results_format, float32=True)
+        run_sweep(instance, self.sweep, out_file, True, self.logger, results_options=options)
+        df = read_results(out_file)
+        self.assertEqual(df['index'].dtype, np.int64)
+        self.assertEqual(df['time'].dtype, np.float32 if results_format == ResultsFormat.PARQUET else np.float64)
+        self.assertListEqual(list(df['index'].unique()), list(range(12)))
+
+    def test_run_sweep_reducers(self):
+        instance = self.config.model_instances[0]
+        outputs = [dataclasses.replace(output) for output in self.sweep.scenario.outputs]
+        outputs[0].reducers = [OutputReducer(ReducerType.MAX, 1)]
+        self.sweep.scenario.outputs = outputs
+        out_file = os.path.join(self.out_path, 'sweep_reduced.csv')
+        with mock.patch.object(OutputReduction, 'reduce', autospec=True) as reduce:
+            run_sweep(instance, self.sweep, out_file, True, self.logger)
+        reduce.assert_not_called()
+        df = read_results(out_file)
+        self.assertListEqual(list(df.columns), ['index', 'time', 'ABlood_max', 'ALiver'])
+        for index in [0, 11]:
+            scenario = get_sweep_scenario(self.sweep, index)
+            result = simulate_scenario(instance, scenario, dosing_mode=DosingMode.SEGMENTED)
+            expected = OutputReduction(scenario.outputs, result.columns).reduce(result.values)
+            np.testing.assert_allclose(df[df['index'] == index].to_numpy()[:, 1:], expected, rtol=1e-10)
+
+    def test_run_config_sweeps(self):
+        out_path = os.path.join(self.out_path, 'config')
+        run_config(self.config, out_path, True, self.logger)
+        members = pd.read_csv(os.path.join(out_path, 'oral_dose_response_members.csv'))
+        self.assertEqual(len(members), 12)
+        df = read_results(os.path.join(out_path, 'oral_dose_response_simple.csv'))
+        self.assertEqual(len(df), 12 * 97)
+
+if __name__ == '__main__':
+    unittest.main()